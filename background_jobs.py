@@ -0,0 +1,146 @@
+import sys
+import time
+import threading
+import traceback
+import itertools
+
+import error_handler
+
+local = threading.local()
+
+def progress(value):
+	"""Tells .jobs how far the background job the calling thread runs has
+	come, e.g. "3/10 feeds". Does nothing outside of one."""
+	handle = getattr(local, 'handle', None)
+	if handle:
+		handle.progress = value
+
+class BackgroundJob:
+	"""A handle on a job started by JobRunner.submit."""
+
+	def __init__(self, id, name, target, args, callback, reply_to, tell):
+		self.id = id
+		self.name = name
+		self.target = target
+		self.args = args
+		self.callback = callback
+		self.reply_to = reply_to
+		self.tell = tell
+
+		self.job = None
+		self.runner = None
+		# waiting, running, then done, failed, timed out or cancelled.
+		self.state = 'waiting'
+		self.cancelled = False
+		self.progress = None
+		self.result = None
+		self.error = None
+
+		self.submitted = time.time()
+		self.started = None
+		self.finished = None
+
+	def __repr__(self):
+		return "<BackgroundJob %d %s %s>" % (self.id, self.name, self.state)
+
+	def is_over(self):
+		return self.state not in ('waiting', 'running')
+
+	def elapsed(self):
+		"""Seconds it has run for, or waited if it hasn't started."""
+		since = self.started or self.submitted
+		return (self.finished or time.time()) - since
+
+	def cancel(self):
+		self.runner.cancel(self)
+
+class JobRunner:
+	"""Runs named jobs in the background, on the worker pool. How many with
+	the same name run at once is capped by the pool's "job" key limit; the
+	others wait their turn.
+
+	When a job is over, however it went, callback(handle) is called on the
+	reactor thread, and if there's a reply_to nick or channel it is told
+	the result (if that's a string) or what went wrong."""
+
+	def __init__(self, reactor, workers, tell):
+		self.reactor = reactor
+		self.workers = workers
+		self.tell = tell
+		self.ids = itertools.count(1)
+		self.jobs = {}
+
+	def submit(self, name, target, args=(), callback=None, reply_to=None, timeout=None, tell=None):
+		"""Runs target(*args) as job name, given up on after timeout seconds.
+		reply_to is told through tell (default: the runner's). Returns the
+		BackgroundJob, or None if the pool has too many waiting. May be
+		called from any thread."""
+		handle = BackgroundJob(self.ids.next(), name, target, args, callback, reply_to, tell or self.tell)
+		handle.runner = self
+		if self.reactor.call_and_wait(self.start, handle, timeout):
+			return handle
+		return None
+
+	def start(self, handle, timeout):
+		handle.job = self.workers.submit(self.run, (handle,), [("job", handle.name)], timeout,
+			lambda result: self.finish(handle), lambda: self.finish(handle, True))
+		if handle.job:
+			self.jobs[handle.id] = handle
+		return handle.job
+
+	def run(self, handle):
+		handle.state = 'running'
+		handle.started = time.time()
+		local.handle = handle
+		try:
+			handle.result = handle.target(*handle.args)
+		except:
+			handle.error = sys.exc_info()
+			error_handler.output_message("job %s: %s %s" % (handle.name, handle.error[0:2], traceback.extract_tb(handle.error[2])))
+		local.handle = None
+
+	def finish(self, handle, given_up=False):
+		if handle.is_over():
+			return
+
+		handle.finished = time.time()
+		if handle.cancelled:
+			handle.state = 'cancelled'
+		elif given_up:
+			handle.state = 'timed out'
+		elif handle.error:
+			handle.state = 'failed'
+		else:
+			handle.state = 'done'
+		self.jobs.pop(handle.id, None)
+
+		if handle.reply_to:
+			message = None
+			if handle.state == 'done' and isinstance(handle.result, basestring):
+				message = handle.result
+			elif handle.state == 'failed':
+				message = "%s failed: %s" % (handle.name, handle.error[1])
+			elif handle.state == 'timed out':
+				message = "%s took too long and was given up on." % handle.name
+			elif handle.state == 'cancelled':
+				message = "%s was cancelled." % handle.name
+			if message:
+				handle.tell(handle.reply_to, message)
+
+		if handle.callback:
+			self.reactor.invoke(handle.callback, handle)
+
+	def cancel(self, handle):
+		"""Gives up on the job. If it's running it's told so through its
+		deadline (see deadline.py), and whatever it returns is thrown away.
+		May be called from any thread."""
+		handle.cancelled = True
+		if handle.job:
+			self.reactor.call_from_thread(self.workers.cancel, handle.job)
+
+	def running(self):
+		"""The jobs not yet over, oldest first."""
+		return sorted(self.jobs.values(), key=lambda handle: handle.id)
+
+	def find(self, id):
+		return self.jobs.get(id)
@@ -0,0 +1,149 @@
+# coding: utf-8
+
+# Replays a burst of PRIVMSG lines from a local fake server and measures the
+# time until the bot's reply to each line comes back, once with the old
+# tick()+sleep(0.1) loop and once with the reactor.
+#
+# Usage: python benchmarks/event_loop.py [number of lines]
+
+import os
+import sys
+import time
+import socket
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from reactor import Reactor
+from ircclient.ircclient import IRCClient
+from ircclient.send_queue import TokenBucket
+
+class PollingClient(IRCClient):
+	"""The pre-reactor read path: one recv(1024) per tick."""
+
+	recv_buf = ''
+
+	def tick(self):
+		try:
+			self.process_data(self.s.recv(1024))
+		except socket.error:
+			pass
+
+	def process_data(self, data):
+		self.recv_buf += data
+		recv_lines = self.recv_buf.splitlines(True)
+		self.recv_buf = ''
+		for line in recv_lines:
+			if not line.endswith("\r\n"):
+				self.recv_buf = line
+			else:
+				self.handle_line(line.rstrip("\r\n"))
+
+class FakeServer(threading.Thread):
+	def __init__(self, line_count):
+		threading.Thread.__init__(self)
+		self.line_count = line_count
+		self.latencies = []
+		self.listener = socket.socket()
+		self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.listener.bind(('127.0.0.1', 0))
+		self.listener.listen(1)
+		self.port = self.listener.getsockname()[1]
+		self.done = threading.Event()
+
+	def run(self):
+		conn, address = self.listener.accept()
+		conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+		sent_at = {}
+		burst = []
+		for n in range(self.line_count):
+			burst.append(":user%d!~user@example.org PRIVMSG #bench :.echo %d\r\n" % (n % 50, n))
+
+		# Let the client send USER/NICK first.
+		time.sleep(0.2)
+
+		start = time.time()
+		for n in range(self.line_count):
+			sent_at[n] = start
+		conn.sendall("".join(burst))
+
+		buf = ''
+		while len(self.latencies) < self.line_count:
+			data = conn.recv(65536)
+			if not data:
+				break
+			now = time.time()
+			buf += data
+			lines = buf.split("\r\n")
+			buf = lines.pop()
+			for line in lines:
+				if line.startswith("PRIVMSG #bench :.echo "):
+					n = int(line.split()[-1])
+					self.latencies.append(now - sent_at[n])
+
+		self.elapsed = time.time() - start
+		conn.close()
+		self.listener.close()
+		self.done.set()
+
+def make_client(client_class, port, reactor=None):
+	client = client_class('127.0.0.1', port, 'bench', 'bench', 'bench', reactor)
+	client.callbacks["on_privmsg"] = lambda source, target, message: client.tell(target, message)
+	# Measure the loop, not the flood control.
+	client.send_queue.bucket = TokenBucket(float('inf'))
+	return client
+
+def run_polling(line_count):
+	server = FakeServer(line_count)
+	server.start()
+
+	client = make_client(PollingClient, server.port)
+	client.reconnect()
+	while not server.done.is_set():
+		client.tick()
+		time.sleep(0.1)
+
+	return server
+
+def run_reactor(line_count):
+	server = FakeServer(line_count)
+	server.start()
+
+	reactor = Reactor()
+	client = make_client(IRCClient, server.port, reactor)
+	client.reconnect()
+
+	def watch():
+		server.done.wait()
+		reactor.call_from_thread(reactor.stop)
+	threading.Thread(target=watch).start()
+
+	reactor.run()
+	return server
+
+def percentile(values, p):
+	values = sorted(values)
+	return values[min(len(values) - 1, int(len(values) * p))]
+
+def report(name, server):
+	l = server.latencies
+	print "%-8s lines: %5d  total: %7.3f s  mean: %7.2f ms  p50: %7.2f ms  p99: %7.2f ms  max: %7.2f ms" % (
+		name, len(l), server.elapsed, 1000 * sum(l) / len(l), 1000 * percentile(l, 0.5),
+		1000 * percentile(l, 0.99), 1000 * max(l))
+
+if __name__ == '__main__':
+	line_count = 2000
+	if len(sys.argv) > 1:
+		line_count = int(sys.argv[1])
+
+	stdout = sys.stdout
+	sys.stdout = open(os.devnull, 'w')
+	try:
+		polling = run_polling(line_count)
+		reactor = run_reactor(line_count)
+	finally:
+		sys.stdout = stdout
+
+	report("polling", polling)
+	report("reactor", reactor)
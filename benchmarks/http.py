@@ -0,0 +1,128 @@
+# coding: utf-8
+
+# Fetches a 20 kB page from a local HTTP/1.1 server, one request at a time
+# and from four threads at once, with the old read_url (a new urllib2
+# connection per request) and the pooled keep-alive HttpClient, and counts
+# the connections the server had to accept. Every other request goes
+# through a redirect first. Then again with every new connection taking
+# 10 ms longer to set up, as a TCP (and TLS) handshake to a server
+# further away than localhost does.
+#
+# Usage: python benchmarks/http.py [number of requests]
+
+import os
+import sys
+import time
+import threading
+import urllib2
+import SocketServer
+import BaseHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import settings
+settings.log_echo = False
+
+from plugins.httpget import HttpClient
+
+page = "x" * 20000
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	# A response in one write, without waiting on Nagle, as a real server's.
+	wbufsize = -1
+	disable_nagle_algorithm = True
+
+	def setup(self):
+		BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+		with self.server.lock:
+			self.server.connections += 1
+		time.sleep(self.server.setup_delay)
+
+	def do_GET(self):
+		if self.path == "/redirect":
+			self.send_response(302)
+			self.send_header("Location", "/page")
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+
+		self.send_response(200)
+		self.send_header("Content-Type", "text/html")
+		self.send_header("Content-Length", str(len(page)))
+		self.end_headers()
+		self.wfile.write(page)
+
+	def log_message(self, format, *args):
+		pass
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+	daemon_threads = True
+
+	def __init__(self):
+		BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", 0), Handler)
+		self.lock = threading.Lock()
+		self.connections = 0
+		self.setup_delay = 0
+
+def old_read_url(url, timeout=None):
+	try:
+		try:
+			file = urllib2.urlopen(url, timeout=timeout)
+		except urllib2.HTTPError, e:
+			file = e
+
+		result = { "url": file.geturl(),
+					"data": file.read(1024*1024),
+					"info": file.info() }
+	except IOError:
+		return None
+
+	file.close()
+	return result
+
+def fetch(read_url, urls):
+	for url in urls:
+		result = read_url(url, 10)
+		assert result["data"] == page and result["url"].endswith("/page")
+
+def run(server, read_url, urls, threads):
+	server.connections = 0
+	began = time.time()
+	if threads == 1:
+		fetch(read_url, urls)
+	else:
+		workers = [threading.Thread(target=fetch, args=(read_url, urls[i::threads])) for i in range(threads)]
+		for worker in workers:
+			worker.start()
+		for worker in workers:
+			worker.join()
+	return len(urls) / (time.time() - began), server.connections
+
+if __name__ == '__main__':
+	count = 2000
+	if len(sys.argv) > 1:
+		count = int(sys.argv[1])
+
+	server = Server()
+	thread = threading.Thread(target=server.serve_forever)
+	thread.daemon = True
+	thread.start()
+
+	base = "http://127.0.0.1:%d" % server.server_address[1]
+	urls = [base + ["/page", "/redirect"][i % 2] for i in range(count)]
+
+	print "%d requests, half of them redirected" % count
+	for delay in [0, 0.01]:
+		server.setup_delay = delay
+		for threads in [1, 4]:
+			client = HttpClient()
+			for name, read_url in [("urllib2", old_read_url), ("pooled", client.get)]:
+				rate, connections = run(server, read_url, urls, threads)
+				print "%-8s %2.0f ms setup, %d thread%s %7.0f requests/s, %5d connections" % (name, delay * 1000,
+					threads, ["", "s"][threads > 1], rate, connections)
+			# Lets the server's threads for them finish.
+			client.close()
+			time.sleep(0.1)
+
+	server.shutdown()
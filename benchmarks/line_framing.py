@@ -0,0 +1,105 @@
+# coding: utf-8
+
+# Compares the old string-concatenating line splitter with LineBuffer.
+#
+# Usage: python benchmarks/line_framing.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ircclient.line_buffer import LineBuffer
+
+class ChunkedSocket:
+	"""Hands out a prerecorded stream in fixed-size pieces."""
+
+	def __init__(self, data, chunk_size):
+		self.data = data
+		self.offset = 0
+		self.chunk_size = chunk_size
+
+	def recv(self, size):
+		size = min(size, self.chunk_size)
+		chunk = self.data[self.offset:self.offset + size]
+		self.offset += len(chunk)
+		return chunk
+
+	def recv_into(self, buf, size):
+		chunk = self.recv(size)
+		buf[0:len(chunk)] = chunk
+		return len(chunk)
+
+def old_framing(s, read_size):
+	recv_buf = ''
+	count = 0
+	while True:
+		retn = s.recv(read_size)
+		if not retn:
+			break
+
+		recv_buf += retn
+		recv_lines = recv_buf.splitlines(True)
+		recv_buf = ''
+		for line in recv_lines:
+			if not line.endswith("\r\n"):
+				recv_buf = line
+			else:
+				line = line.rstrip("\r\n")
+				count += 1
+	return count
+
+def new_framing(s, read_size):
+	buffer = LineBuffer()
+	count = 0
+	while buffer.recv_into(s):
+		for line in buffer.lines():
+			count += 1
+	return count
+
+def names_burst(channels, nicks_per_channel):
+	lines = []
+	for c in range(channels):
+		nicks = ["@op%d" % n if n % 20 == 0 else "user%d" % n for n in range(nicks_per_channel)]
+		while nicks:
+			lines.append(":irc.example.org 353 pynik = #chan%d :%s" % (c, " ".join(nicks[:40])))
+			nicks = nicks[40:]
+		lines.append(":irc.example.org 366 pynik #chan%d :End of /NAMES list." % c)
+	return "\r\n".join(lines) + "\r\n"
+
+def netsplit(users):
+	lines = [":user%d!~u@host%d.example.org QUIT :*.net *.split" % (n, n) for n in range(users)]
+	return "\r\n".join(lines) + "\r\n"
+
+def long_lines(count, length):
+	line = "@time=2026-01-01T00:00:00.000Z;" + "x" * length + " :nick!u@h PRIVMSG #c :hi"
+	return (line + "\r\n") * count
+
+def run(name, data, chunk_size, read_size):
+	results = []
+	for framing in [old_framing, new_framing]:
+		best = None
+		for repeat in range(5):
+			start = time.time()
+			count = framing(ChunkedSocket(data, chunk_size), read_size)
+			elapsed = time.time() - start
+			if best is None or elapsed < best:
+				best = elapsed
+		results.append((best, count))
+
+	(old_time, old_count), (new_time, new_count) = results
+	assert old_count == new_count
+	print "%-28s %8d lines  old: %8.1f ms  new: %8.1f ms  speedup: %5.1fx" % (
+		name, new_count, old_time * 1000, new_time * 1000, old_time / new_time)
+
+if __name__ == '__main__':
+	burst = names_burst(200, 400)
+	split = netsplit(20000)
+	tagged = long_lines(500, 8000)
+
+	run("NAMES burst, 1024 B reads", burst, 1024, 1024)
+	run("NAMES burst, 64 KiB reads", burst, 65536, 65536)
+	run("netsplit, 64 KiB reads", split, 65536, 65536)
+	run("netsplit, 1460 B segments", split, 1460, 65536)
+	run("8 KB tagged lines, 536 B segs", tagged, 536, 65536)
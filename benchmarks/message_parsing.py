@@ -0,0 +1,80 @@
+# coding: utf-8
+
+# Parser throughput in lines/sec on a server log, old regex pipeline versus
+# ircclient.message.parse_message.
+#
+# Usage: python benchmarks/message_parsing.py [log file]
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ircclient.message import parse_message
+
+irc_message_pattern = re.compile('^(:([^  ]+))?[   ]*([^  ]+)[  ]+:?([^  ]*)[   ]*:?(.*)$')
+
+def old_pipeline(lines):
+	"""What the client and plugins used to do per line: the message regex,
+	then each handler's own regex to get at the nick or the parameters."""
+	for line in lines:
+		m = irc_message_pattern.match(line)
+		if not m:
+			continue
+
+		tupels = m.group(0, 1, 2, 3, 4, 5)
+		command = tupels[3]
+
+		if command == 'PRIVMSG' or command == 'NOTICE':
+			n = re.search('^(.+)!', tupels[2])
+		elif command in ('NICK', 'PART', 'QUIT'):
+			n = re.search('^:?(\S+?)!', tupels[1])
+		elif command == 'KICK':
+			n = re.search('^([^ ]+)', tupels[5])
+		elif command == '353':
+			n = re.search('. (.+?) :(.*)$', tupels[5])
+			if n:
+				re.findall('([^a-zA-Z\[\]{}]?)(.+?)(\s|$)', n.group(2))
+
+def new_pipeline(lines):
+	for line in lines:
+		message = parse_message(line)
+		if not message:
+			continue
+
+		command = message.command
+
+		if command == 'PRIVMSG' or command == 'NOTICE':
+			n = message.nick
+		elif command in ('NICK', 'PART', 'QUIT'):
+			n = message.nick
+		elif command == 'KICK':
+			n = message.param(1)
+		elif command == '353':
+			[nick.lstrip('~&@%+') for nick in message.param(3).split()]
+
+def measure(pipeline, lines, repeats):
+	best = None
+	for repeat in range(repeats):
+		start = time.time()
+		pipeline(lines)
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return len(lines) / best
+
+if __name__ == '__main__':
+	path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'server.log')
+	if len(sys.argv) > 1:
+		path = sys.argv[1]
+
+	lines = open(path).read().splitlines() * 20
+
+	old = measure(old_pipeline, lines, 5)
+	new = measure(new_pipeline, lines, 5)
+
+	print "%d lines from %s" % (len(lines), path)
+	print "regex pipeline:  %9.0f lines/sec" % old
+	print "parse_message:   %9.0f lines/sec (%.1fx)" % (new, new / old)
@@ -0,0 +1,105 @@
+# coding: utf-8
+
+# Startup time and memory of one bot process serving N networks versus N
+# bot processes serving one network each. Every "network" is a local
+# listener; startup is measured from spawning the process(es) until all N
+# connections have sent their NICK line.
+#
+# Usage: python benchmarks/multi_network.py [number of networks]
+
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+class FakeNetwork(threading.Thread):
+	def __init__(self):
+		threading.Thread.__init__(self)
+		self.daemon = True
+		self.listener = socket.socket()
+		self.listener.bind(('127.0.0.1', 0))
+		self.listener.listen(1)
+		self.port = self.listener.getsockname()[1]
+		self.registered = threading.Event()
+
+	def run(self):
+		conn, address = self.listener.accept()
+		data = ''
+		while "NICK " not in data:
+			chunk = conn.recv(4096)
+			if not chunk:
+				break
+			data += chunk
+		self.registered.set()
+		self.conn = conn
+
+def rss_kb(pid):
+	for line in open('/proc/%d/status' % pid):
+		if line.startswith('VmRSS:'):
+			return int(line.split()[1])
+	return 0
+
+def spawn(ports):
+	devnull = open(os.devnull, 'w')
+	return subprocess.Popen([sys.executable, os.path.abspath(__file__), 'child'] + map(str, ports),
+		cwd=root, stdout=devnull, stderr=devnull)
+
+def measure(count, processes):
+	networks = [FakeNetwork() for n in range(count)]
+	for network in networks:
+		network.start()
+
+	start = time.time()
+	if processes == 1:
+		children = [spawn([network.port for network in networks])]
+	else:
+		children = [spawn([network.port]) for network in networks]
+
+	for network in networks:
+		network.registered.wait(60)
+	elapsed = time.time() - start
+
+	# Let the plugins settle before sampling memory.
+	time.sleep(0.5)
+	rss = sum([rss_kb(child.pid) for child in children])
+
+	for child in children:
+		child.kill()
+		child.wait()
+
+	return elapsed, rss
+
+def child(ports):
+	sys.path.insert(0, root)
+
+	import settings
+	settings.log_echo = False
+
+	from reactor import Reactor
+	from ircbot import IRCBot
+
+	networks = [{ 'name': 'net%d' % n, 'server_address': '127.0.0.1', 'server_port': int(port),
+		'nick': 'pynik', 'username': 'pynik', 'realname': 'pynik' } for n, port in enumerate(ports)]
+
+	reactor = Reactor()
+	bot = IRCBot(networks, reactor)
+	reactor.run()
+
+if __name__ == '__main__':
+	if len(sys.argv) > 1 and sys.argv[1] == 'child':
+		child(sys.argv[2:])
+		sys.exit(0)
+
+	count = 5
+	if len(sys.argv) > 1:
+		count = int(sys.argv[1])
+
+	shared_time, shared_rss = measure(count, 1)
+	separate_time, separate_rss = measure(count, count)
+
+	print "%d networks in 1 process:   startup %6.0f ms, RSS %7.1f MB" % (count, shared_time * 1000, shared_rss / 1024.0)
+	print "%d networks in %d processes: startup %6.0f ms, RSS %7.1f MB" % (count, count, separate_time * 1000, separate_rss / 1024.0)
@@ -0,0 +1,65 @@
+# coding: utf-8
+
+# Events/sec through IRCBot.execute_plugins with all default plugins loaded,
+# the old per-event walk of Plugin.__subclasses__() with a KeyError for
+# every plugin lacking the hook, versus plugin_handler's hook table.
+#
+# Usage: python benchmarks/plugin_dispatch.py [events per hook]
+
+import os
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import settings
+settings.log_echo = False
+settings.lazy_plugins = False
+
+import plugin_handler
+import error_handler
+from ircbot import IRCBot
+from ircclient.message import parse_message
+
+def old_call_plugins(bot, trigger, arguments):
+	for plugin in plugin_handler.all_plugins():
+		try:
+			plugin.__class__.__dict__[trigger](plugin, bot, *arguments)
+		except KeyError:
+			pass
+		except:
+			error_handler.output_message("argh " + str(plugin) + " " + str(sys.exc_info()) + " " + str(traceback.extract_tb(sys.exc_info()[2])))
+
+# Events no plugin answers, so only dispatch is measured.
+events = [
+	("on_irc_message", (parse_message(":nick!user@host PRIVMSG #bench :hello there"),)),
+	("on_privmsg", ("nick!user@host", "#bench", "hello there")),
+	("on_quit", ("nick", "Ping timeout")),
+]
+
+def measure(bot, count):
+	results = []
+	for trigger, arguments in events:
+		start = time.time()
+		for i in xrange(count):
+			bot.execute_plugins(trigger, *arguments)
+		results.append(count / (time.time() - start))
+	return results
+
+if __name__ == '__main__':
+	count = 20000
+	if len(sys.argv) > 1:
+		count = int(sys.argv[1])
+
+	bot = IRCBot([{ 'name': 'bench' }])
+	print "%d plugin classes loaded" % len(plugin_handler.all_plugins())
+
+	new = measure(bot, count)
+	bot.call_plugins = old_call_plugins
+	old = measure(bot, count)
+
+	for (trigger, arguments), old_rate, new_rate in zip(events, old, new):
+		print "%-16s %d plugins: old %9.0f events/s, table %9.0f events/s (%.1fx)" % (trigger,
+			len(plugin_handler.get_hooks(trigger)), old_rate, new_rate, new_rate / old_rate)
@@ -0,0 +1,77 @@
+# coding: utf-8
+
+# Channel messages/sec through IRCBot.execute_plugins("on_privmsg", ...)
+# with all default plugins loaded: every on_privmsg hook for every message
+# versus only the hooks whose privmsg_patterns match.
+#
+# Messages are the PRIVMSG lines of a server log. Lines with URLs and
+# commands are left out: title_reader, spotify and the commands go out on
+# the network for those, which would swamp the dispatch cost being
+# measured (and they run the same way with or without the filter).
+#
+# Usage: python benchmarks/privmsg_filter.py [log file] [rounds]
+
+import os
+import re
+import sys
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+os.chdir(root)
+
+import settings
+settings.log_echo = False
+settings.lazy_plugins = False
+
+import plugin_handler
+from ircbot import IRCBot
+from ircclient.message import parse_message
+
+def read_messages(path):
+	messages = []
+	skipped = 0
+	for line in open(path):
+		message = parse_message(line.rstrip('\r\n'))
+		if not message or message.command != 'PRIVMSG' or not message.param(0).startswith('#'):
+			continue
+
+		text = message.param(1)
+		if re.search(r'https?://|www\.|spotify:', text, re.I) or text.startswith(settings.command_prefix):
+			skipped += 1
+		else:
+			messages.append((message.prefix, message.param(0), text))
+	return messages, skipped
+
+def every_hook(message):
+	return plugin_handler.get_hooks('on_privmsg')
+
+def measure(bot, messages, rounds):
+	start = time.time()
+	for i in xrange(rounds):
+		for source, target, text in messages:
+			bot.execute_plugins("on_privmsg", source, target, text)
+	return rounds * len(messages) / (time.time() - start)
+
+if __name__ == '__main__':
+	path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'server.log')
+	if len(sys.argv) > 1:
+		path = sys.argv[1]
+
+	rounds = 20
+	if len(sys.argv) > 2:
+		rounds = int(sys.argv[2])
+
+	messages, skipped = read_messages(path)
+	bot = IRCBot([{ 'name': 'bench' }])
+
+	filtered = measure(bot, messages, rounds)
+
+	get_privmsg_hooks = plugin_handler.get_privmsg_hooks
+	plugin_handler.get_privmsg_hooks = every_hook
+	unfiltered = measure(bot, messages, rounds)
+	plugin_handler.get_privmsg_hooks = get_privmsg_hooks
+
+	print "%d channel messages (%d with URLs or commands left out), %d on_privmsg hooks" % (len(messages), skipped, len(plugin_handler.get_hooks('on_privmsg')))
+	print "every hook:          %9.0f messages/s" % unfiltered
+	print "privmsg_patterns:    %9.0f messages/s (%.1fx)" % (filtered, filtered / unfiltered)
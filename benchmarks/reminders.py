@@ -0,0 +1,140 @@
+# coding: utf-8
+
+# 100k reminders for 1000 nicks over a day: adding them, listing a nick's,
+# a timer_beat with nothing due, firing them all and loading them back from
+# disk, with the old list re-pickled on every change versus ReminderStore.
+# The old add and fire are timed over the first thousand reminders and the
+# first five minutes only, as each one writes out every reminder there is.
+#
+# Usage: python benchmarks/reminders.py [number of reminders]
+
+import os
+import sys
+import time
+import random
+import shutil
+import datetime
+import tempfile
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'plugins'))
+
+import settings
+settings.log_echo = False
+
+import utility
+from reminder import Reminder, ReminderStore
+
+def old_add(reminders, nick, trigger_time, message):
+	reminders.append(Reminder(nick, trigger_time, message))
+	utility.save_data("old_reminders", reminders)
+
+def old_for_nick(reminders, nick):
+	return [reminder for reminder in reminders if reminder.nick == nick]
+
+def old_beat(reminders, now):
+	to_remove = []
+	for reminder in reminders:
+		if reminder.trigger_time <= now:
+			to_remove.append(reminder)
+	if to_remove:
+		for reminder in to_remove:
+			reminders.remove(reminder)
+		utility.save_data("old_reminders", reminders)
+	return to_remove
+
+def rate(count, seconds):
+	return count / max(seconds, 1e-9)
+
+if __name__ == '__main__':
+	count = 100000
+	if len(sys.argv) > 1:
+		count = int(sys.argv[1])
+	old_count = min(count, 1000)
+
+	directory = tempfile.mkdtemp()
+	os.mkdir(os.path.join(directory, 'data'))
+	os.chdir(directory)
+
+	random.seed(1)
+	start = datetime.datetime(2030, 1, 1)
+	entries = [("nick%d" % random.randrange(1000), start + datetime.timedelta(0, random.randrange(86400)),
+		"message number %d" % i) for i in xrange(count)]
+	nicks = ["nick%d" % i for i in xrange(100)]
+	before = start - datetime.timedelta(0, 1)
+
+	try:
+		print "%d reminders, 1000 nicks" % count
+
+		reminders = []
+		began = time.time()
+		for nick, trigger_time, message in entries[:old_count]:
+			old_add(reminders, nick, trigger_time, message)
+		old_adds = rate(old_count, time.time() - began)
+
+		reminders = [Reminder(nick, trigger_time, message) for nick, trigger_time, message in entries]
+		utility.save_data("old_reminders", reminders)
+
+		began = time.time()
+		for nick in nicks:
+			old_for_nick(reminders, nick)
+		old_lists = rate(len(nicks), time.time() - began)
+
+		began = time.time()
+		for i in xrange(10):
+			old_beat(reminders, before)
+		old_idle = rate(10, time.time() - began)
+
+		# A beat a minute, as the old one did.
+		began = time.time()
+		fired = 0
+		for minute in xrange(5):
+			fired += len(old_beat(reminders, start + datetime.timedelta(0, minute * 60)))
+		old_fires = rate(fired, time.time() - began)
+
+		utility.save_data("old_reminders", [Reminder(nick, trigger_time, message) for nick, trigger_time, message in entries])
+		began = time.time()
+		utility.load_data("old_reminders", [])
+		old_load = time.time() - began
+
+		store = ReminderStore("reminders")
+		store.load()
+		began = time.time()
+		for nick, trigger_time, message in entries:
+			store.add(nick, trigger_time, message)
+		new_adds = rate(count, time.time() - began)
+
+		began = time.time()
+		for nick in nicks:
+			store.for_nick(nick)
+		new_lists = rate(len(nicks), time.time() - began)
+
+		began = time.time()
+		for i in xrange(10000):
+			store.pop_due(before)
+		new_idle = rate(10000, time.time() - began)
+
+		store.close()
+		began = time.time()
+		store = ReminderStore("reminders")
+		store.load()
+		new_load = time.time() - began
+		assert len(store) == count
+
+		# A beat a second, as the new one does.
+		began = time.time()
+		fired = 0
+		for second in xrange(86400 + 1):
+			fired += len(store.pop_due(start + datetime.timedelta(0, second)))
+		new_fires = rate(fired, time.time() - began)
+		assert fired == count
+		store.close()
+
+		print "%-6s add %8.0f/s, list a nick's %8.0f/s, idle beat %9.0f/s, fire %8.0f/s, load %6.0f ms" % ("old",
+			old_adds, old_lists, old_idle, old_fires, old_load * 1000)
+		print "%-6s add %8.0f/s, list a nick's %8.0f/s, idle beat %9.0f/s, fire %8.0f/s, load %6.0f ms" % ("store",
+			new_adds, new_lists, new_idle, new_fires, new_load * 1000)
+	finally:
+		os.chdir(root)
+		shutil.rmtree(directory)
@@ -0,0 +1,103 @@
+# coding: utf-8
+
+# Time from spawning the bot until it has sent USER and NICK to a local
+# listener, importing every plugin module at startup versus importing them
+# lazily as the plugin manifest allows. Also the RSS once registered.
+#
+# Usage: python benchmarks/startup.py [runs]
+
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+class FakeServer(threading.Thread):
+	def __init__(self):
+		threading.Thread.__init__(self)
+		self.daemon = True
+		self.listener = socket.socket()
+		self.listener.bind(('127.0.0.1', 0))
+		self.listener.listen(1)
+		self.port = self.listener.getsockname()[1]
+		self.registered = threading.Event()
+
+	def run(self):
+		conn, address = self.listener.accept()
+		data = ''
+		while "\nUSER " not in data or "\nNICK " not in data:
+			chunk = conn.recv(4096)
+			if not chunk:
+				break
+			data += chunk
+		self.registered.set()
+		self.conn = conn
+
+def rss_kb(pid):
+	for line in open('/proc/%d/status' % pid):
+		if line.startswith('VmRSS:'):
+			return int(line.split()[1])
+	return 0
+
+def measure(lazy):
+	server = FakeServer()
+	server.start()
+
+	devnull = open(os.devnull, 'w')
+	start = time.time()
+	child = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'child', str(server.port), lazy],
+		cwd=root, stdout=devnull, stderr=devnull)
+	server.registered.wait(60)
+	elapsed = time.time() - start
+	rss = rss_kb(child.pid)
+
+	child.kill()
+	child.wait()
+	return elapsed, rss
+
+def child(port, lazy):
+	sys.path.insert(0, root)
+
+	import settings
+	settings.log_echo = False
+	settings.lazy_plugins = lazy == 'lazy'
+
+	from reactor import Reactor
+	from ircbot import IRCBot
+
+	networks = [{ 'name': 'local', 'server_address': '127.0.0.1', 'server_port': int(port),
+		'nick': 'pynik', 'username': 'pynik', 'realname': 'pynik' }]
+
+	reactor = Reactor()
+	bot = IRCBot(networks, reactor)
+	reactor.run()
+
+def median(values):
+	return sorted(values)[len(values) / 2]
+
+if __name__ == '__main__':
+	if len(sys.argv) > 1 and sys.argv[1] == 'child':
+		child(sys.argv[2], sys.argv[3])
+		sys.exit(0)
+
+	runs = 9
+	if len(sys.argv) > 1:
+		runs = int(sys.argv[1])
+
+	# Once each first, so neither pays for writing .pyc files.
+	measure('eager')
+	measure('lazy')
+
+	results = { 'eager': [], 'lazy': [] }
+	for i in range(runs):
+		for mode in ['eager', 'lazy']:
+			results[mode].append(measure(mode))
+
+	for mode in ['eager', 'lazy']:
+		times = [elapsed for elapsed, rss in results[mode]]
+		rss = [rss for elapsed, rss in results[mode]]
+		print "%-5s imports: median %5.0f ms to USER/NICK (min %5.0f ms), RSS %5.1f MB" % (mode, median(times) * 1000,
+			min(times) * 1000, median(rss) / 1024.0)
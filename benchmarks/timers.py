@@ -0,0 +1,144 @@
+# coding: utf-8
+
+# Inserts, cancels and fires timers spread over an hour, in the reactor's
+# old PriorityQueue of datetime TimedEvents (which can't cancel: a cancelled
+# timer stays in the heap, flagged, until it comes up), in a heapq of tuples
+# doing the same, and in the TimerWheel. Time is simulated and moved on a
+# second at a time; half the timers are cancelled before it starts.
+#
+# Usage: python benchmarks/timers.py [number of timers]
+
+import os
+import sys
+import time
+import random
+import datetime
+from heapq import heappush, heappop
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from timer_wheel import Timer, TimerWheel
+
+class PriorityQueue:
+	def __init__(self):
+		self.internal_array = []
+
+	def push(self, item):
+		heappush(self.internal_array, item)
+
+	def pop(self):
+		return heappop(self.internal_array)
+
+	def empty(self):
+		return len(self.internal_array) == 0
+
+	def top(self):
+		return self.internal_array[0]
+
+class TimedEvent:
+	def __init__(self, trigger_delta, recurring, target, args):
+		self.trigger_delta = trigger_delta
+		self.trigger_time = datetime.datetime.now() + trigger_delta
+		self.recurring = recurring
+		self.target = target
+		self.args = args
+		self.cancelled = False
+
+	def trigger(self):
+		self.target(*self.args)
+
+	def __cmp__(self, other):
+		return cmp(self.trigger_time, other.trigger_time)
+
+span = 3600
+
+def noop():
+	pass
+
+def old_heap(delays, cancel):
+	queue = PriorityQueue()
+	start = datetime.datetime.now()
+
+	began = time.time()
+	timers = [TimedEvent(datetime.timedelta(0, delay), False, noop, ()) for delay in delays]
+	for timer in timers:
+		queue.push(timer)
+	inserted = time.time()
+
+	for i in cancel:
+		timers[i].cancelled = True
+	cancelled = time.time()
+
+	fired = 0
+	for second in xrange(span + 2):
+		now = start + datetime.timedelta(0, second)
+		while not queue.empty() and queue.top().trigger_time <= now:
+			timer = queue.pop()
+			if not timer.cancelled:
+				timer.trigger()
+				fired += 1
+	done = time.time()
+	return inserted - began, cancelled - inserted, done - cancelled, fired
+
+def tuple_heap(delays, cancel):
+	heap = []
+	start = 0.0
+
+	began = time.time()
+	timers = []
+	for sequence, delay in enumerate(delays):
+		timer = Timer(start + delay, None, noop, ())
+		heappush(heap, (timer.due, sequence, timer))
+		timers.append(timer)
+	inserted = time.time()
+
+	for i in cancel:
+		timers[i].cancelled = True
+	cancelled = time.time()
+
+	fired = 0
+	for second in xrange(span + 2):
+		now = start + second
+		while heap and heap[0][0] <= now:
+			timer = heappop(heap)[2]
+			if not timer.cancelled:
+				timer.trigger()
+				fired += 1
+	done = time.time()
+	return inserted - began, cancelled - inserted, done - cancelled, fired
+
+def wheel(delays, cancel):
+	wheel = TimerWheel(0.01, now=0.0)
+	start = 0.0
+
+	began = time.time()
+	timers = [wheel.add(Timer(start + delay, None, noop, ())) for delay in delays]
+	inserted = time.time()
+
+	for i in cancel:
+		wheel.cancel(timers[i])
+	cancelled = time.time()
+
+	fired = 0
+	for second in xrange(span + 2):
+		wheel.next_tick()
+		for timer in wheel.advance(start + second):
+			timer.trigger()
+			fired += 1
+	done = time.time()
+	return inserted - began, cancelled - inserted, done - cancelled, fired
+
+if __name__ == '__main__':
+	count = 100000
+	if len(sys.argv) > 1:
+		count = int(sys.argv[1])
+
+	random.seed(1)
+	delays = [random.uniform(0, span) for i in xrange(count)]
+	cancel = random.sample(xrange(count), count / 2)
+
+	print "%d timers over %d s, %d cancelled" % (count, span, len(cancel))
+	for name, run in [("old heap", old_heap), ("tuple heap", tuple_heap), ("wheel", wheel)]:
+		insert, cancelling, firing, fired = run(delays, cancel)
+		print "%-10s insert %8.0f/s, cancel %9.0f/s, fire %8.0f/s (%d fired)" % (name, count / insert,
+			len(cancel) / cancelling, fired / firing, fired)
@@ -0,0 +1,36 @@
+"""monotonic(): seconds from some fixed point, never going backwards or
+jumping when the system clock is set, for measuring intervals and timers.
+time.time() where the system has no monotonic clock."""
+
+import time
+import ctypes
+import ctypes.util
+
+CLOCK_MONOTONIC = 1
+
+class timespec(ctypes.Structure):
+	_fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+def find_clock_gettime():
+	for name in [ctypes.util.find_library('rt'), ctypes.util.find_library('c')]:
+		if not name:
+			continue
+		try:
+			function = ctypes.CDLL(name, use_errno=True).clock_gettime
+		except (OSError, AttributeError):
+			continue
+		function.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+		function.restype = ctypes.c_int
+		if function(CLOCK_MONOTONIC, ctypes.byref(timespec())) == 0:
+			return function
+	return None
+
+clock_gettime = find_clock_gettime()
+
+if clock_gettime:
+	def monotonic():
+		now = timespec()
+		clock_gettime(CLOCK_MONOTONIC, ctypes.byref(now))
+		return now.tv_sec + now.tv_nsec * 1e-9
+else:
+	monotonic = time.time
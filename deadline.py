@@ -0,0 +1,106 @@
+import time
+import threading
+from contextlib import contextmanager
+
+class DeadlineExceeded(Exception):
+	pass
+
+class Deadline:
+	"""A time some work has to be done by (at None: whenever), which can
+	also be cancelled before that. Work checks it between steps and passes
+	timeout() to anything that blocks, so nothing waits on past it. Nested
+	deadlines never outlast the one they're in, and are cancelled with it."""
+
+	def __init__(self, at=None, parent=None):
+		if parent and parent.at is not None and (at is None or parent.at < at):
+			at = parent.at
+		self.at = at
+		self.parent = parent
+		self.cancelled = False
+
+	def __repr__(self):
+		return "<Deadline %s>" % self.remaining()
+
+	def cancel(self):
+		self.cancelled = True
+
+	def is_cancelled(self):
+		return self.cancelled or (self.parent is not None and self.parent.is_cancelled())
+
+	def remaining(self):
+		"""Seconds left, or None if there is no limit."""
+		if self.is_cancelled():
+			return 0.0
+		if self.at is None:
+			return None
+		return max(0.0, self.at - time.time())
+
+	def expired(self):
+		return self.remaining() == 0.0
+
+	def check(self):
+		if self.expired():
+			raise DeadlineExceeded()
+
+	def timeout(self, cap=None):
+		"""The timeout for a blocking call: the time left, but at most cap.
+		Raises DeadlineExceeded if there's none left."""
+		self.check()
+		remaining = self.remaining()
+		if remaining is None:
+			return cap
+		if cap is None:
+			return remaining
+		return min(cap, remaining)
+
+local = threading.local()
+
+def current():
+	"""The innermost deadline the calling thread is working under."""
+	stack = getattr(local, 'stack', None)
+	if stack:
+		return stack[-1]
+	return Deadline()
+
+@contextmanager
+def until(at):
+	"""Runs the with block under a deadline at time at (None: no time of its
+	own, but the enclosing one still counts)."""
+	if not hasattr(local, 'stack'):
+		local.stack = []
+
+	deadline = Deadline(at, current())
+	local.stack.append(deadline)
+	try:
+		yield deadline
+	finally:
+		local.stack.pop()
+
+def within(seconds):
+	return until(time.time() + seconds)
+
+def communicate(process, cap=None):
+	"""process.communicate(), but the process is killed if the deadline (or
+	cap seconds) passes first, and DeadlineExceeded raised."""
+	timeout = current().timeout(cap)
+	if timeout is None:
+		return process.communicate()
+
+	killed = []
+	def kill():
+		killed.append(True)
+		try:
+			process.kill()
+		except OSError:
+			pass
+
+	timer = threading.Timer(timeout, kill)
+	timer.start()
+	try:
+		result = process.communicate()
+	finally:
+		timer.cancel()
+
+	if killed:
+		raise DeadlineExceeded()
+	return result
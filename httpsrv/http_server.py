@@ -169,6 +169,13 @@ class HTTPServer:
 		self.request_queue_lock = threading.Lock()
 		self.request_queue = []
 
+		self.reactor = None
+
+	def attach(self, reactor):
+		"""Lets the reactor accept connections instead of polling tick()."""
+		self.reactor = reactor
+		reactor.register(self.socket, self.on_readable)
+
 	def register_handle_request_callback(self, callback):
 		self.handle_request_callback = callback
 
@@ -216,22 +223,35 @@ class HTTPServer:
 			self.request_queue_lock.acquire()
 			self.request_queue.append(request)
 			self.request_queue_lock.release()
+
+			if self.reactor:
+				self.reactor.call_from_thread(self.handle_requests)
 		except TimeoutError:
 			client.socket.close()
 		except InvalidRequestException:
 			error_handler.output_message("[http_server] invalid request O.o")
 			client.socket.close()
 
-	def tick(self):
+	def handle_requests(self):
 		self.request_queue_lock.acquire()
 		while self.request_queue:
 			request = self.request_queue.pop()
 			self.handle_request_callback(request)
 		self.request_queue_lock.release()
 
-		try:
-			client = self.accept_client_connection()
+	def accept_client_connections(self):
+		while True:
+			try:
+				client = self.accept_client_connection()
+			except socket.error:
+				return # no more incoming connections atm...
+
 			thread = threading.Thread(None, self.get_request, None, (client,))
 			thread.start()
-		except socket.error:
-			pass # no incoming connection atm...
+
+	def on_readable(self):
+		self.accept_client_connections()
+
+	def tick(self):
+		self.handle_requests()
+		self.accept_client_connections()
@@ -0,0 +1,144 @@
+import time
+import json
+import bisect
+
+import settings
+
+# Histogram bucket upper bounds in seconds: 10 us to about two minutes, each
+# 20% above the last, so percentiles read off them are within 20%.
+bounds = []
+bound = 0.00001
+while bound < 120:
+	bounds.append(bound)
+	bound *= 1.2
+
+class Histogram:
+	def __init__(self):
+		self.counts = [0] * (len(bounds) + 1)
+		self.total = 0
+
+	def add(self, seconds):
+		self.counts[bisect.bisect_left(bounds, seconds)] += 1
+		self.total += 1
+
+	def percentile(self, p):
+		"""The upper bound of the bucket the p:th percentile falls in, or None
+		if nothing has been added."""
+		if not self.total:
+			return None
+
+		wanted = self.total * p / 100.0
+		seen = 0
+		for i, count in enumerate(self.counts):
+			seen += count
+			if count and seen >= wanted:
+				return bounds[min(i, len(bounds) - 1)]
+		return bounds[-1]
+
+class Record:
+	"""Calls, errors and the latency of one hook, command or HTTP host.
+	Every call is counted, but only every every:th one timed.
+
+	Counters are bumped without a lock from the reactor and worker threads
+	alike; now and then a count may be lost."""
+
+	def __init__(self, kind, name, every=1):
+		self.kind = kind
+		self.name = name
+		self.every = every
+		self.calls = 0
+		self.errors = 0
+		self.histogram = Histogram()
+		self.sampled_seconds = 0.0
+		self.created = time.time()
+
+	def start(self):
+		"""Counts a call. Returns the time if this one is to be timed, to
+		be handed to finish(), or None."""
+		self.calls += 1
+		if self.calls % self.every:
+			return None
+		return time.time()
+
+	def finish(self, started, failed=False):
+		if failed:
+			self.errors += 1
+		if started is not None:
+			seconds = time.time() - started
+			self.histogram.add(seconds)
+			self.sampled_seconds += seconds
+
+	def summary(self):
+		def ms(seconds):
+			if seconds is None:
+				return None
+			return round(seconds * 1000, 3)
+
+		samples = self.histogram.total
+		mean = None
+		if samples:
+			mean = self.sampled_seconds / samples
+
+		return { "kind": self.kind, "name": self.name, "calls": self.calls, "errors": self.errors,
+			"per_second": self.calls / max(time.time() - self.created, 1.0), "samples": samples,
+			"mean_ms": ms(mean), "p50_ms": ms(self.histogram.percentile(50)),
+			"p95_ms": ms(self.histogram.percentile(95)), "p99_ms": ms(self.histogram.percentile(99)) }
+
+# (kind, name) -> Record
+records = {}
+started = time.time()
+
+# Bound plugin hook -> its Record, so dispatch needn't build names. Cleared
+# when the hook table is rebuilt.
+hook_records = {}
+
+def record(kind, name, every=1):
+	key = (kind, name)
+	result = records.get(key)
+	if result is None:
+		result = records.setdefault(key, Record(kind, name, every))
+	return result
+
+def for_hook(hook):
+	"""The Record for a plugin hook; one in settings.stats_sample_every
+	calls is timed."""
+	result = hook_records.get(hook)
+	if result is None:
+		result = record('hook', '%s.%s' % (hook.im_class.__name__, hook.__name__), settings.stats_sample_every)
+		hook_records[hook] = result
+	return result
+
+def start_hook(hook):
+	"""Record.start() for hook, in one call as this is on every dispatch.
+	Returns the Record and start time if the call is to be timed, else None."""
+	result = hook_records.get(hook)
+	if result is None:
+		result = for_hook(hook)
+	result.calls += 1
+	if result.calls % result.every:
+		return None
+	return result, time.time()
+
+def finish_hook(hook, timing, failed=False):
+	if failed:
+		for_hook(hook).errors += 1
+	if timing:
+		timing[0].finish(timing[1])
+
+def forget_hooks():
+	global hook_records
+	hook_records = {}
+
+def snapshot(kind=None):
+	"""Summaries of every record (of kind), busiest first."""
+	summaries = [r.summary() for r in records.values() if kind is None or r.kind == kind]
+	summaries.sort(key=lambda summary: -summary["calls"])
+	return summaries
+
+def report():
+	return { "time": time.time(), "uptime": time.time() - started, "records": snapshot() }
+
+def dump(path):
+	"""Writes report() to path as JSON."""
+	with open(path, 'w') as file:
+		json.dump(report(), file, indent=1)
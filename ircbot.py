@@ -1,74 +1,57 @@
 from ircclient.ircclient import IRCClient
+from reactor import Reactor
+from worker_pool import WorkerPool
+from sandbox import Sandbox
+from scheduler import Scheduler
+from background_jobs import JobRunner
 import plugin_handler
+import instrumentation
+import result_cache
 import sys
 import traceback
 import datetime
 
 import error_handler
+import settings
 
 plugin_handler.plugins_on_load()
 
-from heapq import heappush, heappop
-class PriorityQueue:
-	def __init__(self):
-		self.internal_array = []
+def network_config(config):
+	"""Fills in whatever a settings.networks entry leaves out from the
+	top-level settings."""
+	result = { "name": settings.server_address, "server_address": settings.server_address,
+		"server_port": settings.server_port, "servers": settings.servers, "nick": settings.nick, "username": settings.username,
+		"realname": settings.realname, "channels": settings.channels }
+	result.update(config)
+	return result
 
-	def clear(self):
-		self.internal_array = []
+class Network:
+	"""One IRC connection, and the bot as plugins see it while handling that
+	connection's events: tell, send and join go to this network, everything
+	else is forwarded to the IRCBot."""
 
-	def push(self, item):
-		heappush(self.internal_array, item)
+	def __init__(self, bot, config):
+		self.bot = bot
+		self.name = config["name"]
+		self.network = self.name
+		self.channels = config["channels"]
 
-	def pop(self):
-		return heappop(self.internal_array)
+		self.client = IRCClient(config["server_address"], config["server_port"], config["nick"], config["username"], config["realname"], bot.reactor, self.name, config["servers"])
+		self.client.callbacks = { "on_connected": self.on_connected, "on_message": self.on_irc_message, "on_join": self.on_join, "on_nick_change": self.on_nick_change, "on_notice": self.on_notice, "on_part": self.on_part, "on_privmsg": self.on_privmsg, "on_quit": self.on_quit }
+		self.membership = self.client.membership
 
-	def empty(self):
-		return len(self.internal_array) == 0
-	
-	def top(self):
-		return self.internal_array[0]
+	def __getattr__(self, name):
+		return getattr(self.bot, name)
 
-class TimedEvent:
-	def __init__(self, trigger_delta, recurring, target, args):
-		self.trigger_delta = trigger_delta
-		self.trigger_time = datetime.datetime.now() + trigger_delta
-		self.recurring = recurring
-		self.target = target
-		self.args = args
+	def __repr__(self):
+		return "<Network %s>" % self.name
 
-	def trigger(self):
-		self.target(*self.args)
-
-	def reset(self):
-		self.trigger_time += self.trigger_delta
-
-	def __cmp__(self, other):
-		return cmp(self.trigger_time, other.trigger_time)
-
-class IRCBot:
-	def __init__(self, address, port, nick, username, realname):
-		self.client = IRCClient(address, port, nick, username, realname)
-		self.client.callbacks = { "on_connected": self.on_connected, "on_join": self.on_join, "on_nick_change": self.on_nick_change, "on_notice": self.on_notice, "on_part": self.on_part, "on_privmsg": self.on_privmsg, "on_quit": self.on_quit }
-		self.plugins = []
-		self.timer_heap = PriorityQueue()
+	def execute_plugins(self, trigger, *arguments):
+		self.bot.call_plugins(self, trigger, arguments)
 
-	def is_connected(self):
-		return self.client.is_connected()
+	def on_irc_message(self, message):
+		self.execute_plugins("on_irc_message", message)
 
-	def execute_plugins(self, trigger, *arguments):
-		for plugin in plugin_handler.all_plugins():
-			try:
-				#if arguments:
-				#	print trigger
-				#	print("plugin.%s(self, %s)" % (trigger,", ".join(arguments)))
-				#else:
-				#	print("plugin.%s(self)" % trigger)
-				plugin.__class__.__dict__[trigger](plugin, self, *arguments)
-			except KeyError:
-				pass
-			except:
-				error_handler.output_message("argh " + str(plugin) + " " + str(sys.exc_info()) + " " + str(traceback.extract_tb(sys.exc_info()[2])))
-	
 	def on_connected(self):
 		self.execute_plugins("on_connected")
 
@@ -85,20 +68,13 @@ class IRCBot:
 		self.execute_plugins("on_part", nick, channel, reason)
 
 	def on_privmsg(self, nick, target, message):
-		#for plugin in plugin_handler.all_plugins():
-		#	plugin.on_privmsg(self, nick, target, message)
 		self.execute_plugins("on_privmsg", nick, target, message)
 
 	def on_quit(self, nick, reason):
 		self.execute_plugins("on_quit", nick, reason)
 
-	def reload_plugins(self):
-		plugin_handler.plugins_on_unload()
-		plugin_handler.reload_plugin_modules()
-		plugin_handler.plugins_on_load()
-	
-	def load_plugin(self, plugin):
-		plugin_handler.load_plugin(plugin)
+	def is_connected(self):
+		return self.client.is_connected()
 
 	def connect(self, address, port):
 		return self.client.connect(address, port)
@@ -109,28 +85,167 @@ class IRCBot:
 	def send(self, line):
 		return self.client.send(line)
 
-	def tell(self, target, message):
-		return self.client.tell(target, message)
+	def tell(self, target, message, requester=None):
+		return self.client.tell(target, message, requester)
 
-	def tick(self):
-		now = datetime.datetime.now()
+	def more(self, target, requester=None):
+		return self.client.more(target, requester)
+
+	def add_background_job(self, name, callback, target, args, reply_to=None, timeout=None):
+		# Replies go out on this network.
+		return self.bot.jobs.submit(name, target, args, callback, reply_to, timeout, self.tell)
+
+class IRCBot:
+	"""Runs any number of networks in one reactor with one set of plugins.
+
+	The connection methods act on the first network; plugins handling an
+	event are given that event's Network instead of the IRCBot."""
+
+	def __init__(self, networks, reactor=None):
+		if not reactor:
+			reactor = Reactor()
+		self.reactor = reactor
+
+		# Forked before anything else starts threads or opens sockets.
+		self.sandbox = None
+		if settings.sandbox_processes:
+			self.sandbox = Sandbox(settings.sandbox_processes, settings.sandbox_cpu_seconds,
+				settings.sandbox_memory, settings.sandbox_timeout)
+
+		self.networks = []
+		for config in networks:
+			network = Network(self, network_config(config))
+			self.networks.append(network)
+			reactor.call_later(0, network.client.reconnect)
+
+		self.client = self.networks[0].client
+		self.membership = self.client.membership
+		self.plugins = []
+		self.timers = reactor.timers
+
+		self.workers = WorkerPool(reactor, settings.command_workers,
+			{ "nick": settings.command_nick_limit, "channel": settings.command_channel_limit, "refresh": 1,
+				"job": settings.background_job_limit },
+			settings.command_queue_limit)
+
+		self.jobs = JobRunner(reactor, self.workers, self.tell)
+		self.scheduler = Scheduler(reactor, self.jobs, settings.scheduler_slack)
+		self.beat_jobs = {}
+		self.schedule_timer_beats()
+
+	def get_network(self, name):
+		for network in self.networks:
+			if network.name == name:
+				return network
+		return None
 
-		if not self.timer_heap.empty() and not self.client.connected:
-			error_handler.output_message("ATTENTION! We are not connected. Skipping timers!")
+	def is_connected(self):
+		return self.client.is_connected()
+
+	def call_plugins(self, bot, trigger, arguments):
+		if trigger == "on_privmsg":
+			hooks = plugin_handler.get_privmsg_hooks(arguments[2])
 		else:
-			while not self.timer_heap.empty() and self.timer_heap.top().trigger_time <= now:
-				timer = self.timer_heap.pop()
-				timer.trigger()
-				if timer.recurring:
-					timer.reset()
-					self.timer_heap.push(timer)
+			hooks = plugin_handler.get_hooks(trigger)
 
-		self.client.tick()
+		for hook in hooks:
+			timing = instrumentation.start_hook(hook)
+			try:
+				hook(bot, *arguments)
+			except:
+				instrumentation.finish_hook(hook, timing, True)
+				error_handler.output_message("argh " + str(hook.im_self) + " " + str(sys.exc_info()) + " " + str(traceback.extract_tb(sys.exc_info()[2])))
+			else:
+				if timing:
+					instrumentation.finish_hook(hook, timing)
 
-	def add_timer(self, delta, recurring, target, *args):
-		timer = TimedEvent(delta, recurring, target, args)
+	def execute_plugins(self, trigger, *arguments):
+		self.call_plugins(self, trigger, arguments)
 
-		self.timer_heap.push(timer)
+	def reload_plugins(self, everything=False):
+		"""Reloads the plugin modules that changed (or all of them) and what
+		depends on them. Returns their names and the seconds it took."""
+		# Commands (.reload among them) run on worker threads, but plugins
+		# must only be swapped out while nothing is dispatching to them.
+		if not self.reactor.in_loop_thread():
+			return self.reactor.call_and_wait(self.reload_plugins, everything)
 
-	def add_background_job(self, name, callback, target, args):
-		pass
+		modules, seconds = plugin_handler.reload_changed(everything)
+		error_handler.output_message("Reloaded %s in %.3f s" % (", ".join(modules) or "nothing", seconds))
+
+		if modules and self.sandbox:
+			self.sandbox.restart(modules)
+
+		# Changed commands may well answer differently now.
+		if modules:
+			result_cache.cache.purge()
+
+		self.schedule_timer_beats()
+
+		return modules, seconds
+
+	def load_plugin(self, plugin):
+		if not self.reactor.in_loop_thread():
+			return self.reactor.call_and_wait(self.load_plugin, plugin)
+
+		plugin_handler.load_plugin(plugin)
+
+		if self.sandbox:
+			self.sandbox.restart(['plugins.' + plugin])
+
+		self.schedule_timer_beats()
+
+	def schedule_timer_beats(self):
+		"""Schedules timer_beat for the plugins that have one, and stops it
+		for those that have been unloaded or replaced."""
+		hooks = dict([(hook.im_self, hook) for hook in plugin_handler.get_hooks('timer_beat')])
+
+		for plugin, job in self.beat_jobs.items():
+			if plugin not in hooks:
+				job.cancel()
+				del self.beat_jobs[plugin]
+
+		for plugin, hook in hooks.items():
+			if plugin not in self.beat_jobs and plugin.beat_interval:
+				self.beat_jobs[plugin] = self.scheduler.schedule(plugin.__class__.__name__ + ".timer_beat",
+					self.timer_beat, (hook,), plugin.beat_interval, jitter=plugin.beat_jitter,
+					max_runtime=plugin.beat_max_runtime, background=plugin.beat_in_background)
+
+	def timer_beat(self, hook):
+		# Beats belong to no network; plugins reply with tell_on() to the
+		# network each of their things came from.
+		hook(self, datetime.datetime.now())
+
+	def connect(self, address, port):
+		return self.client.connect(address, port)
+
+	def join(self, channel):
+		return self.client.join(channel)
+
+	def send(self, line):
+		return self.client.send(line)
+
+	def tell(self, target, message, requester=None):
+		return self.client.tell(target, message, requester)
+
+	def tell_on(self, network, target, message):
+		"""Tells target on the network named network, or on the first one if
+		there's no such network (or network is None, as in what was saved
+		before there were several)."""
+		return (self.get_network(network) or self.networks[0]).tell(target, message)
+
+	def more(self, target, requester=None):
+		return self.client.more(target, requester)
+
+	def tick(self):
+		self.reactor.run_once(0)
+
+	def add_timer(self, delta, recurring, target, *args):
+		return self.reactor.add_timer(delta, recurring, target, *args)
+
+	def add_background_job(self, name, callback, target, args, reply_to=None, timeout=None):
+		"""Runs target(*args) on the worker pool as job name. Once it's over
+		callback(job) runs on the reactor thread, and reply_to, if given, is
+		told how it went. Returns the BackgroundJob (see background_jobs.py),
+		or None if too much is waiting already."""
+		return self.jobs.submit(name, target, args, callback, reply_to, timeout)
@@ -0,0 +1,20 @@
+import random
+
+class Backoff:
+	"""Delays between reconnect attempts: doubling from base up to cap, with
+	"equal jitter" (half the delay fixed, half random) so bots thrown off a
+	server together don't all come back in the same second."""
+
+	def __init__(self, base=2.0, cap=300.0):
+		self.base = base
+		self.cap = cap
+		self.reset()
+
+	def reset(self):
+		self.attempts = 0
+
+	def next_delay(self):
+		delay = min(self.cap, self.base * 2 ** self.attempts)
+		if delay < self.cap:
+			self.attempts += 1
+		return delay / 2 + random.uniform(0, delay / 2)
@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import gzip
+import atexit
+import threading
+import Queue
+from collections import deque
+
+import error_handler
+
+timestamp_cache = [None, None]
+
+def timestamp():
+	"""Returns "[HH:MM:SS]", formatting it at most once per second."""
+	now = int(time.time())
+	cached_second, cached_text = timestamp_cache
+	if now != cached_second:
+		cached_text = time.strftime("[%H:%M:%S]", time.localtime(now))
+		timestamp_cache[:] = [now, cached_text]
+	return cached_text
+
+class LogWriter(threading.Thread):
+	"""Background thread that echoes log lines to stdout and appends them to
+	size-rotated segment files, one write per batch of queued lines.
+
+	At most queue_size lines wait to be written; if stdout or the disk is
+	that far behind, further lines are dropped and counted rather than
+	block the caller, and the log says how many went missing."""
+
+	def __init__(self, directory, segment_bytes, compress, echo, name=None, batch_size=1000, queue_size=10000):
+		threading.Thread.__init__(self, name="LogWriter")
+		self.daemon = True
+
+		self.directory = directory
+		self.segment_bytes = segment_bytes
+		self.compress = compress
+		self.echo = echo
+		self.log_name = name
+		self.batch_size = batch_size
+
+		self.queue = Queue.Queue(queue_size)
+		self.dropped = 0
+		self.reported = 0
+		self.segment = None
+		self.segment_path = None
+		self.segment_size = 0
+
+	def put(self, line):
+		try:
+			self.queue.put_nowait(line)
+		except Queue.Full:
+			self.dropped += 1
+
+	def close(self):
+		self.queue.put(None)
+		self.join()
+
+	def run(self):
+		while True:
+			batch = [self.queue.get()]
+			try:
+				while len(batch) < self.batch_size:
+					batch.append(self.queue.get_nowait())
+			except Queue.Empty:
+				pass
+
+			stop = None in batch
+			if stop:
+				batch = batch[0:batch.index(None)]
+
+			dropped = self.dropped
+			if dropped > self.reported:
+				batch.append("%s [%d lines not logged: the log couldn't keep up]" % (timestamp(), dropped - self.reported))
+				self.reported = dropped
+
+			if batch:
+				try:
+					self.write(batch)
+				except:
+					error_handler.output_message("Could not write conversation log: " + str(sys.exc_info()))
+
+			if stop:
+				self.close_segment()
+				return
+
+	def write(self, batch):
+		data = "\n".join(batch) + "\n"
+
+		if self.echo:
+			sys.stdout.write(data)
+			sys.stdout.flush()
+
+		if self.directory:
+			if not self.segment:
+				self.open_segment()
+
+			self.segment.write(data)
+			self.segment.flush()
+			self.segment_size += len(data)
+
+			if self.segment_size >= self.segment_bytes:
+				self.close_segment()
+
+	def open_segment(self):
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+
+		name = "irc-"
+		if self.log_name:
+			name += self.log_name + "-"
+		name += time.strftime("%Y%m%d-%H%M%S")
+		path = os.path.join(self.directory, name + ".log")
+		n = 1
+		while os.path.exists(path) or os.path.exists(path + ".gz"):
+			path = os.path.join(self.directory, "%s-%d.log" % (name, n))
+			n += 1
+
+		self.segment = open(path, "a")
+		self.segment_path = path
+		self.segment_size = 0
+
+	def close_segment(self):
+		if not self.segment:
+			return
+
+		self.segment.close()
+		self.segment = None
+
+		if self.compress:
+			source = open(self.segment_path, "rb")
+			target = gzip.open(self.segment_path + ".gz", "wb")
+			try:
+				while True:
+					data = source.read(65536)
+					if not data:
+						break
+					target.write(data)
+			finally:
+				source.close()
+				target.close()
+			os.remove(self.segment_path)
+
+class ConversationLog:
+	"""The last tail_lines lines in memory, everything else handed to a
+	LogWriter so logging never blocks the event loop on I/O."""
+
+	def __init__(self, tail_lines=500, directory=None, segment_bytes=4*1024*1024, compress=False, echo=True, name=None, queue_lines=10000):
+		self.lines = deque(maxlen=tail_lines)
+
+		self.writer = None
+		if directory or echo:
+			self.writer = LogWriter(directory, segment_bytes, compress, echo, name, queue_size=queue_lines)
+			self.writer.start()
+			atexit.register(self.close)
+
+	def log_line(self, line):
+		self.lines.append(line)
+		if self.writer:
+			self.writer.put(line)
+
+	def close(self):
+		if self.writer and self.writer.is_alive():
+			self.writer.close()
@@ -1,42 +1,81 @@
 from __future__ import with_statement
 
+import os
 import sys
 import socket
 import re
 import time
 import datetime
 import errno
-
-def timestamp():
-	return datetime.datetime.now().strftime("[%H:%M:%S]")
+import threading
+
+import settings
+import error_handler
+from line_buffer import LineBuffer
+from message import parse_message
+from conversation_log import ConversationLog, timestamp
+from send_queue import SendQueue, TokenBucket
+from membership import Membership
+from backoff import Backoff
+from isupport import parse_isupport, parse_prefix, parse_targmax
+from output import split_text, Pager
 
 class IRCClient:
-	def __init__(self, address, port, nick, username, realname):
+	# IRCv3 capabilities we ask for when the server offers them.
+	wanted_caps = ["multi-prefix", "extended-join", "away-notify", "account-notify",
+		"server-time", "batch", "userhost-in-names"]
+
+	def __init__(self, address, port, nick, username, realname, reactor=None, network=None, servers=()):
+		self.reactor = reactor
+		self.network = network
 		self.connected = False
+		self.connecting = False
 		self.active_session = False
-		self.temp_nick_list_channel = None
-		self.temp_nick_list = None
-		self.nick_lists = {}
-		self.recv_buf = ''
+		self.membership = Membership()
+		self.chanmodes = ["b", "k", "l", "imnpst"]
+		self.isupport = {}
+		self.targmax = {}
+		self.source = None
+		self.pager = Pager()
+		self.caps = set()
+		self.available_caps = set()
+		self.negotiating_caps = False
+		self.batches = {}
+		self.recv_buffer = LineBuffer(settings.max_line_length)
 		self.callbacks = {}
 
-		self.lines = []
+		self.log = ConversationLog(settings.log_tail_lines, settings.log_directory, settings.log_segment_bytes, settings.log_compress, settings.log_echo, network,
+			settings.log_queue_lines)
+		self.lines = self.log.lines
 
 		self.s = None
+		self.send_queue = SendQueue(TokenBucket(settings.flood_burst, settings.flood_line_cost, settings.flood_bytes_per_second))
+		self.send_buf = ''
+		self.flush_timer = None
 
 		self.wait_until = None
+		self.backoff = Backoff(settings.reconnect_min_delay, settings.reconnect_max_delay)
+		self.connect_attempt = 0
+		self.connecting_to = None
+		self.pending_addresses = []
 
-		self.irc_message_pattern = re.compile('^(:([^  ]+))?[   ]*([^  ]+)[  ]+:?([^  ]*)[   ]*:?(.*)$')
 		self.message_handlers = {
+			'CAP': self.on_cap,
+			'ACCOUNT': self.on_account,
+			'AWAY': self.on_away,
+			'BATCH': self.on_batch,
 			'JOIN': self.on_join,
 			'KICK': self.on_kick,
 			'NICK': self.on_nick,
 			'PART': self.on_part,
+			'MODE': self.on_mode,
 			'QUIT': self.on_quit,
 			'PING': self.on_ping,
 			'PRIVMSG': self.on_privmsg,
 			'NOTICE': self.on_notice,
 			'ERROR': self.on_error,
+			'005': self.on_isupport,
+			'396': self.on_host_hidden,
 			'353': self.on_begin_nick_list,
 			'366': self.on_end_nick_list,
 			'001': self.on_connected
@@ -44,225 +83,627 @@ class IRCClient:
 
 		self.server_address = address;
 		self.server_port = port;
+		self.servers = [(address, port)] + list(servers)
+		self.server_index = 0
 
 		self.nick = nick
 		self.username = username
 		self.realname = realname
 
+	def reset_session(self):
+		self.active_session = False
+		self.ping_count = 0
+		self.recv_buffer.clear()
+		self.membership.clear()
+		self.send_queue.clear()
+		self.send_queue.bucket.reset()
+		self.send_buf = ''
+		self.source = None
+		self.isupport = {}
+		self.apply_isupport()
+		self.caps = set()
+		self.available_caps = set()
+		self.negotiating_caps = False
+		self.batches = {}
+
 	def connect(self, address, port):
+		"""Blocking connect, for running without a reactor."""
 		self.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
-		self.active_session = False
-		self.ping_count = 0
+		self.reset_session()
 		self.connected = self.s.connect_ex((address, port)) == 0
 
 		if self.connected:
 			self.s.setblocking(False)
+			if self.reactor:
+				self.reactor.register(self.s, self.on_readable)
 
 		return self.connected
 
+	def disconnect(self):
+		if self.s:
+			if self.reactor:
+				self.reactor.unregister(self.s)
+			self.s.close()
+			self.s = None
+
+		# A server that drops us before we are registered gets skipped in
+		# favour of the next one.
+		if not self.active_session:
+			self.server_index += 1
+
+		self.connected = False
+		self.active_session = False
+
+		if self.reactor:
+			self.schedule_reconnect()
+
+	def schedule_reconnect(self):
+		delay = self.backoff.next_delay()
+		if self.wait_until:
+			delay = max(delay, (self.wait_until - datetime.datetime.now()).total_seconds())
+
+		self.log_line(timestamp() + " Reconnecting in %.1f seconds" % delay)
+		self.reactor.call_later(delay, self.reconnect)
+
+	def register(self):
+		# Servers that know CAP hold registration until CAP END; the others
+		# answer with an unknown command error and register us right away.
+		self.negotiating_caps = True
+		self.send("CAP LS 302")
+		self.send("USER %s * * :%s" % (self.username, self.realname))
+		self.send("NICK %s" % self.nick)
+
+	def reconnect(self):
+		if self.connected or self.connecting:
+			return
+
+		address, port = self.servers[self.server_index % len(self.servers)]
+
+		if self.reactor:
+			self.start_connect(address, port)
+			return
+
+		try:
+			self.connect(address, port)
+		except socket.error, (error_code, error_message):
+			print "I got an error while trying to connect... Is it wrong to just return now?", (error_code, error_message)
+
+		if self.connected:
+			self.register()
+		else:
+			self.server_index += 1
+			self.idle_for(self.backoff.next_delay())
+
+	# Connecting through the reactor: getaddrinfo runs in a thread of its
+	# own and posts the addresses back, then each address gets a
+	# non-blocking connect until one succeeds. Every attempt has a number;
+	# callbacks and timeouts belonging to an older attempt are ignored.
+
+	def start_connect(self, address, port):
+		self.connecting = True
+		self.connect_attempt += 1
+		attempt = self.connect_attempt
+
+		self.log_line(timestamp() + " Connecting to %s:%d" % (address, port))
+		self.reactor.call_later(settings.connect_timeout, self.on_connect_timeout, attempt)
+
+		resolver = threading.Thread(target=self.resolve, args=(attempt, address, port), name="Resolver")
+		resolver.daemon = True
+		resolver.start()
+
+	def resolve(self, attempt, address, port):
+		try:
+			addresses = socket.getaddrinfo(address, port, socket.AF_UNSPEC, socket.SOCK_STREAM)
+		except socket.error, e:
+			self.reactor.call_from_thread(self.connect_failed, attempt, "could not resolve %s: %s" % (address, e))
+			return
+
+		addresses = [(family, sockaddr) for family, socktype, proto, canonname, sockaddr in addresses]
+		self.reactor.call_from_thread(self.on_resolved, attempt, addresses)
+
+	def on_resolved(self, attempt, addresses):
+		if attempt == self.connect_attempt:
+			self.pending_addresses = addresses
+			self.connect_next_address()
+
+	def connect_next_address(self):
+		while self.pending_addresses:
+			family, sockaddr = self.pending_addresses.pop(0)
+
+			s = socket.socket(family, socket.SOCK_STREAM)
+			s.setblocking(False)
+			error_code = s.connect_ex(sockaddr)
+
+			if error_code in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+				self.s = s
+				self.connecting_to = sockaddr
+				self.reactor.register(s, self.on_connect_ready, self.on_connect_ready)
+				return
+
+			s.close()
+			self.log_line(timestamp() + " Could not connect to %s: %s" % (sockaddr[0], os.strerror(error_code)))
+
+		self.connect_failed(self.connect_attempt, "no address could be reached")
+
+	def on_connect_ready(self):
+		error_code = self.s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+		if not error_code:
+			try:
+				self.s.getpeername()
+			except socket.error, (error_code, error_message):
+				if error_code == errno.ENOTCONN:
+					# Spurious wakeup, the handshake is still going.
+					return
+
+		self.reactor.unregister(self.s)
+
+		if error_code:
+			self.log_line(timestamp() + " Could not connect to %s: %s" % (self.connecting_to[0], os.strerror(error_code)))
+			self.s.close()
+			self.s = None
+			self.connect_next_address()
+			return
+
+		self.connecting = False
+		self.connect_attempt += 1
+
+		self.reset_session()
+		self.connected = True
+		self.reactor.register(self.s, self.on_readable)
+		self.register()
+
+	def on_connect_timeout(self, attempt):
+		if attempt != self.connect_attempt:
+			return
+
+		if self.s:
+			self.reactor.unregister(self.s)
+			self.s.close()
+			self.s = None
+
+		self.connect_failed(attempt, "timed out")
+
+	def connect_failed(self, attempt, reason):
+		if attempt != self.connect_attempt:
+			return
+
+		self.connecting = False
+		self.connect_attempt += 1
+		self.server_index += 1
+
+		self.log_line(timestamp() + " Connecting failed: " + reason)
+		self.schedule_reconnect()
+
 	def log_line(self, line):
-		print line
-		self.lines.append(line)
+		self.log.log_line(line)
 	
-	def send(self, line):
-		self.log_line(timestamp() + " SENT: " + line)
+	def send(self, line, priority=False):
+		"""Queues line for sending. PONGs, and lines sent with priority set,
+		go out ahead of everything else. May be called from any thread."""
+		if self.reactor and not self.reactor.in_loop_thread():
+			self.reactor.call_from_thread(self.send, line, priority)
+			return len(line)+2
 
-		data = line + "\r\n"
+		if not self.connected:
+			error_handler.output_message("Not connected, dropping: " + line)
+			return 0
 
-		while data:
-			sent =  self.s.send(data)
-			data = data[sent:]
+		self.send_queue.push(line, priority or line.startswith("PONG "))
+		self.flush_output()
 
 		return len(line)+2
 
+	def flush_output(self):
+		while self.connected:
+			if not self.send_buf:
+				wait = self.send_queue.wait_time()
+				if wait is None:
+					break
+				elif wait > 0:
+					self.schedule_flush(wait)
+					break
+
+				line = self.send_queue.pop()
+				self.log_line(timestamp() + " SENT: " + line)
+				self.send_buf = line + "\r\n"
+
+			try:
+				sent = self.s.send(self.send_buf)
+			except socket.error, (error_code, error_message):
+				if error_code in (errno.EWOULDBLOCK, errno.EINTR):
+					if self.reactor:
+						self.reactor.set_writable_callback(self.s, self.flush_output)
+				else:
+					print (error_code, error_message)
+					self.disconnect()
+				return
+
+			self.send_buf = self.send_buf[sent:]
+
+		if self.s and self.reactor:
+			self.reactor.set_writable_callback(self.s, None)
+
+	def schedule_flush(self, seconds):
+		if self.reactor and not self.flush_timer:
+			self.flush_timer = self.reactor.call_later(seconds, self.on_flush_timer)
+
+	def on_flush_timer(self):
+		self.flush_timer = None
+		self.flush_output()
+
 	def is_connected(self):
 		return self.connected
 
-	def tell(self, target, string):
-		if len(string) >= 399:
-			string = string[0:399]
-
-		split = len(string) - 1
+	def tell(self, target, string, requester=None):
+		"""Sends string as PRIVMSG to target, a channel or nick or a list of
+		them (sent together as far as TARGMAX allows). string is split at
+		word boundaries into lines that fit the server's limits; at most
+		settings.max_reply_lines go out and the rest waits for more() under
+		the target and requester."""
+		if self.reactor and not self.reactor.in_loop_thread():
+			self.reactor.call_from_thread(self.tell, target, string, requester)
+			return 0
+
+		if isinstance(string, unicode):
+			string = string.encode('utf-8')
+
+		if isinstance(target, basestring):
+			targets = [target]
+		else:
+			targets = list(target)
+
+		max_lines = settings.max_reply_lines
+		sent = 0
+
+		for group in self.group_targets("PRIVMSG", targets):
+			limit = self.line_limit("PRIVMSG", group)
+			lines = split_text(string, limit)
+
+			if len(lines) > max_lines:
+				marker = self.more_marker()
+				lines = split_text(string, limit - len(marker))
+				for name in group:
+					self.pager.store(self.pager_key(name, requester), lines[max_lines:])
+				lines = lines[0:max_lines]
+				lines[-1] += marker
+
+			for line in lines:
+				sent += self.send("PRIVMSG %s :%s" % (",".join(group), line))
+
+		return sent
+
+	def more(self, target, requester=None):
+		"""Sends the next lines of a reply that tell() kept back, preferring
+		the requester's own. Returns False if nothing was waiting."""
+		if self.reactor and not self.reactor.in_loop_thread():
+			return self.reactor.call_and_wait(self.more, target, requester)
+
+		key = self.pager_key(target, requester)
+		if not self.pager.has(key):
+			key = self.pager_key(target, None)
+			if not self.pager.has(key):
+				return False
+
+		lines, left = self.pager.take(key, settings.max_reply_lines)
+		if left:
+			lines[-1] += self.more_marker()
+
+		for line in lines:
+			self.send("PRIVMSG %s :%s" % (target, line))
+
+		return True
+
+	def more_marker(self):
+		return " (%smore)" % settings.command_prefix
+
+	def pager_key(self, target, requester):
+		if requester:
+			requester = self.membership.lower(requester)
+		return self.membership.lower(target), requester
+
+	def group_targets(self, command, targets):
+		"""Splits targets into groups that may share one command."""
+		count = self.max_targets(command) or len(targets)
+		return [targets[i:i + count] for i in range(0, len(targets), count)]
+
+	def max_targets(self, command):
+		"""Targets per command the server accepts, None meaning no limit."""
+		if command in self.targmax:
+			return self.targmax[command]
+
+		max_targets = self.get_isupport('MAXTARGETS')
+		if max_targets.isdigit():
+			return int(max_targets)
+
+		return 1
+
+	def line_limit(self, command, targets):
+		"""Bytes of text that fit in one command to targets: both the line we
+		send and the line the server relays, which carries our full
+		nick!user@host, have to stay within 512 bytes including CRLF.
+		Until the server has shown us our host, the longest possible one
+		is assumed."""
+		source = self.source or "%s!~%s@%s" % (self.nick, self.username, "x" * 63)
+
+		sent = len("%s %s :" % (command, ",".join(targets)))
+		relayed = len(":%s %s %s :" % (source, command, max(targets, key=len)))
+
+		return max(1, 510 - max(sent, relayed))
+
+	def get_isupport(self, key, default=''):
+		value = self.isupport.get(key, default)
+		if value is True:
+			return default
+		return value
+
+	def apply_isupport(self):
+		prefix = parse_prefix(self.get_isupport('PREFIX'))
+		if prefix:
+			self.membership.set_prefixes(*prefix)
+		else:
+			self.membership.set_prefixes("qaohv", "~&@%+")
 
-		if split >= 400:
-			split = 400
-			while split > 350:
-				if string[split] == ' ':
-					break
-				split -= 1
+		self.membership.set_casemapping(self.get_isupport('CASEMAPPING', 'rfc1459'))
 
-			a = string[0:split]
-			b = string[split:]
-		
-			return self.tell(target, a) + self.tell(target, b)
+		chanmodes = self.get_isupport('CHANMODES').split(',')
+		if len(chanmodes) >= 4:
+			self.chanmodes = chanmodes[0:4]
 		else:
-			return self.send("PRIVMSG " + target + " :" + string)
+			self.chanmodes = ["b", "k", "l", "imnpst"]
+
+		self.targmax = parse_targmax(self.get_isupport('TARGMAX'))
 
 	def join(self, channel):
 		return self.send('JOIN ' + channel)
 
 	def get_nick(self, host):
-		m = re.search('^:?(\S+?)!', host)
-		if m:
-			return m.group(1)
-		else:
-			return host
+		return host.lstrip(':').split('!', 1)[0]
 
-	def on_begin_nick_list(self, tupels):
-		m = re.search('. (.+?) :(.*)$', tupels[5])
+	def is_me(self, nick):
+		return self.membership.lower(nick) == self.membership.lower(self.nick)
 
-		if m:
-			channel, nicks = m.group(1, 2)
+	def on_begin_nick_list(self, message):
+		channel, nicks = message.param(2), message.param(3)
 
-			if self.temp_nick_list_channel != channel:
-				self.temp_nick_list_channel = channel
-				self.temp_nick_list = []
-
-			for m in re.findall('([^a-zA-Z\[\]{}]?)(.+?)(\s|$)', nicks):
-				prefix, nick = m[0:2]
-
-				self.temp_nick_list.append(nick)
+		if channel:
+			self.membership.begin_names(channel, nicks.split())
 			
-	def on_end_nick_list(self, tupels):
-		self.nick_lists[self.temp_nick_list_channel] = self.temp_nick_list
-		self.temp_nick_list_channel = None
-		self.temp_nick_list = None
-
-	def on_join(self, tupels):
-		source, channel = [tupels[1], tupels[4]]
+	def on_isupport(self, message):
+		tokens = message.params[1:]
+		if message.trailing is not None:
+			tokens = tokens[0:-1]
+
+		parse_isupport(tokens, self.isupport)
+		self.apply_isupport()
+
+	def on_host_hidden(self, message):
+		if self.source:
+			self.source = self.source.partition('@')[0] + '@' + message.param(1)
+
+	def on_end_nick_list(self, message):
+		self.membership.end_names(message.param(1))
+
+	def on_join(self, message):
+		source, channel = message.prefix, message.param(0)
+
+		if self.is_me(message.nick):
+			self.source = source
+			self.membership.remove_channel(channel)
+		self.membership.add(channel, message.nick)
+		self.membership.update_user(message.nick, user=message.user, host=message.host)
+
+		# extended-join: "JOIN #channel account :realname", * meaning no
+		# account.
+		if len(message.params) >= 3:
+			account = message.param(1)
+			if account == '*':
+				account = None
+			self.membership.update_user(message.nick, account=account, realname=message.param(2))
 
 		if "on_join" in self.callbacks:
 			self.callbacks["on_join"](source, channel)
 
-	def on_kick(self, tupels):
-		source, channel = [tupels[1], tupels[4]]
-		target_nick = None
-
-		m = re.search('^([^ ]+)', tupels[5])
-		if m:
-			target_nick = m.group(1)
+	def on_kick(self, message):
+		source, channel = message.prefix, message.param(0)
+		target_nick = message.param(1, None)
 
 		if "on_kick" in self.callbacks:
 			self.callbacks["on_kick"](source, channel, target_nick)
 
 		if target_nick:
-			for nick_list in self.nick_lists.values():
-				if target_nick in nick_list:
-					nick_list.remove(target_nick)
+			if self.is_me(target_nick):
+				self.membership.remove_channel(channel)
+			else:
+				self.membership.remove(channel, target_nick)
 
-	def on_nick(self, tupels):
-		source, new_nick = [tupels[1], tupels[4]]
+	def on_nick(self, message):
+		source, new_nick = message.prefix, message.param(0)
 
 		if "on_nick_change" in self.callbacks:
 			self.callbacks["on_nick_change"](source, new_nick)
 
-		source_nick = self.get_nick(source)
+		if self.is_me(message.nick):
+			self.nick = new_nick
+			if self.source:
+				self.source = new_nick + '!' + self.source.partition('!')[2]
 
-		for nick_list in self.nick_lists.values():
-			if source_nick in nick_list:
-				nick_list.remove(source_nick)
-				nick_list.append(new_nick)
+		self.membership.rename(message.nick, new_nick)
 
-	def on_part(self, tupels):
-		source, channel, reason = [tupels[1], tupels[4], tupels[5]]
+	def on_part(self, message):
+		source, channel, reason = message.prefix, message.param(0), message.param(1)
 
 		if "on_part" in self.callbacks:
 			self.callbacks["on_part"](source, channel, reason)
 
-		source_nick = self.get_nick(source)
+		if self.is_me(message.nick):
+			self.membership.remove_channel(channel)
+		else:
+			self.membership.remove(channel, message.nick)
+
+	def on_quit(self, message):
+		source_nick = message.nick
+		reason = message.param(0)
 
-		for nick_list in self.nick_lists.values():
-			if source_nick in nick_list:
-				nick_list.remove(source_nick)
+		if "on_quit" in self.callbacks:
+			self.callbacks["on_quit"](source_nick, reason)
 
-	def on_quit(self, tupels):
-		source = tupels[1]
-		reason = tupels[4]
+		self.membership.quit(source_nick)
 
-		if tupels[5]:
-			reason += ' ' + tupels[5]
+	def on_mode(self, message):
+		channel = message.param(0)
+		if self.is_me(channel):
+			return
 
-		source_nick = self.get_nick(source)
+		list_modes, param_modes, set_param_modes, flag_modes = self.chanmodes
+		arguments = list(message.params[2:])
+		enabled = True
+
+		for mode in message.param(1):
+			if mode == '+':
+				enabled = True
+			elif mode == '-':
+				enabled = False
+			elif mode in self.membership.mode_prefixes:
+				if arguments:
+					self.membership.set_mode(channel, arguments.pop(0), mode, enabled)
+			elif mode in list_modes or mode in param_modes or (enabled and mode in set_param_modes):
+				if arguments:
+					arguments.pop(0)
+
+	def on_cap(self, message):
+		subcommand = message.param(1).upper()
+		caps = message.params[-1].split()
+
+		if subcommand in ('LS', 'NEW'):
+			for cap in caps:
+				self.available_caps.add(cap.partition('=')[0])
+
+			# A multi-line LS reply has * before the last parameter until
+			# the final line.
+			if subcommand == 'LS' and message.param(2) == '*':
+				return
 
-		if "on_quit" in self.callbacks:
-			self.callbacks["on_quit"](source_nick, reason)
+			request = [cap for cap in self.wanted_caps if cap in self.available_caps and cap not in self.caps]
+			if request:
+				self.send("CAP REQ :" + " ".join(request))
+			else:
+				self.end_cap_negotiation()
+		elif subcommand == 'ACK':
+			for cap in caps:
+				if cap.startswith('-'):
+					self.caps.discard(cap[1:])
+				else:
+					self.caps.add(cap)
+			self.end_cap_negotiation()
+		elif subcommand == 'NAK':
+			self.end_cap_negotiation()
+		elif subcommand == 'DEL':
+			for cap in caps:
+				self.caps.discard(cap)
+				self.available_caps.discard(cap)
+
+	def end_cap_negotiation(self):
+		if self.negotiating_caps:
+			self.negotiating_caps = False
+			self.send("CAP END")
+
+	def on_account(self, message):
+		account = message.param(0)
+		if account == '*':
+			account = None
+		self.membership.update_user(message.nick, account=account)
+
+	def on_away(self, message):
+		self.membership.update_user(message.nick, away=message.param(0, None))
+
+	def on_batch(self, message):
+		reference = message.param(0)
+		if reference.startswith('+'):
+			self.batches[reference[1:]] = (message.param(1), message.params[2:])
+		else:
+			self.batches.pop(reference[1:], None)
 
-		for nick_list in self.nick_lists.values():
-			if source_nick in nick_list:
-				nick_list.remove(source_nick)
+	def get_batch(self, message):
+		"""The (type, parameters) of the batch message belongs to, or None."""
+		return self.batches.get(message.tags.get('batch'))
 
-	def on_ping(self, tupels):
-		self.send("PONG :" + tupels[4])
+	def on_ping(self, message):
+		self.send("PONG :" + message.param(0))
 
-	def on_privmsg(self, tupels):
-		source, target, message = tupels[2], tupels[4], tupels[5]
+	def on_privmsg(self, message):
+		source, target, text = message.prefix, message.param(0), message.param(1)
 
-		if target[0] != '#':
+		if not target.startswith('#'):
 			target = source
 
 		if "on_privmsg" in self.callbacks:
-			self.callbacks["on_privmsg"](source, target, message)
+			self.callbacks["on_privmsg"](source, target, text)
 
-	def on_notice(self, tupels):
-		source, target, message = tupels[2], tupels[4], tupels[5]
+	def on_notice(self, message):
+		source, target, text = message.prefix, message.param(0), message.param(1)
 
-		if target[0] != '#':
+		if not target.startswith('#'):
 			target = source
 
 		if "on_notice" in self.callbacks:
-			self.callbacks["on_notice"](source, target, message)
+			self.callbacks["on_notice"](source, target, text)
 
-	def on_connected(self, tupels):
+	def on_connected(self, message):
 		self.active_session = True
+		self.negotiating_caps = False
+		self.backoff.reset()
+		self.nick = message.param(0, self.nick)
 
 		if "on_connected" in self.callbacks:
 			self.callbacks["on_connected"]()
 
-	def on_error(self, tupels):
-		message = tupels[5]
-		print 'the irc server informs of an error:', message
+	def on_error(self, message):
+		text = message.param(0)
+		print 'the irc server informs of an error:', text
 
-		if "host is trying to (re)connect too fast" in message:
+		if "host is trying to (re)connect too fast" in text:
 			self.idle_for(120)
 
 	def idle_for(self, seconds):
 		self.wait_until = datetime.datetime.now() + datetime.timedelta(0, seconds)
 
-	def tick(self):
-		if self.wait_until and self.wait_until > datetime.datetime.now():
-			return
+	def handle_line(self, line):
+		self.log_line(timestamp() + " RECV: " + line)
+		message = parse_message(line)
+		if message:
+			if "on_message" in self.callbacks:
+				self.callbacks["on_message"](message)
 
-		if self.connected:
-			try:
-				retn = self.s.recv(1024)
-
-				self.recv_buf += retn
-				recv_lines = self.recv_buf.splitlines(True)
-				self.recv_buf = ''
-				for line in recv_lines:
-					if not line.endswith("\r\n"):
-						self.recv_buf = line
-					else:
-						line = line.rstrip("\r\n")
-						self.log_line(timestamp() + " RECV: " + line)
-						m = self.irc_message_pattern.match(line)
-						if m:
-							if m.group(3) in self.message_handlers:
-								self.message_handlers[m.group(3)](m.group(0, 1, 2, 3, 4, 5))
+			if message.command in self.message_handlers:
+				self.message_handlers[message.command](message)
 
-			except socket.error, (error_code, error_message):
-				if error_code != errno.EWOULDBLOCK:
-					self.connected = False
-					print (error_code, error_message)
-		else:
+	def on_readable(self):
+		# Drain the socket completely; the reactor only tells us about new
+		# readiness, not about data we left behind.
+		while self.connected:
 			try:
-				self.connect(self.server_address, self.server_port)
+				count = self.recv_buffer.recv_into(self.s)
 			except socket.error, (error_code, error_message):
-				print "I got an error while trying to connect... Is it wrong to just return now?", (error_code, error_message)
-				self.idle_for(60)
+				if error_code not in (errno.EWOULDBLOCK, errno.EINTR):
+					print (error_code, error_message)
+					self.disconnect()
 				return
 
-			if self.connected:
-				self.send("USER %s * * :%s" % (self.username, self.realname))
-				self.send("NICK %s" % self.nick)
+			if not count:
+				print "the irc server closed the connection"
+				self.disconnect()
+				return
+
+			for line in self.recv_buffer.lines():
+				self.handle_line(line)
+
+	def tick(self):
+		if self.wait_until and self.wait_until > datetime.datetime.now():
+			return
+
+		if self.connected:
+			self.on_readable()
+			self.flush_output()
+		else:
+			self.reconnect()
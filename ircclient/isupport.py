@@ -0,0 +1,34 @@
+import re
+
+value_escape = re.compile(r'\\x([0-9A-Fa-f]{2})')
+
+def parse_isupport(tokens, isupport):
+	"""Applies the tokens of one 005 reply ("PREFIX=(ov)@+", "EXCEPTS",
+	"-KNOCK") to the isupport dict. Tokens without a value map to True."""
+	for token in tokens:
+		if token.startswith('-'):
+			isupport.pop(token[1:].upper(), None)
+			continue
+
+		key, equals, value = token.partition('=')
+		if equals:
+			isupport[key.upper()] = value_escape.sub(lambda m: chr(int(m.group(1), 16)), value)
+		else:
+			isupport[key.upper()] = True
+
+def parse_prefix(value):
+	""""(ov)@+" -> ("ov", "@+"), or None if value doesn't look like that."""
+	m = re.match(r'^\((\w*)\)(\S*)$', value)
+	if m and len(m.group(1)) == len(m.group(2)):
+		return m.group(1), m.group(2)
+	return None
+
+def parse_targmax(value):
+	"""'PRIVMSG:4,NOTICE:4,JOIN:' -> {'PRIVMSG': 4, 'NOTICE': 4, 'JOIN': None},
+	None meaning no limit."""
+	limits = {}
+	for entry in value.split(','):
+		command, colon, limit = entry.partition(':')
+		if command:
+			limits[command.upper()] = int(limit) if limit.isdigit() else None
+	return limits
@@ -0,0 +1,78 @@
+class LineBuffer:
+	"""Receive buffer that frames CRLF-terminated lines.
+
+	Data is read straight into a preallocated bytearray with recv_into and
+	scanned for line endings incrementally, so bytes are only looked at once
+	and complete lines are cut out of it in one pass. Lines longer than
+	max_line_length are dropped instead of growing the buffer."""
+
+	def __init__(self, max_line_length=8703, read_size=65536):
+		self.max_line_length = max_line_length
+		self.read_size = read_size
+		self.buf = bytearray(max_line_length + read_size)
+		self.view = memoryview(self.buf)
+		self.clear()
+
+	def clear(self):
+		self.start = 0
+		self.scan = 0
+		self.end = 0
+		self.discarding = False
+		self.dropped_lines = 0
+
+	def compact(self):
+		if self.start == self.end:
+			self.start = self.scan = self.end = 0
+		elif self.start:
+			# Only the trailing fragment of an unfinished line is moved.
+			length = self.end - self.start
+			self.buf[0:length] = self.view[self.start:self.end].tobytes()
+			self.scan -= self.start
+			self.start = 0
+			self.end = length
+
+	def recv_into(self, s):
+		"""Reads from socket s directly into the buffer. Returns 0 on EOF."""
+		self.compact()
+		count = s.recv_into(self.view[self.end:], len(self.buf) - self.end)
+		self.end += count
+		return count
+
+	def feed(self, data):
+		"""Appends data that was received elsewhere. Mainly for tests and tools."""
+		while data:
+			self.compact()
+			count = min(len(data), len(self.buf) - self.end)
+			self.buf[self.end:self.end + count] = data[:count]
+			self.end += count
+			data = data[count:]
+			for line in self.lines():
+				yield line
+
+	def lines(self):
+		"""Returns the complete lines received so far, without line endings."""
+		last_newline = self.buf.rfind('\n', self.scan, self.end)
+
+		if last_newline < 0:
+			self.scan = self.end
+			if self.end - self.start > self.max_line_length:
+				self.start = self.scan = self.end
+				if not self.discarding:
+					self.discarding = True
+					self.dropped_lines += 1
+			return []
+
+		block = self.view[self.start:last_newline + 1].tobytes()
+		self.start = self.scan = last_newline + 1
+
+		lines = block.splitlines()
+		if self.discarding:
+			self.discarding = False
+			del lines[0]
+
+		if len(block) > self.max_line_length:
+			count = len(lines)
+			lines = [line for line in lines if len(line) <= self.max_line_length]
+			self.dropped_lines += count - len(lines)
+
+		return lines
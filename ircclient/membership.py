@@ -0,0 +1,234 @@
+import string
+
+rfc1459_table = string.maketrans(string.ascii_uppercase + "[]\\~", string.ascii_lowercase + "{}|^")
+ascii_table = string.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def irc_lower(name, table=rfc1459_table):
+	"""Folds name the way the server compares nicks and channels."""
+	return name.translate(table)
+
+class Membership:
+	"""Who is on which channel, with the channel modes (op, voice...) each
+	member has there.
+
+	Channels map to {nick: modes} and every nick maps back to the set of
+	channels it shares with us, so joins, parts, quits and nick changes are
+	all O(1) per affected channel. Keys are case-folded with irc_lower;
+	the names as last seen on the wire are kept for display.
+
+	Whatever else we learn about a nick (user, host, account, realname,
+	away message) is kept in users for as long as we share a channel."""
+
+	def __init__(self):
+		self.case_table = rfc1459_table
+		self.set_prefixes("qaohv", "~&@%+")
+		self.clear()
+
+	def clear(self):
+		self.channels = {}
+		self.channel_names = {}
+		self.nicks = {}
+		self.nick_names = {}
+		self.users = {}
+		self.pending_names = {}
+
+	def set_casemapping(self, casemapping):
+		if casemapping == 'ascii':
+			self.case_table = ascii_table
+		else:
+			self.case_table = rfc1459_table
+
+	def set_prefixes(self, modes, prefixes):
+		"""Sets the member modes and their NAMES prefixes, highest rank first,
+		e.g. ("ov", "@+") from ISUPPORT PREFIX=(ov)@+."""
+		self.member_modes = modes
+		self.member_prefixes = prefixes
+		self.prefix_modes = dict(zip(prefixes, modes))
+		self.mode_prefixes = dict(zip(modes, prefixes))
+
+	def lower(self, name):
+		return name.translate(self.case_table)
+
+	def sort_modes(self, modes):
+		return "".join([mode for mode in self.member_modes if mode in modes])
+
+	def split_prefixes(self, entry):
+		"""Splits a NAMES entry like "@+nick" into ("ov", "nick"). With
+		userhost-in-names the nick is "nick!user@host"."""
+		i = 0
+		while i < len(entry) and entry[i] in self.prefix_modes:
+			i += 1
+		return self.sort_modes([self.prefix_modes[prefix] for prefix in entry[0:i]]), entry[i:]
+
+	def add(self, channel, nick, modes=''):
+		lower_channel = self.lower(channel)
+		lower_nick = self.lower(nick)
+
+		if lower_channel not in self.channels:
+			self.channels[lower_channel] = {}
+		self.channel_names[lower_channel] = channel
+		self.channels[lower_channel][lower_nick] = modes
+
+		if lower_nick not in self.nicks:
+			self.nicks[lower_nick] = set()
+		self.nicks[lower_nick].add(lower_channel)
+		self.nick_names[lower_nick] = nick
+
+	def remove(self, channel, nick):
+		lower_channel = self.lower(channel)
+		lower_nick = self.lower(nick)
+
+		members = self.channels.get(lower_channel)
+		if members is not None:
+			members.pop(lower_nick, None)
+
+		channels = self.nicks.get(lower_nick)
+		if channels is not None:
+			channels.discard(lower_channel)
+			if not channels:
+				self.forget_nick(lower_nick)
+
+	def forget_nick(self, lower_nick):
+		del self.nicks[lower_nick]
+		self.nick_names.pop(lower_nick, None)
+		self.users.pop(lower_nick, None)
+
+	def remove_channel(self, channel):
+		"""Forgets a channel we left or were kicked from."""
+		lower_channel = self.lower(channel)
+
+		for lower_nick in self.channels.pop(lower_channel, {}):
+			channels = self.nicks.get(lower_nick)
+			if channels is not None:
+				channels.discard(lower_channel)
+				if not channels:
+					self.forget_nick(lower_nick)
+
+		self.channel_names.pop(lower_channel, None)
+		self.pending_names.pop(lower_channel, None)
+
+	def quit(self, nick):
+		"""Removes nick everywhere. Returns the channels it was on."""
+		lower_nick = self.lower(nick)
+
+		channels = self.nicks.pop(lower_nick, set())
+		for lower_channel in channels:
+			self.channels[lower_channel].pop(lower_nick, None)
+		self.nick_names.pop(lower_nick, None)
+		self.users.pop(lower_nick, None)
+
+		return [self.channel_names[lower_channel] for lower_channel in channels]
+
+	def rename(self, old_nick, new_nick):
+		lower_old = self.lower(old_nick)
+		lower_new = self.lower(new_nick)
+
+		channels = self.nicks.pop(lower_old, None)
+		self.nick_names.pop(lower_old, None)
+		info = self.users.pop(lower_old, None)
+		if channels is None:
+			return
+
+		for lower_channel in channels:
+			members = self.channels[lower_channel]
+			members[lower_new] = members.pop(lower_old)
+
+		self.nicks[lower_new] = channels
+		self.nick_names[lower_new] = new_nick
+		if info is not None:
+			self.users[lower_new] = info
+
+	def update_user(self, nick, **info):
+		"""Records user, host, account, realname or away for a nick we
+		share a channel with; anything else is ignored."""
+		lower_nick = self.lower(nick)
+		if lower_nick in self.nicks:
+			if lower_nick not in self.users:
+				self.users[lower_nick] = {}
+			self.users[lower_nick].update(info)
+
+	def set_mode(self, channel, nick, mode, enabled):
+		members = self.channels.get(self.lower(channel))
+		if members is None:
+			return
+
+		lower_nick = self.lower(nick)
+		if lower_nick in members:
+			modes = members[lower_nick].replace(mode, '')
+			if enabled:
+				modes = self.sort_modes(modes + mode)
+			members[lower_nick] = modes
+
+	def begin_names(self, channel, entries):
+		"""Collects one 353 reply. The channel is replaced on end_names."""
+		lower_channel = self.lower(channel)
+		if lower_channel not in self.pending_names:
+			self.pending_names[lower_channel] = []
+		self.channel_names[lower_channel] = channel
+
+		for entry in entries:
+			self.pending_names[lower_channel].append(self.split_prefixes(entry))
+
+	def end_names(self, channel):
+		lower_channel = self.lower(channel)
+		if lower_channel not in self.pending_names:
+			return
+
+		entries = self.pending_names.pop(lower_channel)
+		name = self.channel_names[lower_channel]
+
+		# Whatever we knew about members that are still there survives the
+		# refresh.
+		known = {}
+		for lower_nick in self.channels.get(lower_channel, {}):
+			if lower_nick in self.users:
+				known[lower_nick] = self.users[lower_nick]
+
+		self.remove_channel(name)
+		self.channels[lower_channel] = {}
+		self.channel_names[lower_channel] = name
+		for modes, nick in entries:
+			nick, bang, userhost = nick.partition('!')
+			self.add(name, nick, modes)
+			lower_nick = self.lower(nick)
+			if lower_nick in known and lower_nick not in self.users:
+				self.users[lower_nick] = known[lower_nick]
+			if userhost:
+				user, at, host = userhost.partition('@')
+				self.update_user(nick, user=user, host=host)
+
+	# Queries for plugins.
+
+	def get_channels(self):
+		return self.channel_names.values()
+
+	def get_members(self, channel):
+		members = self.channels.get(self.lower(channel), {})
+		return [self.nick_names[lower_nick] for lower_nick in members]
+
+	def get_channels_of(self, nick):
+		channels = self.nicks.get(self.lower(nick), ())
+		return [self.channel_names[lower_channel] for lower_channel in channels]
+
+	def is_member(self, nick, channel):
+		return self.lower(nick) in self.channels.get(self.lower(channel), {})
+
+	def get_modes(self, nick, channel):
+		"""Member modes of nick on channel ("ov", "", ...), or None if nick
+		isn't there."""
+		return self.channels.get(self.lower(channel), {}).get(self.lower(nick))
+
+	def get_prefix(self, nick, channel):
+		"""The highest-ranked prefix ("@", "+", ...) of nick on channel."""
+		modes = self.get_modes(nick, channel)
+		if modes:
+			return self.mode_prefixes[modes[0]]
+		return ''
+
+	def has_mode(self, nick, channel, mode):
+		return mode in (self.get_modes(nick, channel) or '')
+
+	def get_user(self, nick):
+		"""What we know about nick: a dict with any of user, host, account
+		(None when logged out), realname and away (None when back)."""
+		return self.users.get(self.lower(nick), {})
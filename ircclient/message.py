@@ -0,0 +1,105 @@
+import calendar
+import time
+from collections import namedtuple
+
+class Message(namedtuple('Message', 'tags prefix nick user host command params trailing')):
+	"""One parsed line from the server.
+
+	prefix is the raw "nick!user@host" (or None) with nick, user and host
+	already split out, params holds every parameter including the trailing
+	one, and trailing is the parameter that followed ' :' (or None). tags is
+	a read-only dict of IRCv3 message tags, as every handler of the message
+	shares it."""
+
+	__slots__ = ()
+
+	def param(self, index, default=''):
+		if index < len(self.params):
+			return self.params[index]
+		return default
+
+	def server_time(self):
+		"""When the server says the message was sent (the IRCv3 server-time
+		tag), in seconds since the epoch, or None."""
+		value = self.tags.get('time')
+		if not value:
+			return None
+
+		try:
+			seconds = calendar.timegm(time.strptime(value[0:19], '%Y-%m-%dT%H:%M:%S'))
+		except ValueError:
+			return None
+
+		fraction = value[19:].rstrip('Z')
+		if fraction.startswith('.') and fraction[1:].isdigit():
+			seconds += float(fraction)
+		return seconds
+
+class Tags(dict):
+	"""A dict that can't be changed once made."""
+
+	def read_only(self, *args, **kwargs):
+		raise TypeError("message tags can't be changed")
+
+	__setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = read_only
+
+no_tags = Tags()
+
+# Skips the keyword-argument handling of the generated Message.__new__.
+new_tuple = tuple.__new__
+
+tag_escapes = { ':': ';', 's': ' ', '\\': '\\', 'r': '\r', 'n': '\n' }
+
+def unescape_tag_value(value):
+	result = []
+	i = 0
+	while i < len(value):
+		c = value[i]
+		if c == '\\' and i + 1 < len(value):
+			i += 1
+			c = tag_escapes.get(value[i], value[i])
+		elif c == '\\':
+			c = ''
+		result.append(c)
+		i += 1
+	return ''.join(result)
+
+def parse_tags(text):
+	tags = {}
+	for tag in text.split(';'):
+		key, equals, value = tag.partition('=')
+		if '\\' in value:
+			value = unescape_tag_value(value)
+		tags[key] = value
+	return Tags(tags)
+
+def parse_message(line):
+	"""Parses a line (without CRLF) into a Message, or returns None if it
+	isn't a valid IRC message."""
+	tags = no_tags
+	if line[:1] == '@':
+		tag_text, space, line = line.partition(' ')
+		tags = parse_tags(tag_text[1:])
+		line = line.lstrip(' ')
+
+	prefix = nick = user = host = None
+	if line[:1] == ':':
+		prefix, space, line = line.partition(' ')
+		prefix = prefix[1:]
+		nick, at, host = prefix.partition('@')
+		nick, bang, user = nick.partition('!')
+		user = user or None
+		host = host or None
+
+	middle, colon, trailing = line.partition(' :')
+	# Parameters are separated by spaces only; a tab is part of one.
+	params = [param for param in middle.split(' ') if param]
+	if not params:
+		return None
+
+	if colon:
+		params.append(trailing)
+	else:
+		trailing = None
+
+	return new_tuple(Message, (tags, prefix, nick, user, host, params[0].upper(), tuple(params[1:]), trailing))
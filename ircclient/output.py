@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+def split_text(text, limit):
+	"""Splits text into lines of at most limit bytes, breaking at spaces
+	where that doesn't waste more than half a line and never inside a UTF-8
+	sequence. Newlines in text always start a new line."""
+	lines = []
+
+	for paragraph in text.splitlines():
+		while len(paragraph) > limit:
+			cut = paragraph.rfind(' ', 0, limit + 1)
+			if cut < limit / 2:
+				cut = limit
+				while cut > 0 and 0x80 <= ord(paragraph[cut]) < 0xc0:
+					cut -= 1
+				if cut == 0:
+					cut = limit
+
+			lines.append(paragraph[0:cut].rstrip(' '))
+			paragraph = paragraph[cut:].lstrip(' ')
+
+		if paragraph:
+			lines.append(paragraph)
+
+	return lines
+
+class Pager:
+	"""Reply lines that didn't fit, waiting for .more. Keyed by whatever the
+	client passes (target and requesting nick); only the most recently
+	paged max_entries keys are kept."""
+
+	def __init__(self, max_entries=100):
+		self.max_entries = max_entries
+		self.pages = OrderedDict()
+
+	def clear(self):
+		self.pages.clear()
+
+	def store(self, key, lines):
+		self.pages.pop(key, None)
+		if lines:
+			self.pages[key] = lines
+			while len(self.pages) > self.max_entries:
+				self.pages.popitem(False)
+
+	def take(self, key, count):
+		"""Removes and returns the next count lines for key, and how many
+		are left after them."""
+		lines = self.pages.pop(key, [])
+		self.store(key, lines[count:])
+		return lines[0:count], max(0, len(lines) - count)
+
+	def has(self, key):
+		return key in self.pages
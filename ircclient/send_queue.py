@@ -0,0 +1,134 @@
+from collections import deque
+
+import clock
+
+class TokenBucket:
+	"""Mirrors the server's flood penalty: every line costs line_cost seconds
+	plus one second per bytes_per_second bytes, penalty drains at one second
+	per second, and at most burst seconds may be outstanding. Kept on
+	clock.monotonic(), so setting the system clock back doesn't stall it."""
+
+	def __init__(self, burst=10.0, line_cost=1.0, bytes_per_second=120):
+		self.burst = burst
+		self.line_cost = line_cost
+		self.bytes_per_second = bytes_per_second
+		self.reset()
+
+	def reset(self):
+		self.tokens = self.burst
+		self.updated = clock.monotonic()
+
+	def refill(self):
+		now = clock.monotonic()
+		# Never less for time going backwards, as time.time() can where
+		# there's no monotonic clock.
+		self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated))
+		self.updated = now
+
+	def cost(self, line):
+		return self.line_cost + float(len(line) + 2) / self.bytes_per_second
+
+	def wait_time(self, line):
+		"""Seconds until line may be sent without tripping the server."""
+		self.refill()
+		return max(0.0, self.cost(line) - self.tokens)
+
+	def consume(self, line):
+		self.refill()
+		self.tokens -= self.cost(line)
+
+class SendQueue:
+	"""Outgoing lines waiting for the token bucket.
+
+	Priority lines (PONG and the like) jump the queue. Everything else is
+	queued per target and the targets take turns, so a plugin flooding one
+	channel can't hold up replies to another."""
+
+	def __init__(self, bucket):
+		self.bucket = bucket
+		self.priority = deque()
+		self.targets = {}
+		self.order = deque()
+		self.depth = 0
+
+		self.max_depth = 0
+		self.sent = 0
+		self.total_wait = 0.0
+		self.max_wait = 0.0
+
+	def clear(self):
+		self.priority.clear()
+		self.targets.clear()
+		self.order.clear()
+		self.depth = 0
+
+	def push(self, line, priority=False):
+		entry = (line, clock.monotonic())
+
+		if priority:
+			self.priority.append(entry)
+		else:
+			target = get_target(line)
+			if target not in self.targets:
+				self.targets[target] = deque()
+				self.order.append(target)
+			self.targets[target].append(entry)
+
+		self.depth += 1
+		self.max_depth = max(self.max_depth, self.depth)
+
+	def peek(self):
+		if self.priority:
+			return self.priority[0][0]
+		elif self.order:
+			return self.targets[self.order[0]][0][0]
+		else:
+			return None
+
+	def wait_time(self):
+		"""None if the queue is empty, otherwise the seconds until the next
+		line may go out (0 meaning right away)."""
+		if self.priority:
+			return 0.0
+		elif self.order:
+			return self.bucket.wait_time(self.peek())
+		else:
+			return None
+
+	def pop(self):
+		if self.priority:
+			line, queued_at = self.priority.popleft()
+		else:
+			target = self.order.popleft()
+			lines = self.targets[target]
+			line, queued_at = lines.popleft()
+			if lines:
+				self.order.append(target)
+			else:
+				del self.targets[target]
+
+		self.bucket.consume(line)
+
+		wait = clock.monotonic() - queued_at
+		self.depth -= 1
+		self.sent += 1
+		self.total_wait += wait
+		self.max_wait = max(self.max_wait, wait)
+
+		return line
+
+	def stats(self):
+		mean_wait = 0.0
+		if self.sent:
+			mean_wait = self.total_wait / self.sent
+
+		return { "depth": self.depth, "max_depth": self.max_depth, "targets": len(self.order),
+			"sent": self.sent, "mean_wait": mean_wait, "max_wait": self.max_wait }
+
+def get_target(line):
+	"""The queue a line belongs to: the target of PRIVMSG and NOTICE, and one
+	shared queue for everything else."""
+	command, space, rest = line.partition(' ')
+	if command in ('PRIVMSG', 'NOTICE'):
+		return rest.partition(' ')[0].lower()
+	return None
@@ -1,19 +1,26 @@
 # coding: latin-1
 
 from ircbot import IRCBot
+from reactor import Reactor
 from httpsrv import http_server
-import time
 import settings
+import instrumentation
+import result_cache
+from plugins import httpget
 import datetime
 import sys
+import json
 
 if settings.nick == "CHANGEME":
 	print "---> Please customize settings.py and try again. <---"
 	sys.exit(0);
 
-bot = IRCBot(settings.server_address, settings.server_port, settings.nick, settings.username, settings.realname)
+reactor = Reactor()
+
+bot = IRCBot(settings.networks, reactor)
 
 #web_server = http_server.HTTPServer(8000)
+#web_server.attach(reactor)
 
 botnik_picture_data = None
 
@@ -32,18 +39,47 @@ def handle_request(request):
 		web_server.respond_200(request, botnik_picture_data, "image/png")
 		return
 
-	c = None
-	if bot.is_connected():
-		c = "connected"
-	else:
-	 	c = "disconnected"
+	if request.request_path == "/stats.json":
+		web_server.respond_200(request, json.dumps(instrumentation.report()), "application/json")
+		return
+
+	data = "<img src=\"botnik.png\"><p>"
+
+	for network in bot.networks:
+		c = None
+		if network.is_connected():
+			c = "connected"
+		else:
+		 	c = "disconnected"
+
+		data += "<h2>%s</h2>I think that I am %s.<p>" % (network.name, c)
+
+		data += "Send queue: %(depth)d lines waiting for %(targets)d targets (max %(max_depth)d), %(sent)d sent, mean wait %(mean_wait).2f s, max wait %(max_wait).2f s.<p>" % network.client.send_queue.stats()
+
+		data += "Conversation:<p><pre>"
+		data += "\n".join([line.replace("<", "&lt;").replace(">", "&gt;") for line in network.client.lines])
+		data += "</pre>"
+
+	data += "<h2>Commands</h2>%(busy)d running on %(threads)d threads, %(waiting)d waiting. %(completed)d done, %(failed)d failed, %(timed_out)d timed out, %(cancelled)d cancelled, %(rejected)d rejected. Mean wait %(mean_wait).2f s (max %(max_wait).2f s), mean run time %(mean_run).2f s (max %(max_run).2f s).<p>" % bot.workers.stats()
+
+	if bot.sandbox:
+		data += "<h2>Sandbox</h2>%(idle)d of %(processes)d processes idle. %(calls)d calls, %(failed)d failed, %(restarts)d processes restarted.<p>" % bot.sandbox.stats()
+
+	data += "<h2>Scheduler</h2>%(jobs)d jobs, %(runs)d runs on %(wakeups)d wakeups. %(errors)d failed, %(skipped)d skipped while still running, %(overruns)d ran too long.<p>" % bot.scheduler.stats()
+
+	data += "<h2>Background jobs</h2>"
+	jobs = bot.jobs.running()
+	if not jobs:
+		data += "None.<p>"
+	for job in jobs:
+		data += "%s: %s %.1f s" % (job.name.replace("<", "&lt;"), job.state, job.elapsed())
+		if job.progress is not None:
+			data += ", %s" % job.progress
+		data += "<br>"
 
-	data = "I think that I am %s.<p><img src=\"botnik.png\"><p>" % c
+	data += "<h2>HTTP</h2>%(requests)d requests, %(connections)d connections opened and %(reused)d kept-alive ones reused (%(retried)d retried after the server had closed one), %(redirects)d redirects followed. %(idle)d connections idle.<p>" % httpget.client.stats()
 
-	data += "Conversation:<p><pre>"
-	for line in bot.client.lines:
-		data += line.replace("<", "&lt;").replace(">", "&gt;") + "\n"
-	data += "</pre>"
+	data += "<h2>Reply cache</h2>%(entries)d of %(size)d entries. %(hits)d hits, %(stale_hits)d stale, %(misses)d misses, %(evictions)d evicted.<p>" % result_cache.cache.stats()
 
 	web_server.respond_200(request, data)
 
@@ -51,7 +87,4 @@ def handle_request(request):
 	
 #bot.add_timer(datetime.timedelta(0, 60), True, bot.send, "PRIVMSG #botnik :this is to keep me alive :O")
 
-while True:
-	bot.tick()
-	#web_server.tick()
-	time.sleep(0.1)
+reactor.run()
@@ -11,26 +11,27 @@ class OfflineTester:
 		pass
 
 	def execute_plugins(self, trigger, *arguments):
-		for plugin in plugin_handler.all_plugins():
+		if trigger == "on_privmsg":
+			hooks = plugin_handler.get_privmsg_hooks(arguments[2])
+		else:
+			hooks = plugin_handler.get_hooks(trigger)
+
+		for hook in hooks:
 			try:
-				plugin.__class__.__dict__[trigger](plugin, self, *arguments)
-			except KeyError:
-				pass
+				hook(self, *arguments)
 			except:
-				print "argh", plugin, sys.exc_info(), traceback.extract_tb(sys.exc_info()[2])
+				print "argh", hook.im_self, sys.exc_info(), traceback.extract_tb(sys.exc_info()[2])
 	
 	def on_privmsg(self, nick, target, message):
 		self.execute_plugins("on_privmsg", nick, target, message)
 
-	def reload_plugins(self):
-		plugin_handler.plugins_on_unload()
-		plugin_handler.reload_plugin_modules()
-		plugin_handler.plugins_on_load()
+	def reload_plugins(self, everything=False):
+		return plugin_handler.reload_changed(everything)
 	
 	def load_plugin(self, plugin):
 		plugin_handler.load_plugin(plugin)
 
-	def tell(self, target, message):
+	def tell(self, target, message, requester=None):
 		print "telling %s: %s" % (target, message)
 
 tester = OfflineTester()
@@ -2,8 +2,15 @@ import os
 import imp
 import sys
 import re
+import time
+import types
+import hashlib
+import threading
 
 import error_handler
+import settings
+import instrumentation
+import plugin_manifest
 
 # TODO Is this deprecated module actually used? Can another one be used instead?
 import sets
@@ -11,7 +18,22 @@ import sets
 from copy import copy
 
 prev = copy(sys.modules.values())
-from plugins import *
+
+# With settings.lazy_plugins, the plugin modules that the manifest knows
+# everything about are only imported once something needs them. Module name
+# -> manifest entry for the ones that haven't been yet.
+import plugins
+lazy_modules = {}
+if settings.lazy_plugins:
+	lazy_modules = plugin_manifest.load([name for name in plugins.__all__ if name not in plugins.vital_plugins])
+
+__import__('plugins', globals(), locals(), [name for name in plugins.__all__ if name not in lazy_modules])
+from plugins import plugins, commands
+
+# Some came along anyway, imported by the others.
+for name in lazy_modules.keys():
+	if sys.modules.get('plugins.' + name):
+		del lazy_modules[name]
 new_modules = []
 plugins_module = None
 
@@ -34,6 +56,31 @@ for module in sys.modules.values():
 
 new_modules = filter(lambda x: re.match('^plugins\.', x.__name__), new_modules)
 
+# Hook name -> the bound methods to call for it, in plugin order. Only
+# plugins whose own class defines the hook are listed. Rebuilt as a whole by
+# build_hook_table, so a dispatch in progress keeps the table it started
+# with.
+hook_table = {}
+
+# The on_privmsg hooks, each with its privmsg_patterns compiled (or None if
+# it wants every message), the hooks that want every message, and all the
+# patterns in one regex. Most messages match no pattern at all, which that
+# one search() settles; only for the others are the plugins' patterns tried
+# one by one.
+privmsg_dispatch = ([], [], None, False)
+
+# Hook name -> the lazy modules with plugins that have that hook (but
+# on_privmsg, which privmsg_dispatch takes care of).
+lazy_hooks = {}
+
+# Held while plugins are loaded, reloaded or imported on demand, which may
+# happen on a command worker thread.
+load_lock = threading.RLock()
+
+# Module name -> (mtime, SHA-1 of the source) as last loaded; tells which
+# plugin files have changed since.
+module_versions = {}
+
 def reload_plugin_modules():
 	import traceback
 	for module in new_modules:
@@ -42,12 +89,161 @@ def reload_plugin_modules():
 		except:
 			error_handler.output_message('error when reloading module ' + str(module.__name__) + ' ' + str(sys.exc_info()) + ' ' + str(traceback.extract_tb(sys.exc_info()[2])))
 
+def is_current(c):
+	"""False for a class left behind by a reload of its module, which is
+	still a subclass of Plugin as long as anything refers to it."""
+	module = sys.modules.get(c.__module__)
+	return module is not None and getattr(module, c.__name__, None) is c
+
 def search_for_subclasses(c):
-	l = [c]
+	l = []
+	if is_current(c):
+		l.append(c)
 	for subclass in c.__subclasses__():
 		l.extend(search_for_subclasses(subclass))
 	return l
-	
+
+def source_file(module):
+	filename = module.__file__
+	if filename.endswith('.pyc') or filename.endswith('.pyo'):
+		filename = filename[0:-1]
+	return filename
+
+def module_version(module, known=None):
+	"""(mtime, digest) of module's source. The file is only read if its
+	mtime isn't the one in known."""
+	filename = source_file(module)
+	mtime = os.stat(filename).st_mtime
+	if known and known[0] == mtime:
+		return known
+
+	with open(filename, 'rb') as file:
+		return (mtime, hashlib.sha1(file.read()).hexdigest())
+
+def record_versions(modules):
+	for module in modules:
+		try:
+			module_versions[module.__name__] = module_version(module)
+		except (IOError, OSError):
+			pass
+
+def changed_modules():
+	"""The plugin modules whose source isn't what was loaded. Files that
+	were only touched don't count."""
+	changed = []
+	for module in new_modules:
+		known = module_versions.get(module.__name__)
+		try:
+			version = module_version(module, known)
+		except (IOError, OSError):
+			continue
+
+		if not known or version[1] != known[1]:
+			changed.append(module)
+		else:
+			module_versions[module.__name__] = version
+	return changed
+
+def dependencies(module):
+	"""Names of the plugin modules module refers to: the ones it imported
+	and the ones it took classes or functions from."""
+	names = set()
+	for value in module.__dict__.values():
+		if isinstance(value, types.ModuleType):
+			name = value.__name__
+		else:
+			try:
+				name = getattr(value, '__module__', None)
+			except Exception:
+				continue
+		if name != module.__name__ and name in module_versions:
+			names.add(name)
+	return names
+
+def with_dependents(modules):
+	"""modules, and every plugin module that depends on them however
+	indirectly, dependencies before dependents."""
+	depends_on = dict((module.__name__, dependencies(module)) for module in new_modules)
+
+	names = set(module.__name__ for module in modules)
+	while True:
+		more = set(name for name, needed in depends_on.items() if needed & names) - names
+		if not more:
+			break
+		names |= more
+
+	result = []
+	left = [module for module in new_modules if module.__name__ in names]
+	while left:
+		done = set(module.__name__ for module in result)
+		ready = [module for module in left if not (depends_on[module.__name__] & names) - done]
+		if not ready:
+			# A cycle; go by load order.
+			ready = left[0:1]
+		for module in ready:
+			result.append(module)
+			left.remove(module)
+	return result
+
+def reload_changed(everything=False):
+	"""Reloads the plugin modules that have changed since they were loaded
+	(or all of them) and the ones depending on them. The plugins in them
+	are replaced: the old instance's handoff() is passed to the new one's
+	on_reload(), instead of the usual on_unload() and on_load(). Plugins in
+	other modules are left alone. Returns the names of the modules
+	reloaded and how many seconds it took."""
+	with load_lock:
+		start = time.time()
+
+		# Lazy modules that changed since the manifest was made may have
+		# triggers it doesn't know of.
+		load_lazy([name for name, entry in lazy_modules.items() if plugin_manifest.digest(name) != entry['digest']])
+
+		if everything:
+			modules = with_dependents(new_modules)
+		else:
+			modules = with_dependents(changed_modules())
+		if not modules:
+			return [], time.time() - start
+
+		names = set(module.__name__ for module in modules)
+
+		states = {}
+		for plugin in search_for_subclasses(plugins.Plugin):
+			instance = plugin.__dict__.get('instance')
+			if plugin.__module__ not in names or instance is None:
+				continue
+
+			try:
+				states[(plugin.__module__, plugin.__name__)] = instance.handoff()
+				instance.on_unload()
+			except:
+				error_handler.output_message('error when unloading ' + str(plugin) + ' ' + str(sys.exc_info()))
+			plugin.instance = None
+
+		import traceback
+		for module in modules:
+			try:
+				reload(module)
+			except:
+				error_handler.output_message('error when reloading module ' + str(module.__name__) + ' ' + str(sys.exc_info()) + ' ' + str(traceback.extract_tb(sys.exc_info()[2])))
+		record_versions(modules)
+
+		l = [plugin for plugin in search_for_subclasses(plugins.Plugin) if plugin.__module__ in names]
+		for plugin in l:
+			plugin.instance = plugin()
+
+		for plugin in l:
+			key = (plugin.__module__, plugin.__name__)
+			if key in states:
+				plugin.instance.on_reload(states[key])
+			else:
+				plugin.instance.on_load()
+
+		build_tables()
+
+		return [module.__name__ for module in modules], time.time() - start
+
 def get_plugins_by_hook(hook):
 	result = []
 	for plugin in search_for_subclasses(plugins.Plugin):
@@ -61,20 +257,165 @@ def all_plugins():
 		result.append(plugin.instance)
 	return result
 
+def build_hook_table():
+	global hook_table
+
+	table = {}
+	for plugin in search_for_subclasses(plugins.Plugin):
+		# Plugin's own hooks are the do-nothing defaults. Look at the class
+		# itself for the instance, a subclass loaded but not yet initialized
+		# would otherwise find its base class's.
+		instance = plugin.__dict__.get('instance')
+		if plugin is plugins.Plugin or instance is None:
+			continue
+
+		for name, function in plugin.__dict__.items():
+			if isinstance(function, types.FunctionType):
+				if name not in table:
+					table[name] = []
+				table[name].append(function.__get__(instance, plugin))
+
+	hook_table = table
+	instrumentation.forget_hooks()
+
+	build_privmsg_dispatch()
+
+def build_privmsg_dispatch():
+	global privmsg_dispatch
+
+	hooks = []
+	alternatives = []
+	wanted = [(hook, hook.im_self.privmsg_patterns) for hook in hook_table.get('on_privmsg', ())]
+
+	# Lazy modules stand in for their hooks by name until they're imported.
+	for name, entry in sorted(lazy_modules.items()):
+		if 'on_privmsg' in entry['hooks']:
+			wanted.append((name, entry['privmsg_patterns']))
+
+	for hook, patterns in wanted:
+		matcher = None
+		if patterns is not None:
+			pattern = '|'.join(['(?:%s)' % pattern for pattern in patterns]) or '(?!)'
+			try:
+				matcher = re.compile(pattern, re.IGNORECASE | re.DOTALL)
+				alternatives.append(pattern)
+			except re.error:
+				error_handler.output_message('bad privmsg_patterns in %s, it gets every message: %s' % (getattr(hook, 'im_self', hook), sys.exc_info()[1]))
+
+		hooks.append((hook, matcher))
+
+	combined = None
+	if alternatives:
+		try:
+			combined = re.compile('|'.join(alternatives), re.IGNORECASE | re.DOTALL)
+		except re.error:
+			# Patterns that only compile on their own (numbered
+			# backreferences...); try each of them on every message.
+			combined = re.compile('')
+
+	has_lazy = len(wanted) > len(hook_table.get('on_privmsg', ()))
+	privmsg_dispatch = (hooks, [hook for hook, matcher in hooks if not matcher], combined, has_lazy)
+
+def get_privmsg_hooks(message):
+	"""The on_privmsg hooks that want message."""
+	hooks, unfiltered, combined, has_lazy = privmsg_dispatch
+	if not combined or not combined.search(message):
+		result = unfiltered
+	else:
+		result = [hook for hook, matcher in hooks if not matcher or matcher.search(message)]
+
+	if has_lazy:
+		lazy = [hook for hook in result if isinstance(hook, str)]
+		if lazy:
+			load_lazy(lazy)
+			return get_privmsg_hooks(message)
+	return result
+
+def build_tables():
+	global lazy_hooks
+
+	hooks = {}
+	triggers = {}
+	for name, entry in lazy_modules.items():
+		for hook in entry['hooks']:
+			if hook != 'on_privmsg':
+				hooks.setdefault(hook, []).append(name)
+		for trigger in entry['triggers']:
+			triggers.setdefault(trigger, []).append(name)
+	lazy_hooks = hooks
+
+	build_hook_table()
+	commands.build_trigger_table(triggers)
+
+def get_hooks(hook):
+	if hook in lazy_hooks:
+		load_lazy(lazy_hooks[hook])
+	return hook_table.get(hook, ())
+
+def load_lazy(names):
+	"""Imports the lazy plugin modules names, and starts the plugins in them
+	and in any other plugin modules that came along."""
+	with load_lock:
+		names = [name for name in names if name in lazy_modules]
+		if not names:
+			return
+
+		import traceback
+		for name in names:
+			del lazy_modules[name]
+			try:
+				__import__('plugins.' + name)
+			except:
+				error_handler.output_message('error when importing module plugins.' + name + ' ' + str(sys.exc_info()) + ' ' + str(traceback.extract_tb(sys.exc_info()[2])))
+
+		modules = [module for name, module in sys.modules.items()
+			if module and name.startswith('plugins.') and module not in new_modules]
+		new_modules.extend(modules)
+		record_versions(modules)
+
+		module_names = set(module.__name__ for module in modules)
+		for name in module_names:
+			lazy_modules.pop(name[len('plugins.'):], None)
+
+		l = [plugin for plugin in search_for_subclasses(plugins.Plugin)
+			if plugin.__module__ in module_names and plugin.__dict__.get('instance') is None]
+		for plugin in l:
+			plugin.instance = plugin()
+
+		for plugin in l:
+			plugin.instance.on_load()
+
+		build_tables()
+
 def load_plugin(plugin):
-	import re
+	"""Imports plugin module plugin, and starts the plugins in it."""
+	if plugin in lazy_modules:
+		return load_lazy([plugin])
 
 	package = plugins_module
 
 	name = package.__name__ + '.' + plugin
 	file, filename, description = imp.find_module(plugin, package.__path__)
-	try:
-		module = imp.load_module(name, file, filename, description)
-		new_modules.append(module)
-	except:
-		raise
-	finally:
-		file.close()
+	with load_lock:
+		try:
+			module = imp.load_module(name, file, filename, description)
+			if module not in new_modules:
+				new_modules.append(module)
+		except:
+			raise
+		finally:
+			file.close()
+		record_versions([module])
+
+		l = [plugin for plugin in search_for_subclasses(plugins.Plugin)
+			if plugin.__module__ == name and plugin.__dict__.get('instance') is None]
+		for plugin in l:
+			plugin.instance = plugin()
+
+		for plugin in l:
+			plugin.instance.on_load()
+
+		build_tables()
 
 def plugins_on_load():
 	l = search_for_subclasses(plugins.Plugin) 
@@ -85,6 +426,8 @@ def plugins_on_load():
 	for plugin in l:
 		plugin.instance.on_load()
 
+	build_tables()
+
 def plugins_on_unload():
 	l = search_for_subclasses(plugins.Plugin) 
 
@@ -93,3 +436,7 @@ def plugins_on_unload():
 
 	for plugin in l:
 		plugin.instance = None
+
+	build_tables()
+
+record_versions(new_modules)
@@ -0,0 +1,186 @@
+"""plugins/manifest.py lists the triggers and hooks of the plugins in each
+plugin module, as read from the source without importing it. With
+settings.lazy_plugins, the bot imports such a module only when one of those
+is first needed. Regenerate it after changing a plugin's triggers or hooks:
+
+	python plugin_manifest.py
+
+Entries whose module has changed since are ignored, and that module is
+imported at startup as usual."""
+
+import os
+import ast
+import sys
+import hashlib
+import pprint
+
+plugin_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plugins')
+manifest_file = os.path.join(plugin_directory, 'manifest.py')
+
+# Plugin methods that are asked things rather than told about events.
+not_hooks = ['on_load', 'on_unload', 'handoff', 'on_reload', 'get_options', 'on_modified_options']
+
+class Unknown(Exception):
+	"""Something the manifest needs isn't a literal in the source."""
+
+def source_file(name):
+	return os.path.join(plugin_directory, name + '.py')
+
+def digest(name):
+	with open(source_file(name), 'rb') as file:
+		return hashlib.sha1(file.read()).hexdigest()
+
+def parse_classes(name):
+	"""Class name -> ClassDef for the classes defined at the top of module name."""
+	filename = source_file(name)
+	with open(filename) as file:
+		tree = ast.parse(file.read(), filename)
+	return dict((node.name, node) for node in tree.body if isinstance(node, ast.ClassDef))
+
+def base_names(node):
+	names = []
+	for base in node.bases:
+		if isinstance(base, ast.Name):
+			names.append(base.id)
+		elif isinstance(base, ast.Attribute):
+			names.append(base.attr)
+	return names
+
+def methods(node):
+	return [item.name for item in node.body if isinstance(item, ast.FunctionDef)]
+
+def attribute(node, name):
+	"""The node assigned to name in the class body, or None."""
+	value = None
+	for item in node.body:
+		if isinstance(item, ast.Assign):
+			for target in item.targets:
+				if isinstance(target, ast.Name) and target.id == name:
+					value = item.value
+	return value
+
+def literal(node):
+	try:
+		return ast.literal_eval(node)
+	except ValueError:
+		raise Unknown()
+
+class Resolver:
+	"""Looks classes up by name: in their own module first, then in any."""
+
+	def __init__(self, modules):
+		self.modules = modules
+		self.anywhere = {}
+		for classes in modules.values():
+			for name, node in classes.items():
+				self.anywhere.setdefault(name, node)
+
+	def lineage(self, module, node):
+		"""node and its bases, nearest first, as far as they can be found."""
+		result = []
+		pending = [node]
+		while pending:
+			node = pending.pop(0)
+			if node in result:
+				continue
+			result.append(node)
+			for name in base_names(node):
+				base = self.modules[module].get(name) or self.anywhere.get(name)
+				if base:
+					pending.append(base)
+		return result
+
+	def lookup(self, module, node, name):
+		for cls in self.lineage(module, node):
+			value = attribute(cls, name)
+			if value is not None:
+				return value
+		return None
+
+def module_entry(name, resolver, hook_names):
+	triggers = set()
+	hooks = set()
+	patterns = []
+
+	for node in resolver.modules[name].values():
+		lineage = resolver.lineage(name, node)
+		if node.name == 'Plugin' or 'Plugin' not in [cls.name for cls in lineage]:
+			continue
+
+		for cls in lineage:
+			for method in methods(cls):
+				if method.startswith('trig_'):
+					triggers.add(method[5:].lower())
+
+		aliases = resolver.lookup(name, node, 'triggers')
+		if aliases is not None:
+			triggers.update([trigger.lower() for trigger in literal(aliases)])
+
+		own = set(methods(node)) & hook_names
+		hooks |= own
+		if 'on_privmsg' in own and patterns is not None:
+			value = resolver.lookup(name, node, 'privmsg_patterns')
+			value = literal(value) if value is not None else None
+			if value is None:
+				patterns = None
+			else:
+				patterns.extend(value)
+
+	return { 'digest': digest(name), 'triggers': sorted(triggers), 'hooks': sorted(hooks),
+		'privmsg_patterns': patterns }
+
+def generate(names):
+	"""Manifest entries for the plugin modules names. Modules that can't be
+	worked out are left out, to be imported at startup."""
+	modules = {}
+	for name in set(names) | set(['plugins', 'commands']):
+		try:
+			modules[name] = parse_classes(name)
+		except (IOError, SyntaxError):
+			pass
+
+	plugin = modules['plugins'].get('Plugin')
+	hook_names = set(methods(plugin)) - set(not_hooks)
+
+	resolver = Resolver(modules)
+	manifest = {}
+	for name in names:
+		if name not in modules:
+			continue
+		try:
+			manifest[name] = module_entry(name, resolver, hook_names)
+		except Unknown:
+			print "%s: triggers or privmsg_patterns aren't literals, it's always imported" % name
+	return manifest
+
+def write(names):
+	manifest = generate(names)
+	with open(manifest_file, 'w') as file:
+		file.write("# Generated by plugin_manifest.py from the plugins' source. Don't edit,\n")
+		file.write("# run python plugin_manifest.py again.\n\n")
+		file.write("modules = %s\n" % pprint.pformat(manifest))
+	return manifest
+
+def load(names):
+	"""The manifest entries for those of names whose source still is what
+	the manifest was made from."""
+	namespace = {}
+	try:
+		execfile(manifest_file, namespace)
+	except (IOError, SyntaxError):
+		return {}
+
+	current = {}
+	for name, entry in namespace.get('modules', {}).items():
+		try:
+			if name in names and digest(name) == entry['digest']:
+				current[name] = entry
+		except IOError:
+			pass
+	return current
+
+if __name__ == '__main__':
+	sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+	import plugins
+	manifest = write([name for name in plugins.default_plugins if name not in plugins.vital_plugins])
+	print "Wrote %d modules to %s" % (len(manifest), manifest_file)
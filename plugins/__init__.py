@@ -8,7 +8,7 @@ default_plugins = ['first_plugin', 'auto_join', 'title_reader', "pi", 'standard'
                    'lithcourse', 'scale', 'postnr', 'tenta', 'prisjakt', 'spotify',
                    'stava', 'down', 'metacritic', 'notes', 'fml', 'systembolaget',
                    'randombuy', 'festern_bbq', 'compliment', 'roulette', 'tyda',
-                   'yrno']
+                   'yrno', 'stats', 'cache', 'jobs']
 
 __all__ = vital_plugins + default_plugins
 
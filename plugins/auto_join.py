@@ -13,5 +13,5 @@ class AutoJoinPlugin(Plugin):
 		pass
 	
 	def on_connected(self, bot):
-		for channel in settings.channels:
+		for channel in bot.channels:
 			bot.join(channel)
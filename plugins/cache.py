@@ -0,0 +1,23 @@
+# coding: utf-8
+
+from commands import Command
+import result_cache
+import utility
+
+class CacheCommand(Command):
+	def trig_cache(self, bot, source, target, trigger, argument):
+		"""Usage: .cache [purge [<trigger>]] Reply cache hit rate, or forget cached replies (of trigger)."""
+		if not utility.has_admin_privileges(source, target):
+			return
+
+		arguments = argument.split()
+		if arguments and arguments[0] == "purge":
+			trigger = None
+			if len(arguments) > 1:
+				trigger = arguments[1]
+			return "Purged %d cached replies." % result_cache.cache.purge(trigger)
+
+		stats = result_cache.cache.stats()
+		stats["percent"] = stats["hit_rate"] * 100
+		return ("%(entries)d of %(size)d entries. %(hits)d hits, %(stale_hits)d stale hits, %(misses)d misses (%(percent).0f%% hit rate), " +
+			"%(refreshes)d refreshed, %(evictions)d evicted.") % stats
@@ -10,63 +10,91 @@ import traceback
 import settings
 
 import error_handler
+import instrumentation
+import result_cache
 
 class CommandCatcherPlugin(Plugin): 
 	hooks = ['on_privmsg']   
+	privmsg_patterns = ['^' + re.escape(settings.command_prefix)]
 
 	def __init__(self):
 		pass
 
+	def call(self, bot, command, method, trigger, args):
+		"""method(*args) within the time limit, or the cached reply if
+		command has cache_seconds."""
+		def compute():
+			return utility.timeout(method, 10, args)
+
+		if not command.cache_seconds:
+			return compute()
+
+		stale = command.cache_stale_seconds
+		if stale is None:
+			stale = command.cache_seconds
+
+		return result_cache.cache.get(result_cache.key(trigger, args[4]), compute,
+			command.cache_seconds, stale, self.background(bot))
+
+	def background(self, bot):
+		"""A function that runs a function on the worker pool, to refresh
+		stale cache entries with, or None if there's no pool."""
+		workers = getattr(bot, 'workers', None)
+		if not workers:
+			return None
+
+		def run(function):
+			bot.reactor.call_from_thread(workers.submit, function, (), [("refresh", "cache")],
+				settings.command_timeout)
+		return run
+
 	def on_command(self, bot, source, target, trigger, arguments):
 		if source == "buffi":
 			return
 			
-		meth_name = 'trig_' + trigger.lower()
-		
-		pairs = []
-		
-		for command_class in commands.Command.__subclasses__():
-			import __builtin__
-			meth = None
-			try:
-				meth = command_class.instance.__getattribute__(meth_name)
-				pairs.append([command_class.instance, meth])
-			except:
-				pass
-				
-		for command in commands.get_commands_by_trigger(trigger):
-			pairs.append([command, command.on_trigger])
-
-		for pair in pairs:
-			command, method = pair
-
-			if command.can_trigger(source, trigger):
-				m = re.search('^(.+)!', source)
-				if m:
-					if target == source:
-						target = m.group(1)
-					source = m.group(1)
-
-				try:
-					return utility.timeout(method, 10, (bot, source, target, trigger, arguments))
-				except utility.TimeoutException:
-					return "Command '%s' took too long to execute." % trigger
-				except:
-					boll = list(traceback.extract_tb(sys.exc_info()[2]))
-					bolliStr =  ", ".join(map(lambda x: str(x), boll))
-					bot.tell('#botnik', "%s triggered an error by typing \'%s %s\': %s. %s" % (source, trigger, arguments, sys.exc_info(), bolliStr))
-
-					error_handler.output_message(str(sys.exc_info()))
-					error_handler.output_message('Error when executing command \'' + trigger + '\':' + str(traceback.extract_tb(sys.exc_info()[2])))
-
-					return "Oops. Error logged."
-			else:
-				return "Bwaha. You can't trigger that!"
+		handlers = commands.find_trigger(trigger)
 
-		if not len(pairs):
+		if not handlers:
 			if trigger in favorites.FavoriteCommands.instance.favorites.keys():
 				return favorites.FavoriteCommands.instance.trig_fav(bot, source, target, 'fav', trigger + ' ' + arguments)
-	
+
+			# Accept any unambiguous abbreviation.
+			completions = commands.complete_trigger(trigger)
+			if len(completions) != 1:
+				return
+			trigger = completions[0]
+			handlers = commands.find_trigger(trigger)
+
+		command, method = handlers[0]
+
+		if not command.can_trigger(source, trigger):
+			return "Bwaha. You can't trigger that!"
+
+		nick = utility.extract_nick(source)
+		if target == source:
+			target = nick
+		source = nick
+
+		record = instrumentation.record('command', '%s (%s)' % (trigger, command.__class__.__name__))
+		started = record.start()
+		try:
+			result = self.call(bot, command, method, trigger, (bot, source, target, trigger, arguments))
+			record.finish(started)
+			return result
+		except utility.TimeoutException:
+			record.finish(started, True)
+			return "Command '%s' took too long to execute." % trigger
+		except:
+			record.finish(started, True)
+			boll = list(traceback.extract_tb(sys.exc_info()[2]))
+			bolliStr =  ", ".join(map(lambda x: str(x), boll))
+			bot.tell('#botnik', "%s triggered an error by typing \'%s %s\': %s. %s" % (source, trigger, arguments, sys.exc_info(), bolliStr))
+
+			error_handler.output_message(str(sys.exc_info()))
+			error_handler.output_message('Error when executing command \'' + trigger + '\':' + str(traceback.extract_tb(sys.exc_info()[2])))
+
+			return "Oops. Error logged."
+
 	def on_privmsg(self, bot, source, target, message):
 		m = re.match(r'^(\S)((\S+)\s?(.*?))$', message)
 		if m and m.group(1) == settings.command_prefix:
@@ -78,14 +106,30 @@ class CommandCatcherPlugin(Plugin):
 				trigger = m.group(3)
 				arguments = m.group(4)
 
-			ret_str = self.on_command(bot, source, target, trigger, arguments)
-			if ret_str:
-				m = re.search('^(.+)!', source)
-				if m:
-					if target == source:
-						target = m.group(1)
-				
-				bot.tell(target, ret_str)
+			nick = utility.extract_nick(source)
+			reply_to = target
+			if target == source:
+				reply_to = nick
+
+			def reply(ret_str):
+				if ret_str:
+					bot.tell(reply_to, ret_str, nick)
+
+			def give_up():
+				bot.tell(reply_to, "Command '%s' took too long to execute." % trigger)
+
+			workers = getattr(bot, 'workers', None)
+			if not workers:
+				reply(self.on_command(bot, source, target, trigger, arguments))
+				return
+
+			# Run it on the worker pool so a slow command doesn't hold up
+			# the bot; the reply is sent once it's done.
+			keys = [("nick", nick.lower()), ("channel", reply_to.lower())]
+			job = workers.submit(self.on_command, (bot, source, target, trigger, arguments), keys,
+				settings.command_timeout, reply, give_up)
+			if not job:
+				bot.tell(reply_to, "Too busy right now, try again in a bit.")
 
 
 	def on_load(self):
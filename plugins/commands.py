@@ -1,10 +1,18 @@
 # coding: utf-8
 
+from bisect import bisect_left
+
 from plugins import Plugin
 
 class Command(Plugin):
 	triggers = []
 
+	# Replies are cached for cache_seconds by trigger and argument, and
+	# answered with for another cache_stale_seconds (default: as long again)
+	# while they're fetched anew. See result_cache.py.
+	cache_seconds = None
+	cache_stale_seconds = None
+
 	def __repr__(self):
 		return '<%s %r>' % (
 			self.__class__.__name__,
@@ -31,3 +39,52 @@ def get_commands_by_trigger(trigger):
 			commands.append(command.instance)
 
 	return commands
+
+# Lowercased trigger -> [(command instance, handler)], trig_ methods ahead
+# of triggers aliases. Rebuilt by build_trigger_table whenever plugins are
+# (re)loaded.
+trigger_table = {}
+sorted_triggers = []
+
+# Lowercased trigger -> the plugin modules that have it but haven't been
+# imported yet (see plugin_handler.lazy_modules).
+lazy_triggers = {}
+
+def build_trigger_table(lazy={}):
+	global trigger_table, sorted_triggers, lazy_triggers
+
+	table = {}
+	instances = [command.__dict__.get('instance') for command in Command.__subclasses__()]
+	instances = [instance for instance in instances if instance is not None]
+
+	for instance in instances:
+		for name in dir(instance):
+			if name.startswith('trig_'):
+				table.setdefault(name[5:].lower(), []).append((instance, getattr(instance, name)))
+
+	for instance in instances:
+		for trigger in instance.triggers:
+			table.setdefault(trigger.lower(), []).append((instance, instance.on_trigger))
+
+	trigger_table = table
+	lazy_triggers = lazy
+	sorted_triggers = sorted(set(table) | set(lazy))
+
+def find_trigger(trigger):
+	trigger = trigger.lower()
+	if trigger in lazy_triggers:
+		import plugin_handler
+		plugin_handler.load_lazy(lazy_triggers[trigger])
+	return trigger_table.get(trigger, [])
+
+def complete_trigger(prefix):
+	"""Every trigger that starts with prefix, in sorted order."""
+	prefix = prefix.lower()
+	triggers = sorted_triggers
+
+	result = []
+	i = bisect_left(triggers, prefix)
+	while i < len(triggers) and triggers[i].startswith(prefix):
+		result.append(triggers[i])
+		i += 1
+	return result
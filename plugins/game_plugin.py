@@ -8,8 +8,12 @@ import standard
 import re
 
 class Game:
-	def __init__(self, name):
+	# Games saved before there were several networks have none.
+	network = None
+
+	def __init__(self, name, network=None):
 		self.name = name
+		self.network = network
 		self.players = {}
 		self.timeout = None
 		self.time = None
@@ -108,6 +112,9 @@ class Game:
 class GamePlugin(Command):
 	hooks = ['on_privmsg']   
 
+	# Questions time out after 30 seconds.
+	beat_interval = 1
+
 	def __init__(self):
 		self.dictionary = { "*round time machine*": "clock", "*fourlegged reliever*": "chair", "*round rubber carrier*": "wheel", "*code machine*": "matricks", "*italian plumber*": "mario", "*squishy ball with gun*": "tee", "*round house kick master*": "chuck norris", "*best encoding*": "utf-8" }
 		self.games = {}
@@ -130,35 +137,42 @@ class GamePlugin(Command):
 	def load_games(self):
 		self.games = utility.load_data("games", {})
 
+	def find_game(self, bot, target):
+		"""The game in channel target on bot's network, if there is one."""
+		game = self.games.get(target)
+		if game and game.network in (None, bot.network):
+			return game
+		return None
+
 	def trig_gamestart(self, bot, source, target, trigger, argument):
-		if not target in self.games.keys():
-			self.games[target] = Game(target)
+		if not self.find_game(bot, target):
+			self.games[target] = Game(target, bot.network)
 			self.games[target].set_dictionary(self.dictionary)
 	
 		game = self.games[target]
 		game.start(bot)
 
 	def trig_gamestop(self, bot, source, target, trigger, argument):
-		if target in self.games.keys():
-			game = self.games[target]
+		game = self.find_game(bot, target)
+		if game:
 			game.stop(bot)
 
 			self.on_save()
 	
 	def trig_gamehiscore(self, bot, source, target, trigger, argument):
-		if target in self.games.keys():
-			game = self.games[target]
+		game = self.find_game(bot, target)
+		if game:
 			game.send_hiscore(bot)
 		else:
 			return "I have no hiscore for this game."
 
 	def on_privmsg(self, bot, source, target, message):
-		if target in self.games.keys():
-			game = self.games[target]
+		game = self.find_game(bot, target)
+		if game:
 			game.on_privmsg(bot, source, target, message)
 
 		return None
 
 	def timer_beat(self, bot, time):
 		for game in self.games.values():
-			game.on_tick(bot, time)
+			game.on_tick(bot.get_network(game.network) or bot.networks[0], time)
@@ -1,143 +1,164 @@
-import sys
 import re
-from socket import *
+import time
+import socket
+import httplib
+import urlparse
+import threading
 
 import error_handler
-
-def write(s, text):
-	s.send(text)
-	s.send("\r\n")
-
-class http_get_request:
-	def __init__(self, file):
-		self.file = file
-		self.headers = []
-
-	def add_header(self, name, value):
-		self.headers.append((name, value))
-
-	def send(self, s):
-		write(s, "GET %s HTTP/1.0" % self.file)
-		write(s, "\r\n".join(map(lambda x: "%s: %s" % x, self.headers)))
-		write(s, "")
-		write(s, "")
-
-def read_line(s):
-	line = ""
-
-	while True:
-		line += s.recv(1)
-
-		if line and line[-1:] == "\n":
-			line = line[0:-1]
-			if len(line) and line[-1] == "\r":
-				line = line[0:-1]
-
-			return line
-
-def read_http_headers(s):
-	m = re.match("^(.+?) (.+?) (.+)$", read_line(s))
-	protocol, response_num, response_string = m.groups()
-	headers = {}
-
-	while True:
-		line = read_line(s)
-		if len(line) == 0:
-			break
-
-		m = re.match("^(.+?) (.+)$", line)
-		if m:
-			headers[m.group(1)[0:-1]] = m.group(2)
-
-	return (protocol, int(response_num), response_string, headers)
-
-def read_http_data(s, length):
-	data = ''
-	while not length or len(data) < length:
-		to_receive = 1024
-		if length:
-			to_receive = min(length - len(data), 1024)
-
-		new_data = s.recv(to_receive)
-		
-		if new_data:
-			data += new_data
+import deadline
+import settings
+
+class HttpClient:
+	"""Fetches http(s) URLs over HTTP/1.1, keeping up to pool_size idle
+	connections per host open for keep_alive seconds, so requests to the
+	same host don't pay for a new connection (and TLS handshake) each time.
+	Shared by every thread.
+
+	A server may close an idle connection whenever it likes; a request that
+	fails on one that was kept is tried once more on a new one."""
+
+	def __init__(self, pool_size=4, keep_alive=15, max_redirects=5, max_bytes=1024*1024):
+		self.pool_size = pool_size
+		self.keep_alive = keep_alive
+		self.max_redirects = max_redirects
+		self.max_bytes = max_bytes
+
+		self.lock = threading.Lock()
+		# (scheme, host, port) -> [(connection, time it went idle)], oldest first.
+		self.idle = {}
+
+		self.requests = 0
+		self.connections = 0
+		self.reused = 0
+		self.retried = 0
+		self.redirects = 0
+
+	def get_connection(self, key, timeout, fresh=False):
+		"""An idle connection to key that hasn't been for too long or, if
+		there's none or fresh, a new one. Returns it and whether it was reused."""
+		now = time.time()
+		with self.lock:
+			pool = self.idle.get(key, [])
+			while pool and not fresh:
+				connection, since = pool.pop()
+				if now - since < self.keep_alive:
+					self.reused += 1
+					connection.timeout = timeout
+					connection.sock.settimeout(timeout)
+					return connection, True
+				connection.close()
+			self.connections += 1
+
+		scheme, host, port = key
+		if scheme == 'https':
+			return httplib.HTTPSConnection(host, port, timeout=timeout), False
+		return httplib.HTTPConnection(host, port, timeout=timeout), False
+
+	def put_connection(self, key, connection):
+		with self.lock:
+			pool = self.idle.setdefault(key, [])
+			pool.append((connection, time.time()))
+			if len(pool) > self.pool_size:
+				pool.pop(0)[0].close()
+
+	def exchange(self, connection, path, headers):
+		all_headers = { "User-Agent": "Pynik/0.1", "Accept": "*/*" }
+		all_headers.update(headers or {})
+		try:
+			connection.request("GET", path, headers=all_headers)
+			response = connection.getresponse()
+			return response, response.read(self.max_bytes)
+		except:
+			connection.close()
+			raise
+
+	def request(self, key, path, timeout, headers=None):
+		"""GETs path from key, sending headers on top of the usual ones.
+		Returns the response and its body, at most max_bytes of it."""
+		connection, reused = self.get_connection(key, timeout)
+		try:
+			response, data = self.exchange(connection, path, headers)
+		except socket.timeout:
+			raise
+		except (socket.error, httplib.HTTPException):
+			if not reused:
+				raise
+			# Closed by the server while it was idle.
+			self.retried += 1
+			connection, reused = self.get_connection(key, timeout, True)
+			response, data = self.exchange(connection, path, headers)
+
+		# Only a connection whose response has been read to the end can be
+		# used again.
+		if response.isclosed() and not response.will_close:
+			self.put_connection(key, connection)
 		else:
-			break
-
-	return data
+			connection.close()
+		return response, data
+
+	def get(self, url, timeout=None, headers=None):
+		"""Fetches url, following redirects, giving up on any socket
+		operation that takes more than timeout seconds (or past the
+		deadline). headers (a dict) go with every request. Returns { "url":
+		where it ended up, "data": the body, "info": the headers }, or None
+		if it can't. Error pages are pages too."""
+		visited = set()
+		for hop in range(self.max_redirects + 1):
+			parts = urlparse.urlsplit(url)
+			if parts.scheme not in ('http', 'https') or not parts.hostname:
+				if hop:
+					error_handler.output_message("<httpget> Redirected to an unsupported URL: %s" % url)
+				else:
+					error_handler.output_message("<httpget> Only http(s) is supported at this moment, cannot get " + url)
+				return None
 
-def read_url(url):
-	m = re.match("^(.{3,5}):\/\/([^\/]*)(:?\d*)(\/.*?)?$", url)
-	if m:
-		protocol, address, port, file = m.group(1, 2, 3, 4)
+			path = parts.path or '/'
+			if parts.query:
+				path += '?' + parts.query
 
-		if protocol in ['https', 'http']:
-			# Use the built-in functions
-			import urllib
-			
+			self.requests += 1
 			try:
-				file = urllib.urlopen(url)
-			except IOError:
+				port = parts.port or { 'http': 80, 'https': 443 }[parts.scheme]
+				response, data = self.request((parts.scheme, parts.hostname, port), path,
+					deadline.current().timeout(timeout), headers)
+			except (socket.error, httplib.HTTPException, ValueError):
 				return None
-			
-			result = { "url": file.geturl(),
-						"data": file.read(1024*1024),
-						"info": file.info() }
-			
-			file.close()
-			return result
-				
-		elif protocol != 'http':
-			error_handler.output_message("<httpget> Only http(s) is supported at this moment, cannot get " + url)
-			return None
-		else:
-			# Disabled custom http reader in favor of built-in Python functionality
-			pass
-			
-			if not port:
-				port = 80
-			if not file:
-				file = '/'
-
-			#print "Connecting to %s" % address
-
-			request = http_get_request(file)
-			request.add_header("User-Agent", "Pynik/0.1")
-			request.add_header("Accept", "*/*")
-			request.add_header("Host", address)
-
-			s = socket(AF_INET, SOCK_STREAM)
-
-			s.connect((address, port))
-			request.send(s)
-
-			protocol, response_num, response_string, headers = read_http_headers(s)
-
-			if response_num == 301 or response_num == 302:
-				s.close()
-				
-				# Let's do some simple loop detection...
-				if url == headers['Location']:
-					print "Redirect loop discovered at: %s" % headers['Location']
-					return None
-				else:
-					print "Site moved to: %s" % headers['Location']
-					return read_url(headers['Location'])
-			elif response_num == 200:
-				#print "Got response 200. Sweet!"
-				length = 1024*1024 # max one megabyte
-				if "Content-Length" in headers:
-					length = min(length, int(headers["Content-Length"]))
-
-				data = read_http_data(s, length)
 
-				s.close()
+			location = response.getheader('Location')
+			if response.status not in (301, 302, 303, 307, 308) or not location:
+				return { "url": url, "data": data, "info": response.msg }
 
-				return { "url": url, "data": data }
-			else:
-				error_handler.output_message("<httpget> Got unhandled response code: %s" % response_num)
+			visited.add(url)
+			url = urlparse.urljoin(url, location.strip())
+			if url in visited:
+				error_handler.output_message("<httpget> Redirect loop at: %s" % url)
 				return None
-	else:
+			self.redirects += 1
+
+		error_handler.output_message("<httpget> Too many redirects, ending at: %s" % url)
+		return None
+
+	def close(self):
+		"""Closes the idle connections."""
+		with self.lock:
+			for pool in self.idle.values():
+				for connection, since in pool:
+					connection.close()
+			self.idle = {}
+
+	def stats(self):
+		with self.lock:
+			idle = sum([len(pool) for pool in self.idle.values()])
+		return { "requests": self.requests, "connections": self.connections, "reused": self.reused,
+			"retried": self.retried, "redirects": self.redirects, "idle": idle }
+
+client = HttpClient(settings.http_pool_size, settings.http_keep_alive, settings.http_max_redirects)
+
+def read_url(url, timeout=None, headers=None):
+	"""Fetches url, giving up on any socket operation that takes more than
+	timeout seconds. Returns None if it can't."""
+	if not re.match("^(.{3,5}):\/\/([^\/]*)(:?\d*)(\/.*?)?$", url):
 		error_handler.output_message("<httpget> NOT AN URL: %s" % url)
 		return None
+	return client.get(url, timeout, headers)
@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 
 import utility
+import result_cache
 from commands import Command
 
 from json import JSONDecoder
 
 class IMDbCommand(Command):
+	cache_seconds = 24 * 60 * 60
 	usage = "Usage: .imdb <search term>"
 	
 	def __init__(self):
@@ -25,6 +27,7 @@ class IMDbCommand(Command):
 		try:
 			data = decoder.decode(response['data'])
 		except Exception:
+			result_cache.dont_cache()
 			return u"Couldn't parse the API output :( | Manual search: " + site_search_url
 		
 		if data.get(u"Response") != u"True":
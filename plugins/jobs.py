@@ -0,0 +1,34 @@
+# coding: utf-8
+
+from commands import Command
+import utility
+
+class JobsCommand(Command):
+	def trig_jobs(self, bot, source, target, trigger, argument):
+		"""Usage: .jobs [cancel <id>] Background jobs running or waiting, with how long for, or cancel one."""
+		if not utility.has_admin_privileges(source, target):
+			return
+
+		arguments = argument.split()
+		if arguments and arguments[0] == "cancel":
+			if len(arguments) < 2 or not arguments[1].isdigit():
+				return "Usage: .jobs cancel <id>"
+			job = bot.jobs.find(int(arguments[1]))
+			if not job:
+				return "No job %s." % arguments[1]
+			job.cancel()
+			return "Cancelling %s." % job.name
+
+		jobs = bot.jobs.running()
+		if not jobs:
+			return "No background jobs."
+
+		lines = []
+		for job in jobs:
+			line = "%d %s: %s %.1f s" % (job.id, job.name, job.state, job.elapsed())
+			if job.progress is not None:
+				line += ", %s" % job.progress
+			if job.cancelled:
+				line += ", cancelling"
+			lines.append(line)
+		return "\n".join(lines)
@@ -119,6 +119,8 @@ def lith_course_info(code, programme, year):
 			". " + schedule_text + " | " + sh_url(code, year)
 
 class LithCourse(Command):
+	cache_seconds = 24 * 60 * 60
+
 	def __init__(self):
 		pass
 	
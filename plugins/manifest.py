@@ -0,0 +1,212 @@
+# Generated by plugin_manifest.py from the plugins' source. Don't edit,
+# run python plugin_manifest.py again.
+
+modules = {'auto_join': {'digest': '311a0da9daa072ef93254d40f094b509cba529d7',
+               'hooks': ['on_connected'],
+               'privmsg_patterns': [],
+               'triggers': []},
+ 'cache': {'digest': '7d28e709f1cddfbfa2fab44cbb47cfe6d6608a2e',
+           'hooks': [],
+           'privmsg_patterns': [],
+           'triggers': ['cache']},
+ 'compliment': {'digest': '6683859c04171e1f8229be030744ee59d390c144',
+                'hooks': [],
+                'privmsg_patterns': [],
+                'triggers': ['addcompliment', 'compliment']},
+ 'down': {'digest': '60d9e2120cffee688ced68938ff8032d5ef9725f',
+          'hooks': [],
+          'privmsg_patterns': [],
+          'triggers': ['down']},
+ 'example_command': {'digest': 'f343c8345857c8dc55c7933392aef0c35388696c',
+                     'hooks': [],
+                     'privmsg_patterns': [],
+                     'triggers': ['example']},
+ 'favorites': {'digest': '66e902f71b91ae8a5c3ebf21335be35c03194f5e',
+               'hooks': [],
+               'privmsg_patterns': [],
+               'triggers': ['delfav', 'fav', 'favorites', 'setfav']},
+ 'festern_bbq': {'digest': '96de047c61ef55f747d8a2369e1075ce3fe4a491',
+                 'hooks': [],
+                 'privmsg_patterns': [],
+                 'triggers': ['grillern']},
+ 'first_plugin': {'digest': '7940dd37285feafa9d3bbff579166add6d624d7e',
+                  'hooks': ['on_privmsg'],
+                  'privmsg_patterns': None,
+                  'triggers': []},
+ 'fml': {'digest': 'ae7bdc0beba702a06da232a8ffb037b95b0146b4',
+         'hooks': [],
+         'privmsg_patterns': [],
+         'triggers': ['ffml', 'fml']},
+ 'give': {'digest': 'f18ca190be2e2a1cf164019aa5eacc8e54a24247',
+          'hooks': [],
+          'privmsg_patterns': [],
+          'triggers': ['give']},
+ 'googlefight': {'digest': 'e3b4870285f73304da8a138991c448aa76f82496',
+                 'hooks': [],
+                 'privmsg_patterns': [],
+                 'triggers': ['googlefight']},
+ 'ical_parser': {'digest': '0dda313690a1f7ef8e0b62ef0b385a0eb5d8750e',
+                 'hooks': [],
+                 'privmsg_patterns': [],
+                 'triggers': ['addschemacourse', 'addschemaid', 'schema']},
+ 'icq': {'digest': '6f11297755d996d171ec85facf6d09b061f38014',
+         'hooks': [],
+         'privmsg_patterns': [],
+         'triggers': ['icq']},
+ 'imdb': {'digest': '53038fd30e1e33d4748229e95387dba88801e3b7',
+          'hooks': [],
+          'privmsg_patterns': [],
+          'triggers': ['imdb']},
+ 'jobs': {'digest': 'c43257cec82b26c73e3ae6f9cd84ab626b6baf13',
+          'hooks': [],
+          'privmsg_patterns': [],
+          'triggers': ['jobs']},
+ 'kolli': {'digest': 'fc6b26d2f7241bcc0dc2b5f1fbec98744b0ab378',
+           'hooks': [],
+           'privmsg_patterns': [],
+           'triggers': ['kolli']},
+ 'lithcourse': {'digest': '456ecade1d5c5289abafc43d3560d3958b42d2b5',
+                'hooks': [],
+                'privmsg_patterns': [],
+                'triggers': ['lithcourse']},
+ 'mat': {'digest': '143b0f0550f016b81ac4132211aae3e3bdec79a7',
+         'hooks': [],
+         'privmsg_patterns': [],
+         'triggers': ['mat']},
+ 'metacritic': {'digest': 'd905c6b8b3620f640d36a37de656ff3b52e7e0d1',
+                'hooks': [],
+                'privmsg_patterns': [],
+                'triggers': ['mc']},
+ 'nextep': {'digest': '190e9da048b453f3c21016688939b6099fba1c70',
+            'hooks': [],
+            'privmsg_patterns': [],
+            'triggers': ['nextep']},
+ 'notes': {'digest': '6763ce87830fd2378eefd6bd0ad071f47a25a91d',
+           'hooks': [],
+           'privmsg_patterns': [],
+           'triggers': ['notes']},
+ 'options': {'digest': '69cd5f149b638acde0a69f4aa48a6700231d4bef',
+             'hooks': [],
+             'privmsg_patterns': [],
+             'triggers': ['options']},
+ 'pi': {'digest': 'bedf8a7b2c3c195108b9f87a887dcbcbbe10d8c6',
+        'hooks': [],
+        'privmsg_patterns': [],
+        'triggers': ['pi']},
+ 'postnr': {'digest': '38794f233b844707638cbc8d9c5bf5828609c385',
+            'hooks': [],
+            'privmsg_patterns': [],
+            'triggers': ['postnr']},
+ 'prisjakt': {'digest': '5ef045ca312459d9efb28ee3c86b87b5877cc882',
+              'hooks': [],
+              'privmsg_patterns': [],
+              'triggers': ['prisjakt']},
+ 'pylisp': {'digest': 'b76b527bad95f311c6705ad79b223c6f5386fa18',
+            'hooks': [],
+            'privmsg_patterns': [],
+            'triggers': ['lisp']},
+ 'qotd': {'digest': 'fca859f34678a01027f3bb8ad8a81fa88a5f9a61',
+          'hooks': [],
+          'privmsg_patterns': [],
+          'triggers': ['qotd']},
+ 'randombuy': {'digest': 'f50548a6fb48f4c718bd0e57d92fea43597f8bdc',
+               'hooks': ['on_privmsg'],
+               'privmsg_patterns': ['^\\.k'],
+               'triggers': []},
+ 'reloader': {'digest': 'c13b0b09711653f8f638ea7698997b6b78448f9b',
+              'hooks': [],
+              'privmsg_patterns': [],
+              'triggers': ['load', 'reload']},
+ 'reminder': {'digest': '7c9f3653e9f0b5359b024c8078b64603bbca034c',
+              'hooks': ['timer_beat'],
+              'privmsg_patterns': [],
+              'triggers': ['reminder', 'reminders']},
+ 'roulette': {'digest': '8653b62ef8857e5408b3f6a594ff2976be555bbf',
+              'hooks': [],
+              'privmsg_patterns': [],
+              'triggers': ['roulette']},
+ 'rss': {'digest': '43de35e3de8890ca48423be53426bb88c0a2828f',
+         'hooks': ['timer_beat'],
+         'privmsg_patterns': [],
+         'triggers': ['delwatch', 'rss', 'watch']},
+ 'scale': {'digest': 'c2caae1e0dcb39ef8e1279f062392d5f4c8dbff7',
+           'hooks': [],
+           'privmsg_patterns': [],
+           'triggers': ['scale']},
+ 'spotify': {'digest': '2f79c69ea00404965932f44ffbee4f4a314b86b6',
+             'hooks': ['on_privmsg'],
+             'privmsg_patterns': ['open\\.spotify\\.com/', 'spotify:'],
+             'triggers': ['spotify']},
+ 'standard': {'digest': 'dba347a9d928f2a0f17430a3daf05416509dc197',
+              'hooks': [],
+              'privmsg_patterns': [],
+              'triggers': ['addinsult',
+                           'collect',
+                           'commands',
+                           'echo',
+                           'google',
+                           'hello',
+                           'help',
+                           'insult',
+                           'more',
+                           'pick',
+                           'raw',
+                           'temp',
+                           'time',
+                           'week',
+                           'wp',
+                           '}{|',
+                           '\xc3\xa5\xc3\xa4\xc3\xb6',
+                           '\xe5\xe4\xf6']},
+ 'stats': {'digest': '4925d43a436b9038dae76729ea8ea3cc9a0530d6',
+           'hooks': [],
+           'privmsg_patterns': [],
+           'triggers': ['stats']},
+ 'stava': {'digest': '34a8c842dd0d852507183070349658f09d4643ae',
+           'hooks': [],
+           'privmsg_patterns': [],
+           'triggers': ['stava']},
+ 'svn': {'digest': 'ae39a513ab200a9cdcab231193d02cfd7ec0c939',
+         'hooks': [],
+         'privmsg_patterns': [],
+         'triggers': ['svn']},
+ 'systembolaget': {'digest': '168dbfc7944b612beb0ab422bc9d87303c4ffd28',
+                   'hooks': [],
+                   'privmsg_patterns': [],
+                   'triggers': ['system']},
+ 'teewars': {'digest': '9fcaa31a7a8e29928d9c6203e4638b4291872c57',
+             'hooks': ['timer_beat'],
+             'privmsg_patterns': [],
+             'triggers': ['teewars', 'twinfo']},
+ 'tenta': {'digest': 'dfa59923a94f4f718da0cbf3f6d01b38928010c4',
+           'hooks': [],
+           'privmsg_patterns': [],
+           'triggers': ['tenta']},
+ 'timezone': {'digest': 'e6ec9542058bdb826c7486777fafb89757f9a71d',
+              'hooks': [],
+              'privmsg_patterns': [],
+              'triggers': ['timezone', 'timezones']},
+ 'title_reader': {'digest': '86fd4f45a66624e25f628b78edebbe3bb2be843b',
+                  'hooks': ['on_privmsg'],
+                  'privmsg_patterns': ['https?://', 'www\\.'],
+                  'triggers': ['deltitlemask',
+                               'reloadtitlemasks',
+                               'title',
+                               'titlemask',
+                               'urlsearch']},
+ 'tv': {'digest': '19bf580f5cc64498f0e12d2c18f230f43439dc51',
+        'hooks': [],
+        'privmsg_patterns': [],
+        'triggers': ['tv']},
+ 'tw_nazi': {'digest': '87abf7c6ffe94582b525840f76a4322e5f08ba60',
+             'hooks': ['on_privmsg'],
+             'privmsg_patterns': ['[\xe5\xe4\xf6\xc5\xc4\xd6]'],
+             'triggers': []},
+ 'tyda': {'digest': '59f6e05b1f3a9d9db9d16f6d328ddd685483077b',
+          'hooks': [],
+          'privmsg_patterns': [],
+          'triggers': ['tyda']},
+ 'yrno': {'digest': 'df3d569d09d28d7bee695e6caff8cfe71f408c70',
+          'hooks': [],
+          'privmsg_patterns': [],
+          'triggers': ['yr']}}
@@ -9,6 +9,8 @@ from commands import Command
 import error_handler
 
 class metacritic(Command):
+	cache_seconds = 24 * 60 * 60
+
 	def __init__(self):
 		pass
 
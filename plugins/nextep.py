@@ -5,6 +5,7 @@ import re
 import utility
 
 class NextEpisodeCommand(Command):
+	cache_seconds = 60 * 60
 	api_url = "http://services.tvrage.com/tools/quickinfo.php?show=%s"
 	search_url = "http://tvrage.com/search.php?search=%s"
 	pattern = re.compile(r"(.+?)@(.+)")
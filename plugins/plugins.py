@@ -1,12 +1,37 @@
 # coding: utf-8
 
 class Plugin(object):
+	# Regular expressions, searched for in the message ignoring case, that
+	# a PRIVMSG has to match for on_privmsg to be called; None means every
+	# message. They only decide whether to call on_privmsg at all, so they
+	# may be rougher than whatever on_privmsg checks itself.
+	privmsg_patterns = None
+
+	# timer_beat is called every beat_interval seconds (None: never), plus up
+	# to beat_jitter at random, and gets a deadline beat_max_runtime seconds
+	# on. With beat_in_background it runs on a worker thread, so a slow one
+	# doesn't hold up the bot. See scheduler.py.
+	beat_interval = None
+	beat_jitter = 0
+	beat_max_runtime = None
+	beat_in_background = False
+
 	def on_load(self):
 		pass
 
 	def on_unload(self):
 		pass
 
+	def handoff(self):
+		# When the plugin's module is reloaded, this is asked for whatever
+		# state the new instance should take over, right before on_unload.
+		return None
+
+	def on_reload(self, state):
+		# Called on the new instance, with what the old one's handoff
+		# returned, instead of on_load.
+		self.on_load()
+
 	def get_options(self):
 		return []
 
@@ -16,6 +41,10 @@ class Plugin(object):
 	def timer_beat(self, bot, now):
 		pass
 
+	def on_irc_message(self, bot, message):
+		# Every parsed line from the server, as an ircclient.message.Message.
+		pass
+
 	def on_connected(self, bot):
 		pass
 
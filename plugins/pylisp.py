@@ -3,7 +3,10 @@ from commands import Command
 import utility
 
 import command_catcher
+import sandbox
 import random
+import threading
+import cPickle
 
 import re
 
@@ -664,7 +667,7 @@ def or_func(env, a, b):
 
 def command_func(env, command, argument):
 	eval_assert(isinstance(command, String) and isinstance(argument, String), "arguments must be strings")
-	retn = command_catcher.CommandCatcherPlugin.instance.on_command(env[Symbol("bot")], env[Symbol("source")].value, env[Symbol("target")].value, command.value, argument.value)
+	retn = sandbox.upcall("command", command.value, argument.value)
 	if retn:
 		return String(retn)
 	else:
@@ -692,6 +695,11 @@ def lisp(env, text):
 
 	return expressions[0].eval(env)
 
+# Set while the thread evaluates lisp, which may run commands (see
+# command_func), so that a .lisp run from lisp is turned down instead of
+# waiting for the lock its own thread holds.
+local = threading.local()
+
 class LispCommand(Command): 
 	def __init__(self):
 		self.globals = Environment()
@@ -724,27 +732,57 @@ class LispCommand(Command):
 		self.globals[Symbol("command")] = NativeFunction(command_func, "command", 2)
 
 		self.savable_environment = Environment(self.globals)
+		self.lock = threading.Lock()
 		#self.globals[Name("inc")] = Lambda(List([List([Name("lol")]), Name("add"), Name("lol"), Integer(1)]))
 		#self.globals[Name("yes")] = Lambda(List([List([]), Name("#t")]))
 		#self.globals[Name("no")] = Lambda(List([List([]), Name("nil")]))
 
 	def trig_lisp(self, bot, source, target, trigger, argument):
-		try:
-			self.globals[Symbol("bot")] = bot
-			self.globals[Symbol("source")] = String(source)
-			self.globals[Symbol("target")] = String(target)
-			self.globals[Symbol("trigger")] = String(trigger)
-			retn = str(lisp(self.savable_environment, argument))
-			self.save()
+		def command(trigger, argument):
+			return command_catcher.CommandCatcherPlugin.instance.on_command(bot, source, target, trigger, argument)
+
+		if getattr(local, 'evaluating', False):
+			return "Lisp can't run lisp."
+
+		# Evaluation happens in the sandbox, on a copy of the environment;
+		# one at a time so no changes get lost.
+		with self.lock:
+			local.evaluating = True
+			try:
+				retn, state = sandbox.run(bot, __name__, "evaluate",
+					(self.get_state(), source, target, trigger, argument), { "command": command })
+			except sandbox.SandboxError as e:
+				return "Evaluation failed: %s." % e
+			finally:
+				local.evaluating = False
+
+			if state is not None:
+				self.set_state(state)
+				self.save()
 			return retn
-		except LispError as e:
-			return str(e)
+
+	def get_state(self):
+		self.savable_environment.parent = None
+		state = cPickle.dumps(self.savable_environment, 2)
+		self.savable_environment.parent = self.globals
+		return state
+
+	def set_state(self, state):
+		self.savable_environment = cPickle.loads(state)
+		self.savable_environment.parent = self.globals
 
 	def save(self):
 		self.savable_environment.parent = None
 		utility.save_data("lisp_state", self.savable_environment)
 		self.savable_environment.parent = self.globals
 
+	def handoff(self):
+		# Pickled, so the new instance gets it in the reloaded classes.
+		return self.get_state()
+
+	def on_reload(self, state):
+		self.set_state(state)
+
 	def on_load(self):
 		self.savable_environment = utility.load_data("lisp_state")
 		
@@ -760,6 +798,20 @@ class LispCommand(Command):
 
 import sys
 
+def evaluate(state, source, target, trigger, argument):
+	"""Evaluates argument in state, a pickled environment. Returns the result
+	and the new state, or the error and None."""
+	lisp_command = LispCommand()
+	lisp_command.set_state(state)
+	try:
+		lisp_command.globals[Symbol("source")] = String(source)
+		lisp_command.globals[Symbol("target")] = String(target)
+		lisp_command.globals[Symbol("trigger")] = String(trigger)
+		retn = str(lisp(lisp_command.savable_environment, argument))
+		return retn, lisp_command.get_state()
+	except LispError as e:
+		return str(e), None
+
 command = LispCommand()
 #print command.trig_lisp("bot", "source", "target", "trigger", sys.argv[1])
 #print command.savable_environment
@@ -76,6 +76,7 @@ def random_product_dealextreme(min_price, max_price, hardcore, removal_filter):
 		return "$" + result_product[2] + ": " + result_product[1] + " | " + diff_string + " SEK i frhllande till maxpris | http://www.dealextreme.com/details.dx/sku." + result_product[0]
 
 class RandomBuyCommand(Command):
+	privmsg_patterns = [r'^\.k']
 	usage = "Anvndning: .kp <maxkostnad>|<intervall>|=<ungefrlig kostnad> | Mnga '' ger direktlnk till kassan med produkt tillagd, istllet fr produktdetaljer. Kostnader anges i hela svenska kronor!"
 	
 	def __init__(self):
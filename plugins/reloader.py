@@ -6,13 +6,18 @@ import utility
 
 class ReloadCommand(Command):
 	def trig_reload(self, bot, source, target, trigger, argument):
+		"""Reloads the plugins that changed since they were loaded, or all of them with "all"."""
 		if utility.has_admin_privileges(source, target):
-			bot.reload_plugins()
-			return "Reloaded and good to go!"
+			modules, seconds = bot.reload_plugins(argument.strip() == "all")
+			if not modules:
+				return "Nothing has changed."
+
+			names = [module.split('.')[-1] for module in modules]
+			return "Reloaded %s in %d ms and good to go!" % (", ".join(names), seconds * 1000)
 			
 class LoadCommand(Command):
 	def trig_load(self, bot, source, target, trigger, argument):
 		plugin = argument
 		if utility.has_admin_privileges(source, target):
 			bot.load_plugin(plugin)
-			return "Plugin %s loaded. Use 'reload' to initialize it." % plugin
+			return "Plugin %s loaded." % plugin
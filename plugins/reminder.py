@@ -8,19 +8,196 @@ from xml.dom import minidom
 import utility
 import urllib
 import time
+import heapq
+import cPickle
+import cStringIO
+import threading
+
+import error_handler
 
 class Reminder:
-	def __init__(self, nick, trigger_time, message):
+	# Reminders saved before there were several networks have none.
+	network = None
+
+	def __init__(self, nick, trigger_time, message, id=None, network=None):
 		self.nick = nick
 		self.trigger_time = trigger_time
 		self.message = message
+		self.id = id
+		self.network = network
+
+class ReminderStore:
+	"""Reminders by id, with a heap of (trigger time, id) to find the ones
+	due and the ids of each nick's.
+
+	What's stored is a snapshot, data/<name>.txt, and the changes since
+	then, appended to data/<name>.journal as they're made. Once the journal
+	holds more than compact_after records, and more than there are
+	reminders, the reminders are written to a new snapshot and the journal
+	started over."""
+
+	def __init__(self, name, compact_after=1000):
+		self.name = name
+		self.compact_after = compact_after
+		self.journal_file = os.path.join('data', name + '.journal')
+		self.lock = threading.Lock()
+
+		self.by_id = {}
+		self.by_nick = {}
+		self.deadlines = []
+		self.next_id = 0
+		self.journal = None
+		self.journal_records = 0
+
+	def __len__(self):
+		return len(self.by_id)
+
+	def load(self):
+		with self.lock:
+			for reminder in utility.load_data(self.name, []):
+				# Snapshots from before reminders had ids.
+				if getattr(reminder, 'id', None) is None:
+					reminder.id = self.next_id
+				self.index(reminder)
+
+			self.replay()
+			self.journal = open(self.journal_file, 'ab')
+
+	def replay(self):
+		"""Applies the journal's records. Adding a reminder that's there and
+		removing one that isn't do nothing, so records a snapshot already
+		has are harmless. A record torn by a crash while it was written is
+		cut off the end."""
+		try:
+			with open(self.journal_file, 'rb') as file:
+				data = file.read()
+		except IOError:
+			return
+
+		stream = cStringIO.StringIO(data)
+		unpickler = cPickle.Unpickler(stream)
+		end = 0
+		while end < len(data):
+			try:
+				record = unpickler.load()
+			except Exception:
+				break
+			end = stream.tell()
+
+			self.journal_records += 1
+			if record[0] == 'add':
+				id, nick, trigger_time, message = record[1:5]
+				network = None
+				if len(record) > 5:
+					network = record[5]
+				if id not in self.by_id:
+					self.index(Reminder(nick, trigger_time, message, id, network))
+			elif record[0] == 'remove':
+				self.unindex(record[1])
+
+		if end < len(data):
+			error_handler.output_message("Cutting a torn record off the end of %s" % self.journal_file)
+			with open(self.journal_file, 'r+b') as file:
+				file.truncate(end)
+
+	def index(self, reminder):
+		self.by_id[reminder.id] = reminder
+		self.by_nick.setdefault(reminder.nick.lower(), set()).add(reminder.id)
+		heapq.heappush(self.deadlines, (reminder.trigger_time, reminder.id))
+		self.next_id = max(self.next_id, reminder.id + 1)
+
+	def unindex(self, id):
+		"""Forgets reminder id; its heap entry is skipped when it comes up."""
+		reminder = self.by_id.pop(id, None)
+		if reminder:
+			ids = self.by_nick[reminder.nick.lower()]
+			ids.discard(id)
+			if not ids:
+				del self.by_nick[reminder.nick.lower()]
+		return reminder
+
+	def append(self, record):
+		cPickle.dump(record, self.journal, 2)
+		self.journal.flush()
+		self.journal_records += 1
+
+	def add(self, nick, trigger_time, message, network=None):
+		with self.lock:
+			reminder = Reminder(nick, trigger_time, message, self.next_id, network)
+			self.index(reminder)
+			self.append(('add', reminder.id, nick, trigger_time, message, network))
+			self.maybe_compact()
+			return reminder
+
+	def remove(self, id):
+		"""Cancels reminder id. Returns it, or None if there's no such one."""
+		with self.lock:
+			reminder = self.unindex(id)
+			if reminder:
+				self.append(('remove', id))
+				self.maybe_compact()
+			return reminder
+
+	def for_nick(self, nick, network=None):
+		"""The nick's reminders, earliest first; only those on network (or
+		none) if it's given."""
+		with self.lock:
+			reminders = [self.by_id[id] for id in self.by_nick.get(nick.lower(), ())]
+		if network is not None:
+			reminders = [reminder for reminder in reminders if reminder.network in (None, network)]
+		reminders.sort(key=lambda reminder: reminder.trigger_time)
+		return reminders
+
+	def pop_due(self, now):
+		"""Takes out and returns the reminders due by now, earliest first."""
+		due = []
+		with self.lock:
+			while self.deadlines and self.deadlines[0][0] <= now:
+				trigger_time, id = heapq.heappop(self.deadlines)
+				reminder = self.unindex(id)
+				if reminder:
+					self.append(('remove', id))
+					due.append(reminder)
+
+			if due:
+				self.maybe_compact()
+		return due
+
+	def maybe_compact(self):
+		if self.journal_records > self.compact_after and self.journal_records > len(self.by_id):
+			self.compact()
+
+	def compact(self):
+		"""Writes every reminder to a new snapshot and empties the journal."""
+		reminders = sorted(self.by_id.values(), key=lambda reminder: reminder.id)
+		temporary = os.path.join('data', self.name + '.txt.new')
+		with open(temporary, 'wb') as file:
+			cPickle.dump(reminders, file, 2)
+		os.rename(temporary, os.path.join('data', self.name + '.txt'))
+
+		# A crash before this just leaves records the snapshot already has.
+		if self.journal:
+			self.journal.close()
+		self.journal = open(self.journal_file, 'wb')
+		self.journal_records = 0
+
+		# Drop the heap entries of reminders that are gone.
+		self.deadlines = [(reminder.trigger_time, reminder.id) for reminder in reminders]
+		heapq.heapify(self.deadlines)
+
+	def close(self):
+		with self.lock:
+			if self.journal:
+				self.journal.close()
+				self.journal = None
 
 class ReminderCommand(Command):
 
-	reminders = []
+	# Only the earliest reminder is looked at, so this is cheap.
+	beat_interval = 1
 
 	def __init__(self):
-		self.next_beat = None
+		self.store = ReminderStore("reminders")
 
 	def trig_reminder(self, bot, source, target, trigger, argument):
 		m = re.search('(\d\d?):(\d\d) (.+)', argument)
@@ -35,9 +212,7 @@ class ReminderCommand(Command):
 			if trigger_time < now:
 				trigger_time += datetime.timedelta(1)
 			
-			self.reminders.append(Reminder(source, trigger_time, message))
-
-			self.save()
+			self.store.add(source, trigger_time, message, bot.network)
 
 			until_then = trigger_time - now
 
@@ -46,10 +221,7 @@ class ReminderCommand(Command):
 			return "Usage: reminder <hour>:<minute> <message>."
 
 	def trig_reminders(self, bot, source, target, trigger, argument):
-		reminders = []
-		for reminder in self.reminders:
-			if reminder.nick == source:
-				reminders.append(reminder)
+		reminders = self.store.for_nick(source, bot.network)
 
 		if reminders:
 			reminders = map(lambda r: "%s:%s %s" % (r.trigger_time.hour, r.trigger_time        .minute, r.message), reminders)
@@ -58,27 +230,11 @@ class ReminderCommand(Command):
 			return "You have no reminders."
 
 	def timer_beat(self, bot, now):
-		if not self.next_beat or self.next_beat < now:
-			self.next_beat = now + datetime.timedelta(0, 0, 0, 0, 1)
-
-			to_remove = []
-
-			for reminder in self.reminders:
-				if reminder.trigger_time <= now:
-					bot.tell(reminder.nick, "Beep beep! %s" % reminder.message)
-					to_remove.append(reminder)
-
-			if to_remove:
-				for reminder in to_remove:
-					self.reminders.remove(reminder)
-
-				self.save()
-
-	def save(self):
-		utility.save_data("reminders", self.reminders)
+		for reminder in self.store.pop_due(now):
+			bot.tell_on(reminder.network, reminder.nick, "Beep beep! %s" % reminder.message)
 
 	def on_load(self):
-		self.reminders = utility.load_data("reminders", [])
+		self.store.load()
 	
 	def on_unload(self):
-		self.reminders = []
+		self.store.close()
@@ -7,6 +7,8 @@ from commands import Command
 from xml.dom import minidom
 import utility
 import time
+import deadline
+import background_jobs
 
 class RssReader:
 	def parse(self, data):
@@ -56,8 +58,13 @@ class RssReader:
 class RssCommand(Command):
 	subscribers = {}
 
+	# Fetching every feed may take a while.
+	beat_interval = 2 * 60
+	beat_jitter = 10
+	beat_max_runtime = 100
+	beat_in_background = True
+
 	def __init__(self):
-		self.next_beat = None
 		self.reader = RssReader()
 
 		self.watch_list = [['serp', 'http://www.starkast.net/index.rss', None], ['serp', 'http://rss.thepiratebay.org/0', None]]
@@ -90,7 +97,7 @@ class RssCommand(Command):
 		if m:
 			url = m.group(1)
 
-			self.watch_list.append([source, url, datetime.datetime(datetime.MINYEAR, 1, 1)])
+			self.watch_list.append([source, url, datetime.datetime(datetime.MINYEAR, 1, 1), bot.network])
 			self.save()
 
 			return 'The feed was successfully added to your watch list. You will receive news privately.'
@@ -120,44 +127,50 @@ class RssCommand(Command):
 			return 'Usage delwatch <rss feed>.'
 
 	def timer_beat(self, bot, now):
-		if not self.next_beat or self.next_beat < now:
-			self.next_beat = now + datetime.timedelta(0, 0, 0, 0, 2)
+		save_needed = False
 
-			save_needed = False
+		for i, t in enumerate(self.watch_list):
+			nick, url, newest = t[0:3]
+			# Feeds watched before there were several networks have none.
+			network = None
+			if len(t) > 3:
+				network = t[3]
 
-			for t in self.watch_list:
-				nick, url, newest = t
-				
-				try:
-					response = utility.timeout(utility.read_url, 10, [url])
-					if not response:
-						continue
+			# Out of time or cancelled (see .jobs): what's done is saved.
+			if deadline.current().expired():
+				break
+			background_jobs.progress("%d/%d feeds" % (i, len(self.watch_list)))
 
-					data = response["data"]
+			try:
+				response = utility.timeout(utility.read_url, 10, [url])
+				if not response:
+					continue
 
-					self.reader.parse(data)
+				data = response["data"]
 
-					articles = self.reader.get_articles()
+				self.reader.parse(data)
 
-					if articles:
-						articles = sorted(filter(lambda x: not newest or x[0] > newest, articles))
-
-						if articles:
-							articles.reverse()
-							if not newest or articles[0][0] > newest:
-								t[2] = newest = articles[0][0]
-								save_needed = True
-
-							bot.tell(nick, 'New: ' + ' | '.join(map(lambda x: "%s - %s" % (x[1], x[2]), articles[0:3])))
-					#else:
-					#	bot.tell(nick, 'I couldn\'t find any articles there. :-(')
-				except utility.TimeoutException:
-					pass
-				except:
-					raise
+				articles = self.reader.get_articles()
 
-			if save_needed:
-				self.save()
+				if articles:
+					articles = sorted(filter(lambda x: not newest or x[0] > newest, articles))
+
+					if articles:
+						articles.reverse()
+						if not newest or articles[0][0] > newest:
+							t[2] = newest = articles[0][0]
+							save_needed = True
+
+						bot.tell_on(network, nick, 'New: ' + ' | '.join(map(lambda x: "%s - %s" % (x[1], x[2]), articles[0:3])))
+				#else:
+				#	bot.tell(nick, 'I couldn\'t find any articles there. :-(')
+			except utility.TimeoutException:
+				pass
+			except:
+				raise
+
+		if save_needed:
+			self.save()
 
 	def save(self):
 		utility.save_data("rss_watch_list", self.watch_list)
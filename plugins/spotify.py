@@ -20,6 +20,7 @@ class SpotifyRef(object):
 
 class SpotifyCommand(Command):
 	hooks = ['on_privmsg']
+	privmsg_patterns = [r'open\.spotify\.com/', r'spotify:']
 	references = {}
 	api_base_url = u"http://78.31.8.28/" # http://ws.spotiy.com/ is official but seems unstable
 
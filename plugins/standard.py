@@ -1,5 +1,6 @@
-# coding: utf-8
+# coding: latin-1
 
+import commands
 from commands import Command
 import htmlentitydefs
 import string
@@ -93,51 +94,29 @@ class WeekCommand(Command):
 		import datetime
 		return "Current week: %d." % (int(datetime.datetime.now().strftime("%V")))
 
-def is_trigger(name):
-	m = re.search('^trig_.+', name)
-	if m:
-		return True
-	else:
-		return False
-
-def remove_first_five(text):
-	return text[5:]
-
 class CommandsCommand(Command):
 	def trig_commands(self, bot, source, target, trigger, argument):
-		triggers = []
-		for command in Command.__subclasses__():
-			for trigger in command.triggers:
-				if trigger not in triggers:
-					triggers.append(trigger)
-
-			l = command.__dict__
-			l = filter(is_trigger, l)
-			l = map(remove_first_five, l)
-
-			for trigger in l:
-				if trigger not in triggers:
-					triggers.append(trigger)
-		
-		return "Commands: %s" % ", ".join(sorted(triggers))
+		return "Commands: %s" % ", ".join(commands.sorted_triggers)
 
 class HelpCommand(Command):
 	def trig_help(self, bot, source, target, trigger, argument):
 		"""Help command. Use it to get information about other commands."""
-		trigger_found = False
-		for command in Command.__subclasses__():
-			fname = "trig_" + argument
-			if fname in command.__dict__:
-				trigger_found = True
-				f = command.__dict__[fname]
-				if f.__doc__:
-					return "%s: %s" % (argument, f.__doc__)
-		
-		if trigger_found:
-			return "I can offer nothing."
-		else:
+		handlers = commands.find_trigger(argument)
+		if not handlers:
 			return "That's not a command! Try `help <command>`"
 
+		for command, handler in handlers:
+			if handler.__doc__:
+				return "%s: %s" % (argument, handler.__doc__)
+
+		return "I can offer nothing."
+
+class MoreCommand(Command):
+	def trig_more(self, bot, source, target, trigger, argument):
+		"""Shows the rest of a reply that was too long."""
+		if not bot.more(target, source):
+			return "There is nothing more."
+
 #	def can_trigger(self, source, trigger):
 #		return source in ['serp!~serp@85.8.2.181.se.wasadata.net']
 
@@ -259,6 +238,8 @@ class GoogleCommand(Command):
 			return url
 
 class WikipediaCommand(Command):
+	cache_seconds = 60 * 60
+
 	def wp_get(self, language, item):
 		url = "http://%s.wikipedia.org/wiki/%s" % (language, utility.escape(item.replace(" ", "_")))
 
@@ -0,0 +1,38 @@
+# coding: utf-8
+
+import os
+from commands import Command
+import instrumentation
+import utility
+
+def describe(summary):
+	text = "%s %s: %d calls" % (summary["kind"], summary["name"], summary["calls"])
+	if summary["errors"]:
+		text += ", %d errors" % summary["errors"]
+	if summary["samples"]:
+		text += ", p50/p95/p99 %s/%s/%s ms" % (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"])
+	return text
+
+class StatsCommand(Command):
+	def trig_stats(self, bot, source, target, trigger, argument):
+		"""Usage: .stats [hook|command|http|<name>|dump] Call counts, errors and latencies, slowest first."""
+		if not utility.has_admin_privileges(source, target):
+			return
+
+		argument = argument.strip()
+		if argument == "dump":
+			path = os.path.join('data', 'stats.json')
+			instrumentation.dump(path)
+			return "Wrote %s." % path
+
+		if argument in ["hook", "command", "http"]:
+			summaries = instrumentation.snapshot(argument)
+		else:
+			summaries = [summary for summary in instrumentation.snapshot()
+				if argument.lower() in summary["name"].lower()]
+
+		if not summaries:
+			return "Nothing recorded."
+
+		summaries.sort(key=lambda summary: -(summary["p95_ms"] or 0))
+		return "\n".join([describe(summary) for summary in summaries])
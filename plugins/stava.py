@@ -3,6 +3,7 @@
 __author__ = 'Simon Pantzare'
 
 from commands import Command
+import sandbox
 
 import popen2
 from string import punctuation
@@ -78,9 +79,22 @@ class Speller(object):
         return normalize(perfect_sentence)
 
 
+# Started on first use, in every sandbox process that gets a word to spell.
+speller = None
+
+def spell(sentence):
+    global speller
+    if speller is None:
+        speller = Speller(lang='sv')
+
+    if len(sentence.split()) == 1:
+        return speller.spell(sentence)
+    else:
+        return speller.make_perfect(sentence)
+
+
 class stava(Command):
     def __init__(self):
-        self.speller = Speller(lang='sv')
         self.matcher = SequenceMatcher()
 
     def trig_stava(self, bot, source, target, trigger, argument):
@@ -88,14 +102,13 @@ class stava(Command):
         if len(sentence) == 0:
             return "Ge mig en mening eller ett ord som jag ska stava!"
 
-        if len(sentence.split()) == 1:
-            perfect = self.speller.spell(sentence)
-        else:
-            perfect = self.speller.make_perfect(sentence)
+        try:
+            perfect = sandbox.run(bot, __name__, 'spell', (sentence,))
+        except sandbox.SandboxError:
+            return "Stavningen misslyckades."
 
         self.matcher.set_seqs(sentence, perfect)
         sim = self.matcher.ratio()
         if sim == 1.0:
             return "Korrekt!"
         return "%i%% rätt, du menade: %s" % (sim * 100.0, perfect)
-
@@ -3,6 +3,7 @@
 import subprocess
 import re
 import datetime
+import deadline
 from commands import Command
 
 class SvnCommand(Command):
@@ -34,10 +35,11 @@ class SvnCommand(Command):
 				stderr=subprocess.PIPE,
 				close_fds=True,
 				env={"LANGUAGE": "en_US:en"})
+		output, error = deadline.communicate(p, 30)
 	
 		m = re.search(
 				"Last Changed Author:\s+(.+)\nLast Changed Rev:\s+(.+)\nLast Changed Date:\s+(.+)",
-				 p.stdout.read())
+				 output)
 		
 		if m:
 			# Seems like we have parseable data
@@ -52,7 +54,6 @@ class SvnCommand(Command):
 				return result
 	
 		# Hrm, no result found, let's try to find out why
-		error = p.stderr.read()
 		if re.search('Connection refused', error) or \
 				re.search('could not connect to server', error) or \
 				re.search('Host not found', error):
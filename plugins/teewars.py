@@ -15,12 +15,17 @@ import sys
 import traceback
 
 import error_handler
+import deadline
+import background_jobs
 
 list_lock = thread.allocate_lock()
 
-def tw_get_num_players(address, port):
+def tw_get_num_players(address, port, timeout=None):
+	if timeout is None:
+		timeout = deadline.current().timeout(5.0)
+
 	sock = socket(AF_INET, SOCK_DGRAM) 
-	sock.settimeout(5.0); 
+	sock.settimeout(timeout)
 	sock.sendto("\xff\xff\xff\xff\xff\xff\xff\xff\xff\xffgief", (address, port)) 
 	data, addr = sock.recvfrom(1024) 
 	sock.close() 
@@ -35,9 +40,9 @@ def tw_get_num_players(address, port):
 
 	return num_players, max_players
 
-def tw_get_num_players_proxy(address, port, players_dic):
+def tw_get_num_players_proxy(address, port, players_dic, timeout):
 	try:
-		num_players, max_players = tw_get_num_players(address, port)
+		num_players, max_players = tw_get_num_players(address, port, timeout)
 
 		with list_lock:
 			players_dic[thread.get_ident()] = num_players
@@ -52,7 +57,7 @@ def tw_get_info():
 	master_port = 8300
  
 	sock = socket(AF_INET, SOCK_DGRAM) 
-	sock.settimeout(5.0) 
+	sock.settimeout(deadline.current().timeout(5.0))
 	sock.sendto("\x20\x00\x00\x00\x00\x00\xff\xff\xff\xffreqt", (address, master_port)) 
  
 	try:
@@ -64,6 +69,9 @@ def tw_get_info():
 
 		players_dic = {}
 
+		# The threads asking the servers don't have our deadline.
+		timeout = deadline.current().timeout(5.0)
+
 		for n in range(0, num_servers): 
 			ip = ".".join(map(str, map(ord, data[n*6:n*6+4]))) 
 			port = ord(data[n*6+5]) * 256 + ord(data[n*6+4]) 
@@ -71,18 +79,15 @@ def tw_get_info():
 			#print ip, port
 
 			with list_lock:
-				id = thread.start_new_thread(tw_get_num_players_proxy, (ip, port, players_dic))
+				id = thread.start_new_thread(tw_get_num_players_proxy, (ip, port, players_dic, timeout))
 				players_dic[id] = -2
 
 		while True:
-			has_items = False
 			with list_lock:
-				for slot in players_dic.keys():
-					if players_dic[slot] == -2:
-						has_items = True
-						break
+				pending = players_dic.values().count(-2)
+			background_jobs.progress("%d/%d servers" % (num_servers - pending, num_servers))
 
-			if has_items:
+			if pending:
 				time.sleep(0.5)
 			else:
 				break
@@ -106,8 +111,12 @@ def tw_get_info():
 		return None
 
 class TeewarsCommand(Command):
+	beat_interval = 2 * 60
+	beat_jitter = 10
+	beat_max_runtime = 60
+	beat_in_background = True
+
 	def __init__(self):
-		self.next_beat = None
 		self.cached_info = None
 	
 	def trig_twinfo(self, bot, source, target, trigger, argument):
@@ -134,8 +143,6 @@ class TeewarsCommand(Command):
 		#return "Server '%s' at %s:%s is playing %s with %s/%s players." % (server_name, address, port, map_name, num_players, max_players)
 
 	def timer_beat(self, bot, now):
-		if not self.next_beat or self.next_beat < now:
-			self.next_beat = now + datetime.timedelta(0, 0, 0, 0, 2)
-			info = tw_get_info()
-			if info:
-				self.cached_info = info
+		info = tw_get_info()
+		if info:
+			self.cached_info = info
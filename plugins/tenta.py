@@ -3,7 +3,10 @@
 __author__ = 'Simon Pantzare'
 
 from commands import Command
-from urllib import urlencode, urlopen
+import sandbox
+import utility
+import result_cache
+from urllib import urlencode
 from datetime import datetime
 import sgmllib, string
 
@@ -94,56 +97,64 @@ class TentaSearch(object):
         return base_url + urlencode(args)
     
 
+    def get_lines(self):
+        return utility.read_url(self.get_url())["data"].splitlines(True)
+
+
     def get_data(self):
-        handle = urlopen(self.get_url())
-        lines = handle.readlines()
-        start = stop = -1
-
-        def strip(str):
-            return strip_tags(str, ('td',)) .replace('&nbsp;', '').strip()
-
-        parse_lines = [strip(line) for line in lines if len(strip(line))]
-
-        for i, l in zip(range(len(parse_lines)), parse_lines):
-            if start != -1 and stop != -1:
-                break
-            if l == '<td width="*" valign="top">\n</td>':
-                start = i + 2
-            elif l == '<td>Kurskod</td>\t<td></td>':
-                stop = i - 1
-        
-        if start < 0 or stop < 0:
+        return parse_lines(self.get_lines())
+
+
+def parse_lines(lines):
+    start = stop = -1
+
+    def strip(str):
+        return strip_tags(str, ('td',)) .replace('&nbsp;', '').strip()
+
+    stripped = [strip(line) for line in lines if len(strip(line))]
+
+    for i, l in zip(range(len(stripped)), stripped):
+        if start != -1 and stop != -1:
+            break
+        if l == '<td width="*" valign="top">\n</td>':
+            start = i + 2
+        elif l == '<td>Kurskod</td>\t<td></td>':
+            stop = i - 1
+    
+    if start < 0 or stop < 0:
+        raise TentaSearchParseError()
+    for i in (start, stop):
+        try:
+            stripped[i]
+        except IndexError:
             raise TentaSearchParseError()
-        for i in (start, stop):
-            try:
-                parse_lines[i]
-            except IndexError:
-                raise TentaSearchParseError()
-        
-        def despace(str, char=' '):
-            str = str.replace(char * 2, char)
-            if str.find(char * 2) != -1:
-                str = despace(str, char)
-            return str
-
-        parsed_data = []
-        for line in parse_lines[start:stop]:
-            line = line.replace('>', '>\t')
-            line = strip_tags(line)
-            for ch in [' ', '\t']:
-                line = despace(line, ch)
-            line = line.decode('latin1')
-
-            parts = [p.strip() for p in line.split('\t') if len(p.strip())]
-            def get_date(str):
-                return datetime.strptime(str, '%Y&#45;%m&#45;%d%H')
-            dates = [get_date(parts[2] + parts[i]) for i in (3, 5)]
-            parts = parts[0:2] + dates + parts[6:]
-            parsed_data.append(tuple(parts))
-        return parsed_data
+    
+    def despace(str, char=' '):
+        str = str.replace(char * 2, char)
+        if str.find(char * 2) != -1:
+            str = despace(str, char)
+        return str
+
+    parsed_data = []
+    for line in stripped[start:stop]:
+        line = line.replace('>', '>\t')
+        line = strip_tags(line)
+        for ch in [' ', '\t']:
+            line = despace(line, ch)
+        line = line.decode('latin1')
+
+        parts = [p.strip() for p in line.split('\t') if len(p.strip())]
+        def get_date(str):
+            return datetime.strptime(str, '%Y&#45;%m&#45;%d%H')
+        dates = [get_date(parts[2] + parts[i]) for i in (3, 5)]
+        parts = parts[0:2] + dates + parts[6:]
+        parsed_data.append(tuple(parts))
+    return parsed_data
 
 
 class tenta(Command):
+    cache_seconds = 60 * 60
+
     def __init__(self):
         pass
 
@@ -153,8 +164,11 @@ class tenta(Command):
             return "Usage: .tenta <course>"
         
         try:
-            tenta_data = TentaSearch(course).get_data()
+            lines = TentaSearch(course).get_lines()
+            tenta_data = sandbox.run(bot, __name__, 'parse_lines', (lines,))
         except:
+            # Likely to work next time; don't answer with this for an hour.
+            result_cache.dont_cache()
             return 'Error retrieving data.'
 
         if len(tenta_data):
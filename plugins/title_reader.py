@@ -52,6 +52,7 @@ def get_title(url):
 
 class TitleReaderPlugin(Command):
 	hooks = ['on_privmsg']
+	privmsg_patterns = [r'https?://', r'www\.']
 	last_urls = {}
 	url_lists = {}
 	url_masks = {}
@@ -189,6 +190,15 @@ class TitleReaderPlugin(Command):
 		self.mask_load()
 
 
+	def handoff(self):
+		# last_urls isn't saved anywhere.
+		return self.last_urls, self.url_lists, self.url_masks
+
+
+	def on_reload(self, state):
+		self.last_urls, self.url_lists, self.url_masks = state
+
+
 	def save(self):
 		pass
 
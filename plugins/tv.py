@@ -5,6 +5,9 @@ import re
 import utility
 
 class TVCommand(Command):
+	# What's on now changes every few minutes.
+	cache_seconds = 60
+
 	def extract_channel_info(self, contents, channel_name):
 		m = re.search('(<div class="kanalRubrik">' + channel_name + '.*?<\/div><\/div>)', contents)
 		if m:
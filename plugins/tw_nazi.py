@@ -10,6 +10,7 @@ import traceback
 
 class TeewarsNaziPlugin(Plugin): 
 	hooks = ['on_privmsg']   
+	privmsg_patterns = ['[\xe5\xe4\xf6\xc5\xc4\xd6]']
 
 	def __init__(self):
 		pass
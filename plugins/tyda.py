@@ -56,6 +56,7 @@ def tyda_lookup(word, lang):
 	return base_word + inflected_words + ": " + ", ".join(translated_words) + " | " + url
 	
 class TydaCommand(Command):
+	cache_seconds = 24 * 60 * 60
 	usage = "Usage: .tyda <word>[, <source language, en or sv>]"
 	
 	def trig_tyda(self, bot, source, target, trigger, argument):
@@ -7,13 +7,14 @@ from plugins import Plugin
 import htmlentitydefs
 import re
 import os
-import signal
 import string
 import settings
 import error_handler
+import deadline
+import instrumentation
+import result_cache
 
-class TimeoutException(Exception):
-	pass
+TimeoutException = deadline.DeadlineExceeded
 
 def unescape(string):
 	"""Replaces all HTML entities and numeric references with the referenced characters.
@@ -86,44 +87,33 @@ def get_all_subclasses(c):
 	return l
 
 def timeout(f, timeout = 1, args = (), kwargs = {}):
-	def handler(signum, frame):
-		raise TimeoutException
-    
-	old = signal.signal(signal.SIGALRM, handler)
-	signal.alarm(timeout)
-
-	result = None
-	try:
+	"""Runs f under a deadline timeout seconds away, which read_url and the
+	like keep to. Raises TimeoutException if it has passed when f returns."""
+	with deadline.within(timeout) as limit:
 		result = f(*args, **kwargs)
-	except:
-		signal.alarm(0)
-		raise
-	finally:
-		signal.signal(signal.SIGALRM, old)
-	signal.alarm(0)
+	limit.check()
 	return result
 
 def extract_nick(host):
-	m = re.search('^(.+)!', host)
-	if m:
-		return m.group(1)
-	else:
-		return host
+	return host.split('!', 1)[0]
 
-def read_url(url):
+def read_url(url, headers=None):
 	import httpget
-	import socket
-	
-	# THIS AFFECTS SOCKETS GLOBALLY AND SHOULD _NOT_ BE USED!!!
-	timeout_time = socket.getdefaulttimeout()
-	socket.setdefaulttimeout(15)
-
-	data = httpget.read_url(url)
-		
-	# THIS AFFECTS SOCKETS GLOBALLY AND SHOULD _NOT_ BE USED!!!
-	socket.setdefaulttimeout(timeout_time)
+	import urlparse
 
-	return data
+	record = instrumentation.record('http', urlparse.urlparse(url).hostname or url)
+	started = record.start()
+	try:
+		# Fifteen seconds per socket operation, or what's left of the deadline.
+		result = httpget.read_url(url, deadline.current().timeout(15), headers)
+	except:
+		record.finish(started, True)
+		result_cache.dont_cache()
+		raise
+	record.finish(started, result is None)
+	if result is None:
+		result_cache.dont_cache()
+	return result
 
 def save_data(name, data):
 	handle = open(os.path.join('data', name + '.txt'), 'w')
@@ -4,7 +4,7 @@ import utility
 import string
 import os
 import pickle
-import urllib2
+import urllib
 from datetime import datetime
 from commands import Command
 
@@ -20,10 +20,6 @@ class YrNo(Command):
 
         argument = self.iso2utf8(argument)
 
-        # Ugly hack FIXME
-        import signal
-        signal.alarm(20)                
-
         if not argument:
             if source in self.places:
                 argument = self.places[source]
@@ -38,45 +34,47 @@ class YrNo(Command):
         self.save()
 
         # Search for town
-        url = "http://www.yr.no/soek.aspx?sted=" + urllib2.quote(args[0])
+        url = "http://www.yr.no/soek.aspx?sted=" + urllib.quote(args[0])
         print "contacting", url
-        request = urllib2.Request(url)
-        request.add_header("Cookie", "brp=spr=eng")
-        response = urllib2.urlopen(request)
+        response = utility.read_url(url, { "Cookie": "brp=spr=eng" })
+        if not response:
+            return "Could not reach yr.no."
 
-        #print response.geturl()
+        #print response["url"]
 
-        if response.geturl().find("http://www.yr.no/soek.aspx?sted=") != -1:
-            search = re.search('<a href="(/place/[^"]*)" title="[^"]*">', response.read())
+        if response["url"].find("http://www.yr.no/soek.aspx?sted=") != -1:
+            search = re.search('<a href="(/place/[^"]*)" title="[^"]*">', response["data"])
             if search:
-                url = "http://gammel.yr.no" + urllib2.quote(search.group(1))
+                url = "http://gammel.yr.no" + urllib.quote(search.group(1))
                 print "contacting", url
                 #print url
-                request = urllib2.Request(url)
-                request.add_header("Cookie", "brp=spr=eng")
-                response = urllib2.urlopen(request)
+                response = utility.read_url(url, { "Cookie": "brp=spr=eng" })
+                if not response:
+                    return "Could not reach yr.no."
 
-                #print response.geturl()
+                #print response["url"]
             else:
                 return "Could not find any such place. Maybe you should move?"
         
         # Parse overview page
-        stedbaseurl = response.geturl()
+        stedbaseurl = response["url"]
         
         # Get Hour by Hour view
         url = stedbaseurl + "hour_by_hour.html"
         print "contacting", url
-        response = urllib2.urlopen(url)
+        response = utility.read_url(url)
+        if not response:
+            return "Could not reach yr.no."
 
         #print stedbaseurl
 
         search = re.search('\/([^\/]*)\/$', stedbaseurl)
         if search:
-            town = urllib2.unquote(search.group(1))
+            town = urllib.unquote(search.group(1))
         else:
             town = "unknown"
      
-        data = response.read()
+        data = response["data"]
         ofset = 0
         hbh = {}
         lhbh = []
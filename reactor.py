@@ -0,0 +1,225 @@
+import os
+import sys
+import thread
+import threading
+import select
+import errno
+import datetime
+import traceback
+from collections import deque
+
+import error_handler
+import clock
+from timer_wheel import Timer, TimerWheel
+
+class Reactor:
+	"""Readiness-driven event loop.
+
+	Owns every socket the bot listens on and the timers, and sleeps in epoll
+	(or poll where epoll is missing) until either a socket is ready or the
+	next timer is due. Timers go by clock.monotonic(), in a TimerWheel."""
+
+	def __init__(self):
+		if hasattr(select, 'epoll'):
+			self.poller = select.epoll()
+			self.event_in = select.EPOLLIN
+			self.event_out = select.EPOLLOUT
+			self.event_err = select.EPOLLERR | select.EPOLLHUP
+			self.poll_scale = 1.0
+		else:
+			self.poller = select.poll()
+			self.event_in = select.POLLIN
+			self.event_out = select.POLLOUT
+			self.event_err = select.POLLERR | select.POLLHUP | select.POLLNVAL
+			self.poll_scale = 1000.0
+
+		self.handlers = {}
+		self.timers = TimerWheel()
+		self.running = False
+		self.thread = None
+
+		# Other threads hand work to the loop through pending_calls and wake
+		# it up by writing a byte to the pipe.
+		self.pending_calls = deque()
+		self.wakeup_read, self.wakeup_write = os.pipe()
+		for fd in [self.wakeup_read, self.wakeup_write]:
+			set_nonblocking(fd)
+		self.handlers[self.wakeup_read] = [None, self.drain_wakeup, None]
+		self.poller.register(self.wakeup_read, self.event_in)
+
+	def register(self, fileobj, on_readable, on_writable=None):
+		fd = fileobj.fileno()
+		self.handlers[fd] = [fileobj, on_readable, on_writable]
+		self.poller.register(fd, self.event_mask(fd))
+
+	def unregister(self, fileobj):
+		fd = fileobj.fileno()
+		if fd in self.handlers:
+			del self.handlers[fd]
+			self.poller.unregister(fd)
+
+	def set_writable_callback(self, fileobj, on_writable):
+		"""Starts (or with None, stops) watching fileobj for writability."""
+		fd = fileobj.fileno()
+		if fd in self.handlers and self.handlers[fd][2] != on_writable:
+			self.handlers[fd][2] = on_writable
+			self.poller.modify(fd, self.event_mask(fd))
+
+	def event_mask(self, fd):
+		mask = self.event_in | self.event_err
+		if self.handlers[fd][2]:
+			mask |= self.event_out
+		return mask
+
+	def in_loop_thread(self):
+		"""True when called from the thread running the loop (or before the
+		loop has run at all)."""
+		return self.thread is None or self.thread == thread.get_ident()
+
+	def add_timer(self, delta, recurring, target, *args):
+		"""Calls target(*args) in delta (a timedelta or seconds), and every
+		delta after that if recurring. Returns the Timer, whose cancel() may
+		be called from any thread."""
+		if isinstance(delta, datetime.timedelta):
+			delta = delta.total_seconds()
+
+		interval = None
+		if recurring:
+			interval = delta
+
+		timer = Timer(clock.monotonic() + delta, interval, target, args)
+		timer.on_cancel = self.cancel_timer
+		if self.in_loop_thread():
+			self.start_timer(timer)
+		else:
+			self.call_from_thread(self.start_timer, timer)
+		return timer
+
+	def call_later(self, seconds, target, *args):
+		return self.add_timer(seconds, False, target, *args)
+
+	def start_timer(self, timer):
+		if not timer.cancelled:
+			self.timers.add(timer)
+
+	def cancel_timer(self, timer):
+		if self.in_loop_thread():
+			self.timers.cancel(timer)
+		else:
+			self.call_from_thread(self.timers.cancel, timer)
+
+	def call_from_thread(self, target, *args):
+		"""Runs target(*args) on the loop thread. Safe to call from any thread."""
+		self.pending_calls.append((target, args))
+		try:
+			os.write(self.wakeup_write, 'x')
+		except OSError, e:
+			if e.errno != errno.EAGAIN:
+				raise
+
+	def call_and_wait(self, target, *args):
+		"""Runs target(*args) on the loop thread and returns what it returns
+		(or raises what it raises), blocking the calling thread until then."""
+		if self.in_loop_thread():
+			return target(*args)
+
+		done = threading.Event()
+		outcome = []
+
+		def call():
+			try:
+				outcome.append((target(*args), None))
+			except:
+				outcome.append((None, sys.exc_info()))
+			done.set()
+
+		self.call_from_thread(call)
+		done.wait()
+
+		result, error = outcome[0]
+		if error:
+			raise error[0], error[1], error[2]
+		return result
+
+	def drain_wakeup(self):
+		try:
+			while os.read(self.wakeup_read, 4096):
+				pass
+		except OSError, e:
+			if e.errno != errno.EAGAIN:
+				raise
+
+	def next_timeout(self):
+		if self.pending_calls:
+			return 0
+
+		due = self.timers.next_due()
+		if due is None:
+			return None
+		return max(0, due - clock.monotonic())
+
+	def run_timers(self):
+		timers = self.timers.advance()
+		timers.sort(key=lambda timer: timer.due)
+
+		for timer in timers:
+			# Cancelled from another thread, and not yet taken out.
+			if timer.cancelled:
+				continue
+			if timer.interval is not None:
+				timer.due += timer.interval
+				self.timers.add(timer)
+			self.invoke(timer.trigger)
+
+	def run_pending_calls(self):
+		while self.pending_calls:
+			target, args = self.pending_calls.popleft()
+			self.invoke(target, *args)
+
+	def invoke(self, target, *args):
+		try:
+			target(*args)
+		except:
+			error_handler.output_message("reactor: " + str(target) + " " + str(sys.exc_info()) + " " + str(traceback.extract_tb(sys.exc_info()[2])))
+
+	def poll(self, timeout):
+		if timeout is None:
+			timeout = -1
+		else:
+			timeout *= self.poll_scale
+
+		while True:
+			try:
+				return self.poller.poll(timeout)
+			except (IOError, select.error), e:
+				if e.args[0] != errno.EINTR:
+					raise
+
+	def run_once(self, timeout=None):
+		self.thread = thread.get_ident()
+
+		next_timeout = self.next_timeout()
+		if timeout is None or (next_timeout is not None and next_timeout < timeout):
+			timeout = next_timeout
+
+		for fd, events in self.poll(timeout):
+			if events & (self.event_in | self.event_err) and fd in self.handlers:
+				self.invoke(self.handlers[fd][1])
+			if events & self.event_out and fd in self.handlers and self.handlers[fd][2]:
+				self.invoke(self.handlers[fd][2])
+
+		self.run_pending_calls()
+		self.run_timers()
+
+	def run(self):
+		self.running = True
+		while self.running:
+			self.run_once()
+
+	def stop(self):
+		self.running = False
+
+def set_nonblocking(fd):
+	import fcntl
+	flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+	fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
@@ -0,0 +1,131 @@
+import time
+import threading
+from collections import OrderedDict
+
+import settings
+
+local = threading.local()
+
+def dont_cache():
+	"""Keeps whatever the calling thread is computing for the cache out of
+	it, e.g. because a fetch failed and the result is an apology."""
+	local.dont_cache = True
+
+def key(trigger, argument):
+	"""The cache key of a command: the trigger and argument, lowercased and
+	with whitespace collapsed."""
+	return (trigger.lower(), " ".join(argument.lower().split()))
+
+class Entry:
+	def __init__(self, value, fresh_until, stale_until):
+		self.value = value
+		self.fresh_until = fresh_until
+		self.stale_until = stale_until
+		self.refreshing = False
+
+class ResultCache:
+	"""Command results by key, least recently used dropped first once there
+	are more than size of them.
+
+	An entry is fresh for its ttl, then stale for another stale seconds:
+	a stale entry is still answered with, while a fresh value is computed
+	in the background. Past that it's computed again while the caller
+	waits."""
+
+	def __init__(self, size):
+		self.size = size
+		self.lock = threading.Lock()
+		self.entries = OrderedDict()
+
+		self.hits = 0
+		self.stale_hits = 0
+		self.misses = 0
+		self.refreshes = 0
+		self.evictions = 0
+
+	def get(self, key, compute, ttl, stale=0, background=None):
+		"""The cached value for key, or compute()'s. Exceptions from
+		compute() propagate and aren't cached. background(function) should
+		run function some time soon on another thread; without it stale
+		entries aren't answered with."""
+		now = time.time()
+		with self.lock:
+			entry = self.entries.pop(key, None)
+			if entry and now >= entry.stale_until:
+				entry = None
+
+			if entry:
+				self.entries[key] = entry
+				if now < entry.fresh_until:
+					self.hits += 1
+					return entry.value
+				if background:
+					self.stale_hits += 1
+					if not entry.refreshing:
+						entry.refreshing = True
+						self.refreshes += 1
+					else:
+						return entry.value
+				else:
+					entry = None
+
+			if not entry:
+				self.misses += 1
+
+		if entry:
+			def refresh():
+				try:
+					self.compute(key, compute, ttl, stale)
+				finally:
+					entry.refreshing = False
+			background(refresh)
+			return entry.value
+
+		return self.compute(key, compute, ttl, stale)
+
+	def compute(self, key, compute, ttl, stale):
+		local.dont_cache = False
+		try:
+			value = compute()
+		finally:
+			dont_cache = local.dont_cache
+			local.dont_cache = False
+
+		if not dont_cache and value is not None:
+			self.put(key, value, ttl, stale)
+		return value
+
+	def put(self, key, value, ttl, stale=0):
+		now = time.time()
+		with self.lock:
+			self.entries.pop(key, None)
+			self.entries[key] = Entry(value, now + ttl, now + ttl + stale)
+			while len(self.entries) > self.size:
+				self.entries.popitem(last=False)
+				self.evictions += 1
+
+	def purge(self, trigger=None):
+		"""Forgets the entries for trigger, or all of them. Returns how many."""
+		with self.lock:
+			if trigger is None:
+				count = len(self.entries)
+				self.entries.clear()
+				return count
+
+			trigger = trigger.lower()
+			purged = [k for k in self.entries if k[0] == trigger]
+			for k in purged:
+				del self.entries[k]
+			return len(purged)
+
+	def stats(self):
+		lookups = self.hits + self.stale_hits + self.misses
+		hit_rate = 0.0
+		if lookups:
+			hit_rate = float(self.hits + self.stale_hits) / lookups
+
+		return { "entries": len(self.entries), "size": self.size, "hits": self.hits,
+			"stale_hits": self.stale_hits, "misses": self.misses, "hit_rate": hit_rate,
+			"refreshes": self.refreshes, "evictions": self.evictions }
+
+cache = ResultCache(settings.result_cache_size)
@@ -0,0 +1,475 @@
+import os
+import sys
+import time
+import errno
+import select
+import signal
+import socket
+import shutil
+import struct
+import tempfile
+import resource
+import threading
+import cPickle
+
+import error_handler
+import deadline
+
+class SandboxError(Exception):
+	pass
+
+class SandboxTimeout(SandboxError):
+	pass
+
+class CPULimitExceeded(Exception):
+	pass
+
+local = threading.local()
+
+# In a sandbox process: the (read, write) pipe to the bot.
+parent_pipe = None
+
+# Every message is a pickled tuple behind its length:
+#   bot -> sandbox: ('run', module, function, args), ('reply', value), ('fail', text)
+#   sandbox -> bot: ('hello', pid), ('done', value), ('error', text), ('call', name, args)
+#   bot -> helper: ('spawn',), ('kill', pid), ('reload', module names)
+#   helper -> bot: the pid of the sandbox it spawned
+header = struct.Struct('!I')
+
+def write_message(fd, message):
+	payload = cPickle.dumps(message, 2)
+	data = header.pack(len(payload)) + payload
+	while data:
+		data = data[os.write(fd, data):]
+
+def read_exactly(fd, count, expires=None):
+	chunks = []
+	while count:
+		if expires is not None:
+			remaining = expires - time.time()
+			if remaining <= 0:
+				raise SandboxTimeout("took too long")
+			try:
+				if not select.select([fd], [], [], remaining)[0]:
+					continue
+			except select.error, e:
+				if e.args[0] == errno.EINTR:
+					continue
+				raise
+
+		chunk = os.read(fd, count)
+		if not chunk:
+			raise EOFError
+		chunks.append(chunk)
+		count -= len(chunk)
+	return ''.join(chunks)
+
+def read_message(fd, expires=None):
+	length, = header.unpack(read_exactly(fd, header.size, expires))
+	return cPickle.loads(read_exactly(fd, length, expires))
+
+def in_sandbox():
+	return parent_pipe is not None
+
+def upcall(name, *args):
+	"""Lets code running in a sandbox ask the bot for something, like
+	running a command: calls the handler the caller of run() gave for
+	name, in the bot process."""
+	if parent_pipe is None:
+		handler = getattr(local, 'upcalls', {}).get(name)
+		if not handler:
+			raise SandboxError("nothing handles %s" % name)
+		return handler(*args)
+
+	write_message(parent_pipe[1], ('call', name, args))
+	kind, value = read_message(parent_pipe[0])
+	if kind == 'fail':
+		raise SandboxError(value)
+	return value
+
+def run(bot, module, function, args=(), upcalls={}):
+	"""Runs function (named by its module's and its own name, as it is
+	looked up again in the sandbox) with args in bot's sandbox. Bots
+	without one, like the offline tester's, run it right away."""
+	sandbox = getattr(bot, 'sandbox', None)
+	if sandbox:
+		return sandbox.call(module, function, args, upcalls)
+
+	local.upcalls = upcalls
+	try:
+		return getattr(sys.modules[module], function)(*args)
+	finally:
+		local.upcalls = {}
+
+def virtual_memory():
+	"""Bytes of address space this process uses, or 0 if unknown."""
+	try:
+		with open('/proc/self/statm') as handle:
+			return int(handle.read().split()[0]) * resource.getpagesize()
+	except (IOError, ValueError):
+		return 0
+
+def close_other_files(keep):
+	"""Closes every file descriptor but stdin/out/err and keep, so a sandbox
+	doesn't hold the bot's sockets open."""
+	try:
+		fds = [int(fd) for fd in os.listdir('/proc/self/fd')]
+	except OSError:
+		fds = range(3, os.sysconf('SC_OPEN_MAX'))
+
+	for fd in fds:
+		if fd > 2 and fd not in keep:
+			try:
+				os.close(fd)
+			except OSError:
+				pass
+
+def on_cpu_limit(signum, frame):
+	raise CPULimitExceeded()
+
+def serve(read_fd, write_fd, cpu_seconds, memory_bytes):
+	"""The loop of a sandbox process."""
+	global parent_pipe
+	parent_pipe = (read_fd, write_fd)
+
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	signal.signal(signal.SIGALRM, signal.SIG_DFL)
+	signal.signal(signal.SIGXCPU, on_cpu_limit)
+
+	# The fork brings along all of the bot's address space, so the cap is
+	# on what comes on top of that.
+	if memory_bytes:
+		limit = virtual_memory() + memory_bytes
+		resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+	while True:
+		try:
+			kind, module, function, args = read_message(read_fd)
+		except EOFError:
+			return
+
+		# RLIMIT_CPU counts the whole life of the process; move the soft
+		# limit to cpu_seconds from now. Past it SIGXCPU ends the job.
+		soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+		used = sum(resource.getrusage(resource.RUSAGE_SELF)[0:2])
+		soft = int(used) + cpu_seconds
+		if hard != resource.RLIM_INFINITY:
+			soft = min(soft, hard)
+		resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+		try:
+			__import__(module)
+			reply = ('done', getattr(sys.modules[module], function)(*args))
+		except CPULimitExceeded:
+			reply = ('error', "used too much CPU time")
+		except MemoryError:
+			reply = ('error', "used too much memory")
+		except RuntimeError, e:
+			reply = ('error', str(e))
+		except:
+			reply = ('error', "%s: %s" % sys.exc_info()[0:2])
+
+		resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+		try:
+			write_message(write_fd, reply)
+		except (cPickle.PicklingError, TypeError):
+			write_message(write_fd, ('error', "returned something that can't be sent back"))
+
+def connect(address, cpu_seconds, memory_bytes):
+	"""The start of a sandbox process: connects to the bot listening on
+	address and serves it."""
+	connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	connection.connect(address)
+	fd = connection.fileno()
+	write_message(fd, ('hello', os.getpid()))
+	serve(fd, fd, cpu_seconds, memory_bytes)
+
+def reap(children):
+	for pid in list(children):
+		try:
+			if os.waitpid(pid, os.WNOHANG)[0]:
+				children.discard(pid)
+		except OSError:
+			children.discard(pid)
+
+def fork_server(read_fd, write_fd, address, cpu_seconds, memory_bytes):
+	"""The loop of the helper process the sandbox processes are forked
+	from. The helper is forked while the bot has just the one thread, so
+	its forks don't start out with locks some other thread of the bot's
+	happened to hold, as forks of the bot itself later on would."""
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+	children = set()
+	while True:
+		try:
+			message = read_message(read_fd)
+		except EOFError:
+			break
+		reap(children)
+
+		if message[0] == 'spawn':
+			pid = os.fork()
+			if pid == 0:
+				try:
+					os.close(read_fd)
+					os.close(write_fd)
+					connect(address, cpu_seconds, memory_bytes)
+				except:
+					pass
+				os._exit(0)
+			children.add(pid)
+			write_message(write_fd, pid)
+		elif message[0] == 'kill':
+			if message[1] in children:
+				os.kill(message[1], signal.SIGKILL)
+				os.waitpid(message[1], 0)
+				children.discard(message[1])
+		elif message[0] == 'reload':
+			# As the bot did, so new sandboxes run the new code.
+			for name in message[1]:
+				if sys.modules.get(name):
+					try:
+						reload(sys.modules[name])
+					except:
+						pass
+
+	for pid in children:
+		try:
+			os.kill(pid, signal.SIGKILL)
+			os.waitpid(pid, 0)
+		except OSError:
+			pass
+
+class Worker:
+	def __init__(self, pid, connection, generation):
+		self.pid = pid
+		self.connection = connection
+		self.read_fd = self.write_fd = connection.fileno()
+		self.generation = generation
+
+	def __repr__(self):
+		return "<sandbox %d>" % self.pid
+
+class Sandbox:
+	"""A few pre-forked processes that run functions the bot would rather not
+	run itself, each job limited to cpu_seconds of CPU time, memory_bytes of
+	extra memory and timeout seconds in all.
+
+	Callers (command worker threads) block in call() until a process is free
+	and has answered. A process that dies (of the OOM killer, say) or is
+	killed for taking too long is replaced by a fresh one. The processes
+	are forked from a helper process, itself forked when the Sandbox is
+	made, and run the code it has; restart() has it reload the modules
+	given and replaces them all, for after a plugin reload."""
+
+	def __init__(self, size=2, cpu_seconds=5, memory_bytes=256 * 1024 * 1024, timeout=8):
+		self.size = size
+		self.cpu_seconds = cpu_seconds
+		self.memory_bytes = memory_bytes
+		self.timeout = timeout
+
+		self.lock = threading.Condition()
+		self.idle = []
+		self.generation = 0
+
+		self.calls = 0
+		self.failed = 0
+		self.restarts = 0
+
+		# The sandbox processes are the helper's children, so they connect
+		# to the bot rather than inherit pipes to it.
+		self.directory = tempfile.mkdtemp(prefix='pynik-sandbox-')
+		self.address = os.path.join(self.directory, 'socket')
+		self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.listener.bind(self.address)
+		self.listener.listen(size)
+		self.listener.settimeout(timeout)
+
+		self.helper = self.start_helper()
+		self.spawn_idle(size)
+
+	def start_helper(self):
+		parent_read, child_write = os.pipe()
+		child_read, parent_write = os.pipe()
+
+		pid = os.fork()
+		if pid == 0:
+			try:
+				close_other_files((child_read, child_write))
+				fork_server(child_read, child_write, self.address, self.cpu_seconds, self.memory_bytes)
+			except:
+				pass
+			os._exit(0)
+
+		os.close(child_read)
+		os.close(child_write)
+		return (pid, parent_read, parent_write)
+
+	def tell_helper(self, message):
+		try:
+			write_message(self.helper[2], message)
+		except OSError:
+			raise SandboxError("the sandbox helper died")
+
+	def spawn(self):
+		"""A new sandbox process, started by the helper."""
+		expires = time.time() + self.timeout
+		self.tell_helper(('spawn',))
+		try:
+			pid = read_message(self.helper[1], expires)
+		except (EOFError, OSError, struct.error):
+			raise SandboxError("the sandbox helper died")
+
+		# One that took too long to turn up earlier may come first.
+		while True:
+			try:
+				connection = self.listener.accept()[0]
+			except socket.timeout:
+				self.kill(pid)
+				raise SandboxTimeout("the sandbox process didn't start")
+			connection.setblocking(1)
+			try:
+				if read_message(connection.fileno(), expires) == ('hello', pid):
+					return Worker(pid, connection, self.generation)
+			except (EOFError, OSError, struct.error):
+				pass
+			connection.close()
+
+	def spawn_idle(self, count):
+		for i in range(count):
+			try:
+				self.idle.append(self.spawn())
+			except SandboxError, e:
+				error_handler.output_message("sandbox: %s" % e)
+
+	def kill(self, pid):
+		try:
+			self.tell_helper(('kill', pid))
+		except SandboxError:
+			pass
+
+	def retire(self, worker, kill):
+		"""Closes the connection to worker, which makes an idle process
+		quit; kill ends a busy one too."""
+		worker.connection.close()
+		if kill:
+			self.kill(worker.pid)
+
+	def acquire(self, expires):
+		# Not forever: a command run from a sandbox upcall may want a
+		# process while its caller holds the last one.
+		with self.lock:
+			while not self.idle:
+				remaining = expires - time.time()
+				if remaining <= 0:
+					raise SandboxTimeout("no sandbox process was free")
+				self.lock.wait(remaining)
+			return self.idle.pop()
+
+	def release(self, worker, dead=False):
+		with self.lock:
+			if dead or worker.generation != self.generation:
+				self.retire(worker, True)
+				self.spawn_idle(1)
+				self.restarts += 1
+			else:
+				self.idle.append(worker)
+			self.lock.notify()
+
+	def call(self, module, function, args=(), upcalls={}):
+		"""Runs function from module with args in a sandbox and returns its
+		result. Raises SandboxError if it fails or breaks a limit.
+
+		The function may call upcall(name, ...) to have upcalls[name] run
+		here, in the bot, with the calling thread."""
+		self.calls += 1
+		expires = time.time() + deadline.current().timeout(self.timeout)
+
+		# A process that died while idle only shows when it is handed a
+		# job; that one is retried with a fresh process.
+		for attempt in range(2):
+			worker = self.acquire(expires)
+			try:
+				write_message(worker.write_fd, ('run', module, function, args))
+			except OSError:
+				self.release(worker, True)
+				continue
+
+			try:
+				result = self.wait_for(worker, expires, upcalls)
+			except SandboxTimeout:
+				self.failed += 1
+				self.release(worker, True)
+				raise
+			except SandboxError:
+				self.failed += 1
+				self.release(worker)
+				raise
+			except (EOFError, OSError, struct.error):
+				self.failed += 1
+				self.release(worker, True)
+				raise SandboxError("the sandbox process died")
+
+			self.release(worker)
+			return result
+
+		self.failed += 1
+		raise SandboxError("no sandbox would start")
+
+	def wait_for(self, worker, expires, upcalls):
+		"""Answers the worker's upcalls until it is done."""
+		while True:
+			message = read_message(worker.read_fd, expires)
+			if message[0] == 'done':
+				return message[1]
+			elif message[0] == 'error':
+				raise SandboxError(message[1])
+
+			name, args = message[1:]
+			try:
+				reply = ('reply', upcalls[name](*args))
+			except KeyError:
+				reply = ('fail', "nothing handles %s" % name)
+			except:
+				error_handler.output_message("sandbox upcall %s: %s" % (name, sys.exc_info()[0:2]))
+				reply = ('fail', "%s failed" % name)
+			write_message(worker.write_fd, reply)
+
+	def restart(self, modules=()):
+		"""Reloads modules (names, in the order the bot reloaded them) in the
+		helper and replaces every process: idle ones now, busy ones when
+		they're done."""
+		with self.lock:
+			self.generation += 1
+			if modules:
+				try:
+					self.tell_helper(('reload', list(modules)))
+				except SandboxError, e:
+					error_handler.output_message("sandbox: %s" % e)
+
+			idle, self.idle = self.idle, []
+			for worker in idle:
+				self.retire(worker, True)
+			self.spawn_idle(len(idle))
+			self.restarts += len(idle)
+
+	def close(self):
+		with self.lock:
+			for worker in self.idle:
+				self.retire(worker, True)
+			self.idle = []
+
+			pid, read_fd, write_fd = self.helper
+			os.close(read_fd)
+			os.close(write_fd)
+			try:
+				os.waitpid(pid, 0)
+			except OSError:
+				pass
+			self.listener.close()
+			shutil.rmtree(self.directory, True)
+
+	def stats(self):
+		return { "processes": self.size, "idle": len(self.idle), "calls": self.calls,
+			"failed": self.failed, "restarts": self.restarts }
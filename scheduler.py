@@ -0,0 +1,210 @@
+import sys
+import time
+import random
+import threading
+import traceback
+from heapq import heappush, heappop
+
+import error_handler
+import deadline
+import clock
+
+class Job:
+	def __init__(self, name, function, args, interval, jitter, max_runtime, background):
+		self.name = name
+		self.function = function
+		self.args = args
+		self.interval = interval
+		self.jitter = jitter
+		self.max_runtime = max_runtime
+		self.background = background
+
+		# When it's next due without the jitter, and with it.
+		self.base = None
+		self.due = None
+		self.cancelled = False
+		self.running = False
+
+		self.runs = 0
+		self.errors = 0
+		self.skipped = 0
+		self.overruns = 0
+		self.last_runtime = None
+
+	def __repr__(self):
+		return "<Job %s every %s s>" % (self.name, self.interval)
+
+	def cancel(self):
+		"""Stops the job from running again; a run in progress finishes."""
+		self.cancelled = True
+
+class Scheduler:
+	"""Runs jobs after a delay or every so often, on the reactor thread or,
+	for those that may take a while, as background jobs (see
+	background_jobs.py).
+
+	Times are kept on clock.monotonic(), in a heap of their own. The reactor
+	has only one timer for all of them, set for the earliest job; when it
+	goes off, every job due within slack seconds runs at once, so jobs due
+	at about the same time share a wakeup."""
+
+	def __init__(self, reactor, runner=None, slack=0.25):
+		self.reactor = reactor
+		self.runner = runner
+		self.slack = slack
+
+		self.lock = threading.Lock()
+		self.heap = []
+		self.sequence = 0
+		self.wake_at = None
+		self.wake_timer = None
+		self.jobs = []
+
+		self.wakeups = 0
+		self.runs = 0
+		self.errors = 0
+		self.skipped = 0
+		self.overruns = 0
+
+	def schedule(self, name, function, args=(), interval=None, delay=None, jitter=0, max_runtime=None, background=False):
+		"""Runs function(*args) after delay seconds (default: interval), and
+		then every interval seconds if there is one. Each wait is up to jitter
+		seconds longer, at random, so jobs started together drift apart.
+
+		Each run gets a deadline max_runtime seconds on (see deadline.py). A
+		background job runs as one of the runner's, and isn't started again while
+		the last run is still going. Returns the Job, whose cancel() stops it.
+		May be called from any thread."""
+		if delay is None:
+			delay = interval or 0
+
+		job = Job(name, function, args, interval, jitter, max_runtime, background)
+		if self.reactor.in_loop_thread():
+			self.add(job, delay)
+		else:
+			self.reactor.call_from_thread(self.add, job, delay)
+		return job
+
+	def add(self, job, delay):
+		if job.cancelled:
+			return
+		self.jobs.append(job)
+		self.push(job, clock.monotonic() + delay)
+		self.arm()
+
+	def push(self, job, base):
+		job.base = base
+		job.due = base
+		if job.jitter:
+			job.due += random.uniform(0, job.jitter)
+		self.sequence += 1
+		heappush(self.heap, (job.due, self.sequence, job))
+
+	def arm(self):
+		"""Sets the reactor timer for the earliest job, unless one is set
+		already for that or earlier."""
+		while self.heap and self.heap[0][2].cancelled:
+			self.remove(heappop(self.heap)[2])
+		if not self.heap:
+			return
+
+		due = self.heap[0][0]
+		if self.wake_at is not None and self.wake_at <= due:
+			return
+
+		if self.wake_timer:
+			self.wake_timer.cancel()
+		self.wake_at = due
+		self.wake_timer = self.reactor.call_later(max(0, due - clock.monotonic()), self.wake)
+
+	def wake(self):
+		self.wake_at = None
+		self.wake_timer = None
+		self.wakeups += 1
+
+		now = clock.monotonic()
+		while self.heap and self.heap[0][0] <= now + self.slack:
+			due, sequence, job = heappop(self.heap)
+			if job.cancelled:
+				self.remove(job)
+				continue
+
+			if job.interval is None:
+				self.remove(job)
+			else:
+				# At a fixed rate, but runs that were missed aren't made up for.
+				base = job.base + job.interval
+				if base < now:
+					base = now + job.interval
+				self.push(job, base)
+
+			self.start(job)
+
+		self.arm()
+
+	def remove(self, job):
+		if job in self.jobs:
+			self.jobs.remove(job)
+
+	def start(self, job):
+		if job.running:
+			job.skipped += 1
+			self.skipped += 1
+			return
+
+		if not job.background or not self.runner:
+			self.run(job)
+			return
+
+		# A run the runner gave up on before it started never will; one it
+		# gave up on after max_runtime may still be going, and the job counts
+		# as running until that returns.
+		run = { "started": False, "over": False }
+
+		def background():
+			with self.lock:
+				if run["over"]:
+					return
+				run["started"] = True
+			try:
+				self.run(job)
+			finally:
+				job.running = False
+
+		def finished(handle):
+			with self.lock:
+				run["over"] = True
+				if not run["started"]:
+					job.running = False
+
+		job.running = True
+		if not self.runner.submit(job.name, background, (), finished, timeout=job.max_runtime):
+			job.running = False
+			job.skipped += 1
+			self.skipped += 1
+
+	def run(self, job):
+		at = None
+		if job.max_runtime is not None:
+			at = time.time() + job.max_runtime
+
+		job.runs += 1
+		self.runs += 1
+		started = clock.monotonic()
+		try:
+			with deadline.until(at):
+				job.function(*job.args)
+		except:
+			job.errors += 1
+			self.errors += 1
+			error_handler.output_message("scheduler: " + job.name + " " + str(sys.exc_info()) + " " + str(traceback.extract_tb(sys.exc_info()[2])))
+
+		job.last_runtime = clock.monotonic() - started
+		if job.max_runtime is not None and job.last_runtime > job.max_runtime:
+			job.overruns += 1
+			self.overruns += 1
+			error_handler.output_message("scheduler: %s took %.1f s, more than its %s s" % (job.name, job.last_runtime, job.max_runtime))
+
+	def stats(self):
+		return { "jobs": len(self.jobs), "wakeups": self.wakeups, "runs": self.runs, "errors": self.errors,
+			"skipped": self.skipped, "overruns": self.overruns }
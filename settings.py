@@ -1,5 +1,8 @@
 server_address = "se.quakenet.org"
 server_port = 6667
+# Fallbacks, as (address, port) pairs, tried in turn when server_address
+# can't be reached.
+servers = []
 
 nick = "CHANGEME"
 username = "CHANGEME"
@@ -8,6 +11,93 @@ realname = "CHANGEME"
 channels = ['#pynik']
 command_prefix = '.'
 
+# Networks to connect to. Anything an entry leaves out is taken from the
+# settings above, e.g. { 'name': 'efnet', 'server_address': 'irc.efnet.org',
+# 'channels': ['#pynik'] }.
+networks = [
+	{ 'name': 'quakenet' },
+]
+
 admin_channels = ['*']
 admin_nicks = ['CHANGEME']
 
+# Longest line accepted from the server, in bytes. 512 plus room for IRCv3
+# message tags.
+max_line_length = 8703
+
+# The status page shows the last log_tail_lines lines. Everything is also
+# echoed to stdout (log_echo) and, if log_directory is set, written to log
+# segments of about log_segment_bytes there, gzipped once full if log_compress.
+# Lines are written by a thread of their own; if it's log_queue_lines behind,
+# further lines are dropped (and counted) instead of piling up in memory.
+log_tail_lines = 500
+log_directory = None
+log_segment_bytes = 4 * 1024 * 1024
+log_compress = True
+log_echo = True
+log_queue_lines = 10000
+
+# Outgoing flood control. Every line costs flood_line_cost seconds plus one
+# second per flood_bytes_per_second bytes, and at most flood_burst seconds of
+# penalty may be outstanding. The defaults follow ircu's penalty rules.
+flood_burst = 10.0
+flood_line_cost = 1.0
+flood_bytes_per_second = 120
+
+# Replies longer than max_reply_lines lines are cut there; the rest can be
+# fetched with the more command.
+max_reply_lines = 3
+
+# Commands run on command_workers threads and are given up on if they
+# haven't answered within command_timeout seconds. At most command_nick_limit
+# commands per nick and command_channel_limit per channel run at once, and at
+# most command_queue_limit wait for their turn.
+command_workers = 4
+command_timeout = 10
+command_nick_limit = 1
+command_channel_limit = 2
+command_queue_limit = 50
+
+# Every plugin hook call is counted, but only one in stats_sample_every is
+# timed (commands and HTTP fetches always are). See .stats.
+stats_sample_every = 10
+
+# Scheduled jobs (see scheduler.py) due within scheduler_slack seconds of
+# each other are run on the same wakeup.
+scheduler_slack = 0.25
+
+# Background jobs (see background_jobs.py) with the same name, such as a
+# plugin's timer_beat sweep, run at most background_job_limit at a time.
+background_job_limit = 1
+
+# Commands that declare cache_seconds have their replies cached, at most
+# result_cache_size of them. See .cache.
+result_cache_size = 500
+
+# HTTP fetches (see plugins/httpget.py) keep up to http_pool_size idle
+# connections per host open for http_keep_alive seconds, to be used again,
+# and follow at most http_max_redirects redirects.
+http_pool_size = 4
+http_keep_alive = 15
+http_max_redirects = 5
+
+# Import plugin modules only once one of their commands or hooks is first
+# needed, going by plugins/manifest.py (see plugin_manifest.py).
+lazy_plugins = True
+
+# Plugins that run untrusted or heavy code (lisp, stava, tenta) do so in
+# sandbox_processes forked processes, where a job may use sandbox_cpu_seconds
+# of CPU time and sandbox_memory bytes of memory, and is killed after
+# sandbox_timeout seconds. Zero processes runs it all in the bot itself.
+sandbox_processes = 2
+sandbox_cpu_seconds = 5
+sandbox_memory = 256 * 1024 * 1024
+sandbox_timeout = 8
+
+# Reconnecting. A connection attempt is given up after connect_timeout
+# seconds; after every failure the next server is tried, waiting twice as long
+# as the last time (with some jitter), from reconnect_min_delay up to
+# reconnect_max_delay seconds.
+connect_timeout = 30
+reconnect_min_delay = 2.0
+reconnect_max_delay = 300.0
@@ -0,0 +1,5 @@
+# Run from the top directory with: python -m unittest discover -s tests -t .
+
+import settings
+settings.log_echo = False
+settings.log_directory = None
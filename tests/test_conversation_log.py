@@ -0,0 +1,25 @@
+import unittest
+
+from ircclient.conversation_log import LogWriter
+
+class CapturingWriter(LogWriter):
+	def __init__(self, queue_size):
+		LogWriter.__init__(self, None, 0, False, False, queue_size=queue_size)
+		self.written = []
+
+	def write(self, batch):
+		self.written.extend(batch)
+
+class LogWriterTest(unittest.TestCase):
+	def test_full_queue_drops_lines(self):
+		# Not started yet: as if stuck on a blocked stdout.
+		writer = CapturingWriter(10)
+		for i in range(15):
+			writer.put("line %d" % i)
+		self.assertEqual(writer.dropped, 5)
+
+		writer.start()
+		writer.close()
+		self.assertEqual(writer.written[:10], ["line %d" % i for i in range(10)])
+		self.assertEqual(len(writer.written), 11)
+		self.assertTrue(writer.written[10].endswith("[5 lines not logged: the log couldn't keep up]"))
@@ -0,0 +1,53 @@
+import threading
+import unittest
+import BaseHTTPServer
+
+from plugins.httpget import HttpClient
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+
+	def do_GET(self):
+		self.server.requests.append((self.path, dict(self.headers)))
+		if self.path == "/redirect":
+			self.send_response(302)
+			self.send_header("Location", "/page")
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+
+		self.send_response(200)
+		self.send_header("Content-Length", "4")
+		self.end_headers()
+		self.wfile.write("page")
+
+	def log_message(self, format, *args):
+		pass
+
+class HeadersTest(unittest.TestCase):
+	def setUp(self):
+		self.server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), Handler)
+		self.server.requests = []
+		self.thread = threading.Thread(target=self.server.serve_forever)
+		self.thread.start()
+		self.client = HttpClient()
+		self.base = "http://127.0.0.1:%d" % self.server.server_address[1]
+
+	def tearDown(self):
+		self.client.close()
+		self.server.shutdown()
+		self.thread.join()
+		self.server.server_close()
+
+	def test_headers_go_with_every_request(self):
+		result = self.client.get(self.base + "/redirect", 5, { "Cookie": "brp=spr=eng" })
+		self.assertEqual((result["url"], result["data"]), (self.base + "/page", "page"))
+
+		self.assertEqual([path for path, headers in self.server.requests], ["/redirect", "/page"])
+		for path, headers in self.server.requests:
+			self.assertEqual(headers["cookie"], "brp=spr=eng")
+			self.assertEqual(headers["user-agent"], "Pynik/0.1")
+
+	def test_no_headers(self):
+		self.client.get(self.base + "/page", 5)
+		self.assertNotIn("cookie", self.server.requests[0][1])
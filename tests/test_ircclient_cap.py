@@ -0,0 +1,136 @@
+import time
+import socket
+import unittest
+
+from reactor import Reactor
+from ircclient.ircclient import IRCClient
+
+class StandInServer:
+	"""The server end of a client's connection, reading what the client
+	sends while the reactor runs."""
+
+	def __init__(self, test, reactor):
+		self.test = test
+		self.reactor = reactor
+		self.listener = socket.socket()
+		self.listener.bind(("127.0.0.1", 0))
+		self.listener.listen(1)
+		self.connection = None
+		self.buffer = ""
+
+	def port(self):
+		return self.listener.getsockname()[1]
+
+	def accept(self, client):
+		self.run_until(lambda: client.connected)
+		self.connection = self.listener.accept()[0]
+		self.connection.setblocking(False)
+
+	def run_until(self, condition, seconds=5):
+		until = time.time() + seconds
+		while not condition():
+			self.test.assertTrue(time.time() < until, "timed out")
+			self.reactor.run_once(0.01)
+
+	def lines(self):
+		try:
+			self.buffer += self.connection.recv(4096)
+		except socket.error:
+			pass
+		lines = self.buffer.split("\r\n")
+		self.buffer = lines.pop()
+		return lines
+
+	def expect(self, *wanted):
+		"""Runs until the client has sent each of the lines wanted, in order,
+		and returns everything it sent meanwhile."""
+		seen = []
+		wanted = list(wanted)
+		def got_them():
+			for line in self.lines():
+				seen.append(line)
+				if wanted and line == wanted[0]:
+					wanted.pop(0)
+			return not wanted
+		self.run_until(got_them)
+		return seen
+
+	def send(self, *lines):
+		for line in lines:
+			self.connection.sendall(line + "\r\n")
+
+	def close(self):
+		if self.connection:
+			self.connection.close()
+		self.listener.close()
+
+class CapTest(unittest.TestCase):
+	def setUp(self):
+		self.reactor = Reactor()
+		self.server = StandInServer(self, self.reactor)
+		self.client = IRCClient("127.0.0.1", self.server.port(), "pynik", "pynik", "Pynik", self.reactor)
+		self.client.reconnect()
+		self.server.accept(self.client)
+		self.server.expect("CAP LS 302", "USER pynik * * :Pynik", "NICK pynik")
+
+	def tearDown(self):
+		self.client.disconnect()
+		self.server.close()
+
+	def test_ls_req_ack_end(self):
+		self.server.send(":irc.example.org CAP * LS :multi-prefix sasl away-notify=1 batch")
+		self.server.expect("CAP REQ :multi-prefix away-notify batch")
+		self.server.send(":irc.example.org CAP * ACK :multi-prefix away-notify batch")
+		self.server.expect("CAP END")
+		self.assertEqual(self.client.caps, set(["multi-prefix", "away-notify", "batch"]))
+
+		self.server.send(":irc.example.org 001 pynik :Welcome")
+		self.server.run_until(lambda: self.client.active_session)
+		self.assertFalse(self.client.negotiating_caps)
+
+	def test_multi_line_ls(self):
+		self.server.send(":irc.example.org CAP * LS * :multi-prefix",
+			":irc.example.org CAP * LS :extended-join")
+		seen = self.server.expect("CAP REQ :multi-prefix extended-join")
+		self.assertFalse([line for line in seen if line.startswith("CAP REQ :multi-prefix") and "extended-join" not in line])
+
+	def test_nak_ends_negotiation(self):
+		self.server.send(":irc.example.org CAP * LS :multi-prefix")
+		self.server.expect("CAP REQ :multi-prefix")
+		self.server.send(":irc.example.org CAP * NAK :multi-prefix")
+		self.server.expect("CAP END")
+		self.assertEqual(self.client.caps, set())
+
+	def test_nothing_wanted(self):
+		self.server.send(":irc.example.org CAP * LS :sasl tls")
+		seen = self.server.expect("CAP END")
+		self.assertFalse([line for line in seen if line.startswith("CAP REQ")])
+
+	def test_new_and_del_after_registration(self):
+		self.server.send(":irc.example.org CAP * LS :multi-prefix",
+			":irc.example.org CAP * ACK :multi-prefix")
+		self.server.expect("CAP END")
+		self.server.send(":irc.example.org 001 pynik :Welcome")
+		self.server.run_until(lambda: self.client.active_session)
+
+		# Offered later: asked for, without a second CAP END.
+		self.server.send(":irc.example.org CAP pynik NEW :away-notify")
+		self.server.expect("CAP REQ :away-notify")
+		self.server.send(":irc.example.org CAP pynik ACK :away-notify", "PING :check")
+		seen = self.server.expect("PONG :check")
+		self.assertFalse("CAP END" in seen)
+		self.assertTrue("away-notify" in self.client.caps)
+
+		self.server.send(":irc.example.org CAP pynik DEL :multi-prefix", "PING :again")
+		self.server.expect("PONG :again")
+		self.assertEqual(self.client.caps, set(["away-notify"]))
+
+	def test_server_without_cap(self):
+		self.server.send(":irc.example.org 421 pynik CAP :Unknown command",
+			":irc.example.org 001 pynik :Welcome", "PING :check")
+		seen = self.server.expect("PONG :check")
+		self.assertFalse("CAP END" in seen)
+		self.assertFalse(self.client.negotiating_caps)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,85 @@
+import time
+import socket
+import unittest
+
+from reactor import Reactor
+from ircclient.ircclient import IRCClient
+from ircclient.backoff import Backoff
+
+def free_port():
+	s = socket.socket()
+	s.bind(("127.0.0.1", 0))
+	port = s.getsockname()[1]
+	s.close()
+	return port
+
+def listen(port):
+	s = socket.socket()
+	s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+	s.bind(("127.0.0.1", port))
+	s.listen(1)
+	s.settimeout(5)
+	return s
+
+class ConnectTest(unittest.TestCase):
+	def setUp(self):
+		self.reactor = Reactor()
+		self.listeners = []
+
+	def tearDown(self):
+		for s in self.listeners:
+			s.close()
+
+	def client(self, port, servers=()):
+		client = IRCClient("127.0.0.1", port, "pynik", "pynik", "Pynik", self.reactor, servers=servers)
+		client.backoff = Backoff(0.05, 0.4)
+		self.attempts = []
+		connect_failed = client.connect_failed
+		def failed(attempt, reason):
+			self.attempts.append(time.time())
+			connect_failed(attempt, reason)
+		client.connect_failed = failed
+		return client
+
+	def run_until(self, condition, seconds=5):
+		until = time.time() + seconds
+		while not condition():
+			self.assertTrue(time.time() < until, "timed out")
+			self.reactor.run_once(0.01)
+
+	def test_refused_then_accepted(self):
+		port = free_port()
+		client = self.client(port)
+		client.reconnect()
+
+		# Nothing listens yet: every attempt fails, further and further apart.
+		self.run_until(lambda: len(self.attempts) >= 4)
+		self.assertFalse(client.connected)
+		gaps = [b - a for a, b in zip(self.attempts, self.attempts[1:])]
+		self.assertTrue(gaps[-1] > 0.1, gaps)
+
+		server = listen(port)
+		self.listeners.append(server)
+		self.run_until(lambda: client.connected)
+		connection, address = server.accept()
+		self.listeners.append(connection)
+
+		self.run_until(lambda: "CAP LS" in connection.recv(1024))
+
+		# Registering resets the backoff.
+		connection.sendall(":irc.example.org 001 pynik :Welcome\r\n")
+		self.run_until(lambda: client.active_session)
+		self.assertEqual(client.backoff.attempts, 0)
+
+	def test_fails_over_to_next_server(self):
+		server = listen(free_port())
+		self.listeners.append(server)
+		client = self.client(free_port(), [("127.0.0.1", server.getsockname()[1])])
+		client.reconnect()
+
+		self.run_until(lambda: client.connected)
+		self.assertEqual(len(self.attempts), 1)
+		self.assertEqual(client.s.getpeername()[1], server.getsockname()[1])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,17 @@
+import unittest
+
+from ircclient.message import parse_message
+
+class ParseMessageTest(unittest.TestCase):
+	def test_tags_are_read_only(self):
+		message = parse_message("@time=2030-01-01T00:00:00.5Z;batch=x :bob!b@host PRIVMSG #c :hi")
+		self.assertEqual(message.tags, { 'time': '2030-01-01T00:00:00.5Z', 'batch': 'x' })
+		self.assertRaises(TypeError, message.tags.__setitem__, 'batch', 'y')
+		self.assertRaises(TypeError, message.tags.pop, 'batch')
+		self.assertRaises(TypeError, parse_message("PING :x").tags.update, { 'a': 'b' })
+		self.assertEqual(message.server_time(), 1893456000.5)
+
+	def test_params_split_on_spaces_only(self):
+		message = parse_message(":server 005 pynik  a\tb c :are supported")
+		self.assertEqual(message.params, ('pynik', 'a\tb', 'c', 'are supported'))
+		self.assertEqual(message.command, '005')
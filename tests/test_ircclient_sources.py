@@ -0,0 +1,31 @@
+import unittest
+
+from ircclient.ircclient import IRCClient
+from plugins import utility
+
+class SourcesTest(unittest.TestCase):
+	def setUp(self):
+		self.client = IRCClient("irc.example.org", 6667, "pynik", "pynik", "Pynik")
+		self.calls = []
+		for name in ["on_join", "on_kick", "on_nick_change", "on_part", "on_privmsg", "on_notice"]:
+			self.client.callbacks[name] = lambda *args, **kwargs: self.calls.append(args)
+
+	def source_of(self, line):
+		self.calls = []
+		self.client.handle_line(line)
+		self.assertEqual(len(self.calls), 1)
+		return self.calls[0][0]
+
+	def test_sources_have_no_colon(self):
+		for line in [":bob!b@host JOIN #pynik",
+				":bob!b@host KICK #pynik carl :bye",
+				":bob!b@host NICK robert",
+				":bob!b@host PART #pynik :later",
+				":bob!b@host PRIVMSG #pynik :hi",
+				":bob!b@host NOTICE #pynik :hi"]:
+			source = self.source_of(line)
+			self.assertEqual(source, "bob!b@host", line)
+			self.assertEqual(utility.extract_nick(source), "bob")
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,17 @@
+import sys
+import unittest
+
+import plugin_handler
+
+class LoadPluginTest(unittest.TestCase):
+	def test_loaded_plugin_is_started(self):
+		# postit isn't among the plugins loaded at start.
+		plugin_handler.load_plugin('postit')
+		postit = sys.modules['plugins.postit']
+
+		self.assertTrue(isinstance(postit.PostitCommand.instance, postit.PostitCommand))
+		self.assertIn(postit.PostitCommand.instance.on_join,
+			[hook for hook in plugin_handler.get_hooks('on_join')])
+		# Not loaded again by the next .reload.
+		self.assertEqual(plugin_handler.reload_changed()[0], [])
+		self.assertTrue(isinstance(postit.PostitCommand.instance, postit.PostitCommand))
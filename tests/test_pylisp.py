@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import plugin_handler
+from plugins import command_catcher, pylisp
+from sandbox import Sandbox
+
+class FakeBot:
+	sandbox = None
+
+	def tell(self, target, message):
+		pass
+
+class NestedLispTest(unittest.TestCase):
+	def setUp(self):
+		self.cwd = os.getcwd()
+		self.directory = tempfile.mkdtemp()
+		os.mkdir(os.path.join(self.directory, 'data'))
+		os.chdir(self.directory)
+		plugin_handler.plugins_on_load()
+		self.bot = FakeBot()
+
+	def tearDown(self):
+		if self.bot.sandbox:
+			self.bot.sandbox.close()
+		os.chdir(self.cwd)
+		shutil.rmtree(self.directory)
+
+	def lisp(self, source):
+		"""Runs .lisp source on a thread of its own, so a deadlock fails the
+		test instead of hanging it."""
+		result = []
+		thread = threading.Thread(target=lambda: result.append(command_catcher.CommandCatcherPlugin.instance.on_command(
+			self.bot, "bob!b@host", "#test", "lisp", source)))
+		thread.daemon = True
+		thread.start()
+		thread.join(10)
+		self.assertFalse(thread.is_alive(), "deadlocked")
+		return result[0]
+
+	def test_lisp_runs(self):
+		self.assertEqual(self.lisp('(* 2 3)'), '6')
+
+	def test_nested_lisp_is_turned_down(self):
+		self.assertIn("Lisp can't run lisp.", self.lisp('(command "lisp" "(* 2 3)")'))
+
+	def test_nested_lisp_in_a_sandbox_is_turned_down(self):
+		self.bot.sandbox = Sandbox(1, timeout=3)
+		self.assertIn("Lisp can't run lisp.", self.lisp('(command "lisp" "(* 2 3)")'))
+		self.assertEqual(self.lisp('(* 2 3)'), '6')
@@ -0,0 +1,162 @@
+import os
+import random
+import shutil
+import tempfile
+import datetime
+import unittest
+import cPickle
+
+from plugins.reminder import ReminderStore, ReminderCommand
+
+class FakeBot:
+	def __init__(self, network=None):
+		self.network = network
+		self.told = []
+
+	def tell_on(self, network, target, message):
+		self.told.append((network, target, message))
+
+class StoreTestCase(unittest.TestCase):
+	def setUp(self):
+		self.cwd = os.getcwd()
+		self.directory = tempfile.mkdtemp()
+		os.mkdir(os.path.join(self.directory, 'data'))
+		os.chdir(self.directory)
+		self.start = datetime.datetime(2030, 1, 1)
+
+	def tearDown(self):
+		os.chdir(self.cwd)
+		shutil.rmtree(self.directory)
+
+	def at(self, seconds):
+		return self.start + datetime.timedelta(0, seconds)
+
+	def reopen(self, store):
+		store.close()
+		store = ReminderStore(store.name, store.compact_after)
+		store.load()
+		return store
+
+class StoreTest(StoreTestCase):
+	def open(self, compact_after=1000):
+		store = ReminderStore("reminders", compact_after)
+		store.load()
+		return store
+
+	def test_due_earliest_first(self):
+		store = self.open()
+		for seconds in [30, 10, 40, 20]:
+			store.add("bob", self.at(seconds), "at %d" % seconds)
+		store.add("alice", self.at(15), "at 15")
+
+		self.assertEqual([r.message for r in store.for_nick("BOB")], ["at 10", "at 20", "at 30", "at 40"])
+		self.assertEqual([r.message for r in store.pop_due(self.at(20))], ["at 10", "at 15", "at 20"])
+		self.assertEqual(store.pop_due(self.at(20)), [])
+		self.assertEqual([r.message for r in store.for_nick("bob")], ["at 30", "at 40"])
+		self.assertEqual(store.for_nick("alice"), [])
+		store.close()
+
+	def test_remove(self):
+		store = self.open()
+		first = store.add("bob", self.at(10), "first")
+		store.add("bob", self.at(20), "second")
+
+		self.assertEqual(store.remove(first.id), first)
+		self.assertEqual(store.remove(first.id), None)
+		self.assertEqual([r.message for r in store.for_nick("bob")], ["second"])
+
+		store = self.reopen(store)
+		self.assertEqual([r.message for r in store.pop_due(self.at(30))], ["second"])
+		store.close()
+
+	def test_replay_after_restart(self):
+		store = self.open()
+		for seconds in range(10):
+			store.add("bob", self.at(seconds), "at %d" % seconds)
+		store.pop_due(self.at(4))
+		store = self.reopen(store)
+
+		self.assertEqual(len(store), 5)
+		# Ids aren't given out again.
+		self.assertEqual(store.add("bob", self.at(100), "later").id, 10)
+		store = self.reopen(store)
+		self.assertEqual([r.message for r in store.pop_due(self.at(100))],
+			["at %d" % seconds for seconds in range(5, 10)] + ["later"])
+		store.close()
+
+	def test_torn_record_is_cut_off(self):
+		store = self.open()
+		store.add("bob", self.at(10), "kept")
+		store.close()
+		with open(store.journal_file, 'ab') as file:
+			file.write(cPickle.dumps(('add', 1, "bob", self.at(20), "torn"), 2)[:-5])
+		size = os.path.getsize(store.journal_file)
+
+		store = self.reopen(store)
+		self.assertEqual([r.message for r in store.for_nick("bob")], ["kept"])
+		self.assertTrue(os.path.getsize(store.journal_file) < size)
+		store.add("bob", self.at(30), "after")
+		store = self.reopen(store)
+		self.assertEqual([r.message for r in store.for_nick("bob")], ["kept", "after"])
+		store.close()
+
+	def test_compaction(self):
+		store = self.open(10)
+		for seconds in range(20):
+			store.add("bob", self.at(seconds), "at %d" % seconds)
+		store.pop_due(self.at(14))
+
+		# Compacted as the 21st record went in, and the removals after.
+		self.assertTrue(store.journal_records <= 10)
+		self.assertEqual(len(store.deadlines), 5)
+		self.assertTrue(os.path.exists(os.path.join('data', 'reminders.txt')))
+
+		store = self.reopen(store)
+		self.assertEqual([r.message for r in store.for_nick("bob")], ["at %d" % seconds for seconds in range(15, 20)])
+		self.assertEqual(store.add("bob", self.at(100), "later").id, 20)
+		store.close()
+
+	def test_many(self):
+		random.seed(1)
+		times = range(100000)
+		random.shuffle(times)
+
+		store = self.open()
+		for seconds in times:
+			store.add("nick%d" % (seconds % 1000), self.at(seconds), str(seconds))
+		self.assertEqual(len(store.for_nick("nick7")), 100)
+
+		store = self.reopen(store)
+		fired = []
+		for seconds in range(0, 100000, 1000):
+			fired.extend([int(r.message) for r in store.pop_due(self.at(seconds))])
+		fired.extend([int(r.message) for r in store.pop_due(self.at(100000))])
+		self.assertEqual(fired, range(100000))
+		self.assertEqual(len(store), 0)
+		store.close()
+
+class NetworkTest(StoreTestCase):
+	def test_network_survives_replay(self):
+		store = ReminderStore("reminders")
+		store.load()
+		store.add("bob", self.at(10), "on efnet", "efnet")
+		store.add("bob", self.at(20), "on quakenet", "quakenet")
+		store = self.reopen(store)
+
+		self.assertEqual([r.message for r in store.for_nick("bob", "efnet")], ["on efnet"])
+		self.assertEqual([r.network for r in store.pop_due(self.at(30))], ["efnet", "quakenet"])
+		store.close()
+
+	def test_beat_replies_on_the_reminders_network(self):
+		command = ReminderCommand()
+		command.store = ReminderStore("reminders")
+		command.store.load()
+		command.store.add("bob", self.at(10), "tea", "quakenet")
+
+		bot = FakeBot()
+		command.timer_beat(bot, self.at(10))
+		self.assertEqual(bot.told, [("quakenet", "bob", "Beep beep! tea")])
+		command.store.close()
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import result_cache
+from plugins import command_catcher, tenta, imdb
+
+class FakeBot:
+	pass
+
+class ErrorRepliesTest(unittest.TestCase):
+	def setUp(self):
+		result_cache.cache.purge()
+		self.catcher = command_catcher.CommandCatcherPlugin()
+
+	def tearDown(self):
+		result_cache.cache.purge()
+
+	def call(self, command, method, trigger, argument):
+		return self.catcher.call(FakeBot(), command, method, trigger, (FakeBot(), "bob", "#c", trigger, argument))
+
+	def test_tenta_error_isnt_cached(self):
+		def fail(self):
+			raise IOError("down")
+		get_lines = tenta.TentaSearch.get_lines
+		tenta.TentaSearch.get_lines = fail
+		try:
+			command = tenta.tenta()
+			self.assertEqual(self.call(command, command.trig_tenta, "tenta", "TATA24"), "Error retrieving data.")
+		finally:
+			tenta.TentaSearch.get_lines = get_lines
+		self.assertEqual(result_cache.cache.stats()["entries"], 0)
+
+	def test_imdb_parse_error_isnt_cached(self):
+		read_url = imdb.utility.read_url
+		imdb.utility.read_url = lambda url: { "url": url, "data": "<html>", "info": None }
+		try:
+			command = imdb.IMDbCommand()
+			self.assertTrue(self.call(command, command.trig_imdb, "imdb", "heat").startswith("Couldn't parse"))
+		finally:
+			imdb.utility.read_url = read_url
+		self.assertEqual(result_cache.cache.stats()["entries"], 0)
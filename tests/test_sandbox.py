@@ -0,0 +1,49 @@
+import os
+import threading
+import unittest
+
+from sandbox import Sandbox, SandboxError
+
+lock = threading.Lock()
+
+def take_lock():
+	with lock:
+		return "took it"
+
+def parent():
+	return os.getppid()
+
+def die():
+	os._exit(1)
+
+class SandboxTest(unittest.TestCase):
+	def setUp(self):
+		self.sandbox = Sandbox(1, timeout=3)
+
+	def tearDown(self):
+		self.sandbox.close()
+
+	def test_replacements_are_not_forked_from_the_bot(self):
+		# Another thread of the bot's holds a lock while the processes are
+		# replaced; a fork of the bot would have it held for good.
+		taken = threading.Event()
+		done = threading.Event()
+		def hold():
+			with lock:
+				taken.set()
+				done.wait(10)
+		thread = threading.Thread(target=hold)
+		thread.start()
+		taken.wait(10)
+		try:
+			self.sandbox.restart()
+			self.assertEqual(self.sandbox.call(__name__, "take_lock"), "took it")
+			self.assertNotEqual(self.sandbox.call(__name__, "parent"), os.getpid())
+		finally:
+			done.set()
+			thread.join()
+
+	def test_dead_process_is_replaced(self):
+		self.assertRaises(SandboxError, self.sandbox.call, __name__, "die")
+		self.assertEqual(self.sandbox.call(__name__, "take_lock"), "took it")
+		self.assertEqual(self.sandbox.stats()["restarts"], 1)
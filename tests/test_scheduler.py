@@ -0,0 +1,65 @@
+import threading
+import unittest
+
+from scheduler import Scheduler, Job
+
+class GivingUpRunner:
+	"""Gives up on every job, as if past its max_runtime: once started is
+	set if there's one, else before it starts."""
+
+	def __init__(self, started=None):
+		self.started = started
+		self.threads = []
+		self.targets = []
+
+	def submit(self, name, target, args=(), callback=None, timeout=None):
+		self.targets.append(target)
+		if self.started:
+			self.started.clear()
+			thread = threading.Thread(target=target, args=args)
+			thread.start()
+			self.threads.append(thread)
+			self.started.wait(10)
+		callback(None)
+		return True
+
+class BackgroundTest(unittest.TestCase):
+	def setUp(self):
+		self.started = threading.Event()
+		self.release = threading.Event()
+		self.calls = []
+
+	def work(self):
+		self.calls.append(1)
+		self.started.set()
+		self.release.wait(10)
+
+	def job(self):
+		return Job("work", self.work, (), 60, 0, 1, True)
+
+	def test_run_given_up_on_still_counts_as_running(self):
+		runner = GivingUpRunner(self.started)
+		scheduler = Scheduler(None, runner)
+		job = self.job()
+
+		scheduler.start(job)
+		self.assertTrue(job.running)
+		scheduler.start(job)
+		self.assertEqual((len(self.calls), job.skipped), (1, 1))
+
+		self.release.set()
+		runner.threads[0].join()
+		self.assertFalse(job.running)
+		scheduler.start(job)
+		runner.threads[1].join()
+		self.assertEqual(len(self.calls), 2)
+
+	def test_run_given_up_on_before_it_started_never_starts(self):
+		runner = GivingUpRunner()
+		scheduler = Scheduler(None, runner)
+		job = self.job()
+
+		scheduler.start(job)
+		self.assertFalse(job.running)
+		runner.targets[0]()
+		self.assertEqual(self.calls, [])
@@ -0,0 +1,30 @@
+import time
+import unittest
+
+import clock
+from ircclient.send_queue import TokenBucket
+
+class TokenBucketTest(unittest.TestCase):
+	def setUp(self):
+		self.time = time.time
+		self.monotonic = clock.monotonic
+
+	def tearDown(self):
+		time.time = self.time
+		clock.monotonic = self.monotonic
+
+	def test_setting_the_clock_back_doesnt_stall(self):
+		bucket = TokenBucket(10.0, 1.0, 120)
+		bucket.consume("PRIVMSG #c :hi")
+		time.time = lambda: self.time() - 3600
+		self.assertEqual(bucket.wait_time("PRIVMSG #c :hi"), 0.0)
+
+	def test_time_going_backwards_adds_nothing(self):
+		now = [1000.0]
+		clock.monotonic = lambda: now[0]
+		bucket = TokenBucket(2.0, 1.0, 1000000)
+		bucket.consume("a")
+		now[0] -= 3600
+		self.assertAlmostEqual(bucket.wait_time("a"), 0.0, 3)
+		bucket.consume("a")
+		self.assertAlmostEqual(bucket.wait_time("a"), 1.0, 3)
@@ -0,0 +1,18 @@
+import unittest
+
+from plugins import standard, manifest
+
+class Latin1Test(unittest.TestCase):
+	def test_aao_triggers(self):
+		self.assertTrue('\xe5\xe4\xf6' in standard.AAOCommand.triggers)
+		self.assertTrue('\xc3\xa5\xc3\xa4\xc3\xb6' in standard.AAOCommand.triggers)
+
+	def test_no_replacement_characters(self):
+		source = open(standard.__file__.replace('.pyc', '.py'), 'rb').read()
+		self.assertFalse('\xef\xbf\xbd' in source)
+
+	def test_manifest_knows_the_trigger(self):
+		self.assertTrue('\xe5\xe4\xf6' in manifest.modules['standard']['triggers'])
+
+if __name__ == '__main__':
+	unittest.main()
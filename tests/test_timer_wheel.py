@@ -0,0 +1,59 @@
+import time
+import random
+import unittest
+
+from timer_wheel import Timer, TimerWheel
+
+def noop():
+	pass
+
+class AdvanceTest(unittest.TestCase):
+	def run_wheel(self, wheel, until):
+		"""Advances wheel the way the reactor does, waking at next_due().
+		Returns the (tick, timer) pairs in the order they went off, and how
+		many wakeups it took."""
+		fired = []
+		wakeups = 0
+		while len(wheel):
+			now = wheel.next_due()
+			if now > until:
+				break
+			wakeups += 1
+			fired.extend([(wheel.current, timer) for timer in wheel.advance(now)])
+		return fired, wakeups
+
+	def test_far_timer_is_quick(self):
+		# Thirty days on: in level 3, and spread out over every level below.
+		wheel = TimerWheel(0.01, now=0.0)
+		timer = wheel.add(Timer(30 * 86400.0 + 0.005, None, noop, ()))
+
+		began = time.time()
+		fired, wakeups = self.run_wheel(wheel, 31 * 86400.0)
+		self.assertLess(time.time() - began, 1)
+
+		self.assertEqual(fired, [(timer.tick, timer)])
+		self.assertEqual(timer.tick, 30 * 8640000 + 1)
+		self.assertLess(wakeups, 10)
+
+	def test_timers_go_off_on_their_tick(self):
+		random.seed(1)
+		wheel = TimerWheel(0.01, now=0.0)
+		timers = []
+		for i in range(500):
+			# From the next tick to past the last level.
+			timers.append(wheel.add(Timer(10 ** random.uniform(-2, 7.7), None, noop, ())))
+
+		fired, wakeups = self.run_wheel(wheel, 10 ** 8)
+		self.assertEqual(sorted([timer.tick for timer in timers]), [tick for tick, timer in fired])
+		for tick, timer in fired:
+			self.assertEqual(tick, timer.tick)
+
+	def test_timer_added_while_skipping(self):
+		wheel = TimerWheel(0.01, now=0.0)
+		wheel.add(Timer(86400.0, None, noop, ()))
+		wheel.next_due()
+		# Due after a level 1 slot is spread out, long before the first.
+		timer = wheel.add(Timer(10.0, None, noop, ()))
+
+		fired, wakeups = self.run_wheel(wheel, 20.0)
+		self.assertEqual(fired, [(1000, timer)])
@@ -0,0 +1,54 @@
+import time
+import threading
+import unittest
+from contextlib import contextmanager
+
+from reactor import Reactor
+import worker_pool
+from worker_pool import WorkerPool
+import deadline
+
+class CancelTest(unittest.TestCase):
+	def setUp(self):
+		self.reactor = Reactor()
+		self.pool = WorkerPool(self.reactor, 2)
+		self.thread = threading.Thread(target=self.reactor.run)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def tearDown(self):
+		self.reactor.stop()
+		self.reactor.call_from_thread(lambda: None)
+		self.thread.join()
+
+	def test_cancel_while_starting(self):
+		# Gives up on the job right as the worker thread takes up its
+		# deadline, the window where it used to be running without one.
+		until = deadline.until
+		jobs = []
+		@contextmanager
+		def cancelling_until(at):
+			with until(at) as limit:
+				self.reactor.call_and_wait(lambda: self.pool.cancel(jobs[0]))
+				yield limit
+
+		seen = []
+		def job():
+			until = time.time() + 0.5
+			while time.time() < until:
+				if deadline.current().expired():
+					seen.append(True)
+					return
+			seen.append(False)
+
+		worker_pool.deadline.until = cancelling_until
+		try:
+			self.reactor.call_and_wait(lambda: jobs.append(self.pool.submit(job)))
+			time.sleep(0.7)
+		finally:
+			worker_pool.deadline.until = until
+		self.assertEqual(self.pool.cancelled, 1)
+		self.assertFalse(False in seen)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,42 @@
+# coding: utf-8
+
+import unittest
+
+from plugins import yrno
+
+search_url = "http://www.yr.no/soek.aspx?sted=Link%C3%B6ping"
+place_url = "http://gammel.yr.no/place/Sweden/%C3%96sterg%C3%B6tland/Link%C3%B6ping/"
+
+pages = {
+	search_url: { "url": search_url,
+		"data": '<a href="/place/Sweden/\xc3\x96sterg\xc3\xb6tland/Link\xc3\xb6ping/" title="Link\xc3\xb6ping">' },
+	place_url: { "url": place_url, "data": "" },
+	place_url + "hour_by_hour.html": { "url": place_url + "hour_by_hour.html",
+		"data": '<th>Monday <strong>12:00</strong></th><td title="Cloudy">' +
+			'<td class="precipitation">0.5 mm</td><td class="plus">3\xc2\xb0</td>' +
+			'<img src="x" title="Breeze, 4 m/s from west"><td class="pressure">1000 hPa</td>' },
+}
+
+class YrNoTest(unittest.TestCase):
+	def setUp(self):
+		self.fetched = []
+		def read_url(url, headers=None):
+			self.fetched.append((url, headers))
+			return pages.get(url)
+		self.read_url = yrno.utility.read_url
+		yrno.utility.read_url = read_url
+		self.command = yrno.YrNo()
+		self.command.save = lambda: None
+
+	def tearDown(self):
+		yrno.utility.read_url = self.read_url
+
+	def test_forecast(self):
+		result = self.command.trig_yr(None, "bob", "#test", "yr", "Link\xc3\xb6ping")
+		self.assertEqual(result, "Weather in Link\xc3\xb6ping at 12:00: Cloudy 3C 0.5 mm 4 m/s west DANGER rain! Mo12:00 0.5mm ")
+
+		cookie = { "Cookie": "brp=spr=eng" }
+		self.assertEqual(self.fetched, [(search_url, cookie), (place_url, cookie), (place_url + "hour_by_hour.html", None)])
+
+	def test_unreachable(self):
+		self.assertEqual(self.command.trig_yr(None, "bob", "#test", "yr", "Nowhere"), "Could not reach yr.no.")
@@ -0,0 +1,224 @@
+import clock
+
+slot_bits = 8
+slots = 1 << slot_bits
+slot_mask = slots - 1
+levels = 4
+
+# (ticks ahead a level holds timers up to, its level, the bits to shift a
+# tick by for its slot) for the levels above 0.
+spans = [(1 << (slot_bits * (level + 1)), level, slot_bits * level) for level in range(1, levels)]
+
+class Timer:
+	"""A handle on a call to target(*args) at clock.monotonic() time due, and
+	every interval seconds after that if interval isn't None."""
+
+	def __init__(self, due, interval, target, args):
+		self.due = due
+		self.interval = interval
+		self.target = target
+		self.args = args
+		self.cancelled = False
+
+		# Set by the wheel holding it: the tick it's due on and the slot it's in.
+		self.tick = None
+		self.slot = None
+		# Called by cancel(), to have the wheel forget it.
+		self.on_cancel = None
+
+	def __repr__(self):
+		return "<Timer %s at %.3f>" % (getattr(self.target, '__name__', self.target), self.due)
+
+	def trigger(self):
+		self.target(*self.args)
+
+	def cancel(self):
+		"""Makes sure it never goes off (again)."""
+		self.cancelled = True
+		if self.on_cancel:
+			self.on_cancel(self)
+
+class TimerWheel:
+	"""Timers hashed into levels of slots by the tick they're due on: level
+	0 has a slot per tick for the next 256 ticks, level 1 one per 256 ticks
+	for the next 65536, and so on. Adding and cancelling a timer is a set
+	operation whatever the number of timers; as time passes, the timers in
+	the next higher level slot are spread out over the level below.
+
+	Timers go off on the first tick at or after their time, so up to a
+	resolution late, and never early. Not thread-safe."""
+
+	def __init__(self, resolution=0.01, now=None):
+		if now is None:
+			now = clock.monotonic()
+		self.resolution = resolution
+		self.origin = now
+		self.current = 0
+		self.wheels = [[set() for i in range(slots)] for level in range(levels)]
+		self.ready = []
+		self.count = 0
+
+		# Nothing happens before this tick: no timer is due and no slot is
+		# spread out. None when it has to be looked for.
+		self.earliest = None
+
+	def __len__(self):
+		return self.count
+
+	def tick_at(self, when):
+		ticks = (when - self.origin) / self.resolution
+		tick = int(ticks)
+		if tick < ticks:
+			tick += 1
+		return tick
+
+	def time_of(self, tick):
+		return self.origin + tick * self.resolution
+
+	def add(self, timer):
+		ticks = (timer.due - self.origin) / self.resolution
+		tick = int(ticks)
+		if tick < ticks:
+			tick += 1
+		timer.tick = tick
+		self.count += 1
+		visit = self.insert(timer)
+		if self.earliest is not None and visit < self.earliest:
+			self.earliest = visit
+		return timer
+
+	def insert(self, timer):
+		"""Puts timer in its slot. Returns the tick that slot goes off or is
+		spread out on."""
+		ticks = timer.tick - self.current
+		if ticks <= 0:
+			timer.slot = self.ready
+			self.ready.append(timer)
+			return self.current
+
+		if ticks < slots:
+			slot = self.wheels[0][timer.tick & slot_mask]
+			slot.add(timer)
+			timer.slot = slot
+			return timer.tick
+
+		for limit, level, shift in spans:
+			if ticks < limit:
+				break
+		else:
+			# Past the last level: parked in its farthest slot, and put in
+			# again when that slot is spread out.
+			ticks = limit - 1
+
+		index = (self.current + ticks) >> shift
+		slot = self.wheels[level][index & slot_mask]
+		slot.add(timer)
+		timer.slot = slot
+		return index << shift
+
+	def cancel(self, timer):
+		timer.cancelled = True
+		if timer.slot is None:
+			return
+		if timer.slot is self.ready:
+			self.ready.remove(timer)
+		else:
+			timer.slot.discard(timer)
+		timer.slot = None
+		self.count -= 1
+
+	def advance(self, now=None):
+		"""Moves the wheel on to time now, and returns the timers that are due
+		by then, which are no longer in it."""
+		if now is None:
+			now = clock.monotonic()
+		# Allowing for rounding, so that now = time_of(tick) gets to tick.
+		target = int((now - self.origin) / self.resolution + 1e-6)
+
+		due = []
+		wheel = self.wheels[0]
+		if not self.count:
+			self.current = max(self.current, target)
+		while self.current < target:
+			# Skip the ticks on which nothing happens, if the next one isn't
+			# known to have timers.
+			tick = self.earliest
+			if (tick is None or tick <= self.current) and not wheel[(self.current + 1) & slot_mask]:
+				self.earliest = None
+				tick = self.next_tick()
+				if tick is None:
+					self.current = target
+					break
+			if tick is not None and tick > self.current + 1:
+				self.current = min(target, tick - 1)
+				continue
+
+			self.current += 1
+			index = self.current & slot_mask
+			if not index:
+				self.cascade()
+
+			slot = wheel[index]
+			if slot:
+				wheel[index] = set()
+				due.extend(slot)
+
+		due.extend(self.ready)
+		self.ready = []
+
+		for timer in due:
+			timer.slot = None
+		self.count -= len(due)
+		if self.earliest is not None and self.earliest <= self.current:
+			self.earliest = None
+		return due
+
+	def cascade(self):
+		"""Spreads out the higher level slots whose turn it is, as the tick
+		passes into their time."""
+		for level in range(1, levels):
+			if self.current & ((1 << (slot_bits * level)) - 1):
+				return
+			index = (self.current >> (slot_bits * level)) & slot_mask
+			slot = self.wheels[level][index]
+			if slot:
+				self.wheels[level][index] = set()
+				for timer in slot:
+					self.insert(timer)
+
+	def next_tick(self):
+		"""A tick by which the earliest timer is due (maybe earlier), or None
+		if there are none."""
+		if self.ready:
+			return self.current
+		if not self.count:
+			return None
+		if self.earliest is not None:
+			return self.earliest
+
+		best = None
+		for level in range(levels):
+			shift = slot_bits * level
+			base = self.current >> shift
+			# Nothing in this level or above goes off before its next slot.
+			if best is not None and best <= (base + 1) << shift:
+				break
+
+			for offset in range(1, slots + 1):
+				if self.wheels[level][(base + offset) & slot_mask]:
+					# Level 0 knows its tick; higher levels only when the slot
+					# will be spread out.
+					tick = (base + offset) << shift
+					if best is None or tick < best:
+						best = tick
+					break
+
+		self.earliest = best
+		return best
+
+	def next_due(self):
+		"""The time by which the earliest timer is due, or None."""
+		tick = self.next_tick()
+		if tick is None:
+			return None
+		return self.time_of(tick)
@@ -0,0 +1,249 @@
+import sys
+import time
+import threading
+import traceback
+import Queue
+from collections import deque
+
+import error_handler
+import deadline
+
+local = threading.local()
+
+def current_job():
+	"""The Job the calling worker thread is running, or None."""
+	return getattr(local, 'job', None)
+
+def cancelled():
+	"""True if the job the calling thread runs has passed its deadline.
+	Long-running jobs may check this and give up early."""
+	job = current_job()
+	return job is not None and job.state == 'cancelled'
+
+class Job:
+	def __init__(self, function, args, keys, deadline, on_done, on_timeout):
+		self.function = function
+		self.args = args
+		self.keys = keys
+		self.deadline = deadline
+		self.on_done = on_done
+		self.on_timeout = on_timeout
+
+		self.timer = None
+		# The deadline it runs under, once it runs.
+		self.limit = None
+		self.state = 'waiting'
+		self.submitted = time.time()
+		self.started = None
+		self.finished = None
+
+	def __repr__(self):
+		return "<Job %s %s>" % (getattr(self.function, '__name__', self.function), self.state)
+
+class WorkerPool:
+	"""Runs jobs on a few threads and hands their results back to the
+	reactor thread.
+
+	Every job has keys like ("nick", "bob") and ("channel", "#pynik"); at
+	most key_limits[kind] jobs with the same key run at once, the others
+	wait in line. A job that passes its deadline is given up on: its
+	on_timeout runs, its keys are freed and, as a thread can't be stopped
+	from the outside, a spare thread is started in place of the one still
+	stuck in it (up to twice the pool size). Whatever the job returns in
+	the end is thrown away.
+
+	Everything but the worker threads' own loop runs on the reactor thread;
+	the only thing both sides touch is a job's state, under lock."""
+
+	def __init__(self, reactor, size=4, key_limits={}, max_waiting=100):
+		self.reactor = reactor
+		self.size = size
+		self.key_limits = key_limits
+		self.max_waiting = max_waiting
+
+		self.lock = threading.Lock()
+		self.runnable = Queue.Queue()
+		self.waiting = deque()
+		self.running = {}
+		self.active = 0
+		self.threads = 0
+
+		self.submitted = 0
+		self.completed = 0
+		self.failed = 0
+		self.rejected = 0
+		self.timed_out = 0
+		self.cancelled = 0
+		self.runs = 0
+		self.total_wait = 0.0
+		self.max_wait = 0.0
+		self.total_run = 0.0
+		self.max_run = 0.0
+
+		for i in range(size):
+			self.start_thread()
+
+	def start_thread(self):
+		self.threads += 1
+		worker = threading.Thread(target=self.work, name="Worker")
+		worker.daemon = True
+		worker.start()
+
+	def submit(self, function, args=(), keys=(), timeout=None, on_done=None, on_timeout=None):
+		"""Queues function(*args). on_done(result) runs on the reactor
+		thread once it returns (exceptions are logged), on_timeout() if it
+		hasn't within timeout seconds of being submitted. Returns the Job,
+		or None if too many jobs are waiting already."""
+		if len(self.waiting) >= self.max_waiting:
+			self.rejected += 1
+			return None
+
+		deadline = None
+		if timeout is not None:
+			deadline = time.time() + timeout
+
+		job = Job(function, args, keys, deadline, on_done, on_timeout)
+		self.submitted += 1
+		self.waiting.append(job)
+
+		if timeout is not None:
+			job.timer = self.reactor.call_later(timeout, self.on_deadline, job)
+
+		self.dispatch()
+		return job
+
+	def can_start(self, job):
+		for key in job.keys:
+			if self.running.get(key, 0) >= self.key_limits.get(key[0], sys.maxint):
+				return False
+		return True
+
+	def dispatch(self):
+		"""Hands every waiting job whose keys are free to the threads."""
+		still_waiting = deque()
+		for job in self.waiting:
+			if self.can_start(job):
+				for key in job.keys:
+					self.running[key] = self.running.get(key, 0) + 1
+				self.active += 1
+				job.state = 'queued'
+				self.runnable.put(job)
+			else:
+				still_waiting.append(job)
+		self.waiting = still_waiting
+
+	def release(self, job):
+		self.active -= 1
+		for key in job.keys:
+			self.running[key] -= 1
+			if not self.running[key]:
+				del self.running[key]
+
+	def on_deadline(self, job):
+		if self.give_up(job):
+			self.timed_out += 1
+			if job.on_timeout:
+				self.reactor.invoke(job.on_timeout)
+
+	def cancel(self, job):
+		"""Gives up on job now, as if it had passed its deadline. If it's
+		running it's told so through its deadline (see deadline.py)."""
+		if self.give_up(job):
+			self.cancelled += 1
+			if job.timer:
+				job.timer.cancel()
+			if job.on_timeout:
+				self.reactor.invoke(job.on_timeout)
+
+	def give_up(self, job):
+		with self.lock:
+			state = job.state
+			if state in ('waiting', 'queued', 'running'):
+				job.state = 'cancelled'
+			if state == 'running':
+				job.limit.cancel()
+
+		if state == 'waiting':
+			self.waiting.remove(job)
+		elif state == 'queued':
+			self.release(job)
+		elif state == 'running':
+			self.release(job)
+			if self.threads < self.size * 2:
+				self.start_thread()
+		else:
+			return False
+
+		self.dispatch()
+		return True
+
+	def on_finished(self, job, result, error):
+		self.runs += 1
+		wait = job.started - job.submitted
+		run = job.finished - job.started
+		self.total_wait += wait
+		self.max_wait = max(self.max_wait, wait)
+		self.total_run += run
+		self.max_run = max(self.max_run, run)
+
+		if job.state == 'cancelled':
+			# The thread that ran it is one too many now.
+			if self.threads > self.size:
+				self.threads -= 1
+				self.runnable.put(None)
+			return
+
+		job.state = 'done'
+		if job.timer:
+			job.timer.cancel()
+		self.release(job)
+		self.dispatch()
+
+		if error:
+			self.failed += 1
+			error_handler.output_message("worker: " + str(job) + " " + str(error[0:2]) + " " + str(traceback.extract_tb(error[2])))
+		else:
+			self.completed += 1
+			if job.on_done:
+				self.reactor.invoke(job.on_done, result)
+
+	def work(self):
+		while True:
+			job = self.runnable.get()
+			if job is None:
+				return
+
+			# I/O the job does keeps to its deadline (see deadline.py). It's
+			# made before the job is marked running, under the lock, so
+			# whoever gives up on a running job finds a deadline to cancel.
+			result = error = None
+			with deadline.until(job.deadline) as limit:
+				with self.lock:
+					# Given up on while it was queued.
+					if job.state == 'cancelled':
+						continue
+					job.limit = limit
+					job.state = 'running'
+
+				job.started = time.time()
+				local.job = job
+
+				try:
+					result = job.function(*job.args)
+				except:
+					error = sys.exc_info()
+
+			local.job = None
+			job.finished = time.time()
+			self.reactor.call_from_thread(self.on_finished, job, result, error)
+
+	def stats(self):
+		mean_wait = mean_run = 0.0
+		if self.runs:
+			mean_wait = self.total_wait / self.runs
+			mean_run = self.total_run / self.runs
+
+		return { "threads": self.threads, "busy": self.active,
+			"waiting": len(self.waiting), "submitted": self.submitted, "completed": self.completed,
+			"failed": self.failed, "rejected": self.rejected, "timed_out": self.timed_out, "cancelled": self.cancelled,
+			"mean_wait": mean_wait, "max_wait": self.max_wait, "mean_run": mean_run, "max_run": self.max_run }